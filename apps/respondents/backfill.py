@@ -0,0 +1,99 @@
+from django.db import transaction
+from django.utils import timezone
+
+from apps.surveys.models import DataflowHierarchy
+
+from .models import Respondent
+
+
+class HierarchyExtrasBackfill:
+    """
+    Recomputes ``hierarchy_dict`` and ``hierarchy_id_dict`` extras of
+    respondents of a project.
+
+    Extras are only refreshed when a respondent is saved, so they go stale
+    once the project hierarchy is uploaded again. The hierarchy tree is
+    loaded once and paths are computed in memory, respondents are then
+    walked in batches ordered by id and only changed extras are written
+    with ``bulk_update``, touching the modification time of respondents so
+    that survey snapshots and delta exports see them. Each batch is committed on its own so that an
+    interrupted backfill can be resumed after the last processed id.
+
+    Args:
+        project (Project): Project whose respondents are updated.
+        batch_size (int): Number of respondents loaded and updated at once.
+        dry_run (bool): Count changed respondents without updating them.
+    """
+
+    #: Default number of respondents loaded and updated at once.
+    batch_size = 1000
+
+    def __init__(self, project, batch_size=None, dry_run=False):
+        self.project = project
+        self.batch_size = batch_size or self.batch_size
+        self.dry_run = dry_run
+        self.load()
+
+    def load(self):
+        """Loads project hierarchy levels and paths of all project hierarchies."""
+        self.levels = list(self.project.hierarchy_levels.values_list('name', flat=True))
+
+        # parents come before their children in tree order
+        self.paths = {}
+        hierarchies = DataflowHierarchy.objects\
+            .filter(project=self.project)\
+            .order_by('tree_id', 'lft')\
+            .values_list('id', 'name', 'parent_id')
+        for pk, name, parent_id in hierarchies:
+            path_ids, path_names = self.paths.get(parent_id, ((), ()))
+            self.paths[pk] = ((*path_ids, pk), (*path_names, name))
+
+    def get_extras(self, hierarchy_id):
+        """Returns hierarchy extras of respondents of a hierarchy."""
+        path_ids, path_names = self.paths.get(hierarchy_id, ((), ()))
+        padding = [None] * (len(self.levels) - len(path_ids))
+        return {
+            'hierarchy_dict': dict(zip(self.levels, [*path_names, *padding])),
+            'hierarchy_id_dict': dict(zip(self.levels, [*path_ids, *padding])),
+        }
+
+    def run(self, start_after=0, callback=None):
+        """
+        Updates respondents with ids greater than ``start_after`` and returns
+        the number of processed and changed respondents.
+
+        ``callback`` is called after every batch with the last processed id
+        and the number of processed and changed respondents in the batch.
+        """
+        respondents = Respondent.objects\
+            .filter(survey__project=self.project)\
+            .order_by('pk')\
+            .only('id', 'hierarchy_id', 'extras')
+
+        processed = changed = 0
+        last_id = start_after
+        while True:
+            with transaction.atomic():
+                batch = list(respondents.filter(pk__gt=last_id)[:self.batch_size])
+                if not batch:
+                    break
+
+                updated = []
+                now = timezone.now()
+                for respondent in batch:
+                    extras = self.get_extras(respondent.hierarchy_id)
+                    if any(respondent.extras.get(key) != value for key, value in extras.items()):
+                        respondent.extras.update(extras)
+                        respondent.modified_at = now
+                        updated.append(respondent)
+
+                if updated and not self.dry_run:
+                    Respondent.objects.bulk_update(updated, ['extras', 'modified_at'])
+
+            last_id = batch[-1].pk
+            processed += len(batch)
+            changed += len(updated)
+            if callback is not None:
+                callback(last_id, len(batch), len(updated))
+
+        return processed, changed
@@ -3,6 +3,9 @@ from django.utils.translation import ugettext_lazy as _
 
 from mptt.forms import TreeNodeChoiceField
 
+from apps.surveys.configuration import get_survey_configuration
+from core.fields import CachedChoicesFormMixin, CachedModelChoiceField
+
 from .models import Respondent
 
 
@@ -22,12 +25,16 @@ class RespondentConsentForm(forms.Form):
         return data
 
 
-class RespondentForm(forms.ModelForm):
+class RespondentForm(CachedChoicesFormMixin, forms.ModelForm):
     hierarchy_level = TreeNodeChoiceField(queryset=None)
 
     class Meta:
         model = Respondent
         fields = ['first_name', 'last_name', 'email', 'gender', 'hierarchy_level', 'role']
+        field_classes = {
+            'gender': CachedModelChoiceField,
+            'role': CachedModelChoiceField,
+        }
 
     def __init__(self, survey=None, project=None, *args, **kwargs):
 
@@ -51,14 +58,17 @@ class RespondentForm(forms.ModelForm):
             self.fields['hierarchy_level'].queryset = project.hierarchy_levels.all()
         if 'hierarchy' in self.fields:
             self.fields['hierarchy'].queryset = project.hierarchies.all()
+        choice_cache = get_survey_configuration(survey).get_choice_cache()
         if 'gender' in self.fields:
             self.fields['gender'].queryset = survey.genders.all()
+            choice_cache.bind(self.fields['gender'], 'genders')
         self.fields['role'].queryset = survey.roles.all()
+        choice_cache.bind(self.fields['role'], 'roles')
 
 
 class ResponseRespondentForm(RespondentForm):
 
-    class Meta:
+    class Meta(RespondentForm.Meta):
         model = Respondent
         fields = ['first_name', 'last_name', 'email', 'gender', 'hierarchy', 'role']
         labels = {
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.projects.models import Project
+
+from ...backfill import HierarchyExtrasBackfill
+
+
+class Command(BaseCommand):
+    help = 'Recomputes hierarchy extras of respondents of a project, e.g. after its hierarchy was uploaded again.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'project',
+            type=int,
+            help='Id of the project.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=HierarchyExtrasBackfill.batch_size,
+            help=f'Number of respondents updated at once (default: {HierarchyExtrasBackfill.batch_size}).',
+        )
+        parser.add_argument(
+            '--start-after',
+            type=int,
+            default=0,
+            help='Resume after the respondent with this id, as reported by an interrupted run.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report respondents with stale extras without updating them.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.get(pk=options['project'])
+        except Project.DoesNotExist:
+            raise CommandError(f"Project {options['project']} does not exist.")
+
+        backfill = HierarchyExtrasBackfill(project, batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        def report(last_id, processed, changed):
+            if options['verbosity'] > 0:
+                self.stdout.write(f'Processed {processed} respondents, {changed} changed, last id {last_id}.')
+
+        processed, changed = backfill.run(start_after=options['start_after'], callback=report)
+
+        action = 'would be updated' if options['dry_run'] else 'updated'
+        self.stdout.write(f'{changed} of {processed} respondents {action}.')
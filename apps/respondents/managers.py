@@ -1,5 +1,8 @@
+from django.contrib.postgres.fields import JSONField
 from django.db import models
-from django.db.models import BooleanField, Case, CharField, Q, Value, When
+from django.db.models import BooleanField, Case, CharField, F, Func, Q, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
 
 
 class RespondentQuerySet(models.QuerySet):
@@ -41,6 +44,28 @@ class RespondentQuerySet(models.QuerySet):
             )
         )
 
+    def update_hierarchy_extras(self, hierarchies, levels):
+        """
+        Updates hierarchy dictionaries in extras of respondents of the
+        hierarchies from their materialised paths in a single statement,
+        touching their modification time.
+        """
+        whens = [
+            When(hierarchy_id=hierarchy.pk, then=Cast(Value({
+                'hierarchy_dict': hierarchy.get_path_dict(levels),
+                'hierarchy_id_dict': hierarchy.get_path_dict(levels, 'id'),
+            }, output_field=JSONField()), JSONField()))
+            for hierarchy in hierarchies
+        ]
+        if not whens:
+            return 0
+
+        extras = Func(
+            F('extras'), Case(*whens, default=Cast(Value({}, output_field=JSONField()), JSONField())),
+            template='%(expressions)s', arg_joiner=' || ', output_field=JSONField()
+        )
+        return self.filter(hierarchy__in=hierarchies).update(extras=extras, modified_at=timezone.now())
+
 
 class RespondentManager(models.Manager):
     """Respondent model manager."""
@@ -53,3 +78,6 @@ class RespondentManager(models.Manager):
 
     def with_status(self):
         return self.get_queryset().with_status()
+
+    def update_hierarchy_extras(self, hierarchies, levels):
+        return self.get_queryset().update_hierarchy_extras(hierarchies, levels)
@@ -143,8 +143,9 @@ class Respondent(TimeStampedModel):
 
     def save(self, *args, **kwargs):
         self.autopopulate_from_user()
-        self.extras['hierarchy_dict'] = self.build_hierarchy_dict()
-        self.extras['hierarchy_id_dict'] = self.build_hierarchy_dict('id')
+        levels = list(self.survey.project.hierarchy_levels.values_list('name', flat=True))
+        self.extras['hierarchy_dict'] = self.build_hierarchy_dict(levels=levels)
+        self.extras['hierarchy_id_dict'] = self.build_hierarchy_dict('id', levels=levels)
         super().save(*args, **kwargs)
 
     def autopopulate_from_user(self):
@@ -195,15 +196,22 @@ class Respondent(TimeStampedModel):
 
         return (response, created)
 
-    def build_hierarchy_dict(self, value_attr='name'):
+    def build_hierarchy_dict(self, value_attr='name', levels=None):
         """
         Returns the hierarchy and ancestors as a dictionary of
         project hierarchy levels as keys
+
+        Values are read from the materialised path of the hierarchy,
+        ancestors are only queried for hierarchies without a path.
         """
-        levels = self.survey.project.hierarchy_levels.values_list('name', flat=True)
+        if levels is None:
+            levels = list(self.survey.project.hierarchy_levels.values_list('name', flat=True))
         if not self.hierarchy:
             return {level: None for level in levels}
 
+        if value_attr in ('id', 'name') and self.hierarchy.path_ids:
+            return self.hierarchy.get_path_dict(levels, value_attr)
+
         tree = list(self.hierarchy.get_ancestors(include_self=True).values_list(value_attr, flat=True))
         tree += [None] * (len(levels) - len(tree))
         return dict(zip(levels, tree))
@@ -0,0 +1,88 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from model_bakery import baker
+
+from apps.projects.models import Project
+from apps.surveys.models import DataflowHierarchy, HierarchyLevel, Survey
+from apps.users.models import User
+
+from ..backfill import HierarchyExtrasBackfill
+from ..models import Respondent
+
+
+class HierarchyExtrasBackfillTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(User)
+        cls.project = baker.make(Project, creator=cls.user)
+        region = HierarchyLevel.objects.create(project=cls.project, name='region', creator=cls.user)
+        district = HierarchyLevel.objects.create(parent=region, name='district', creator=cls.user)
+        cls.region = DataflowHierarchy.objects.create(
+            project=cls.project, hierarchy_level=region, level_name='region', name='Coast', creator=cls.user
+        )
+        cls.district = DataflowHierarchy.objects.create(
+            parent=cls.region, hierarchy_level=district, level_name='district', name='Ilala', creator=cls.user
+        )
+
+        survey = baker.make(Survey, project=cls.project, creator=cls.user)
+        cls.respondents = [
+            Respondent.objects.create(survey=survey, hierarchy=hierarchy)
+            for hierarchy in (cls.district, cls.region, None)
+        ]
+        # extras of respondents saved before the hierarchy was uploaded again
+        Respondent.objects.update(extras={'hierarchy_dict': {'zone': 'North'}, 'source': 'import'})
+
+    def get_extras(self):
+        return [
+            Respondent.objects.get(pk=respondent.pk).extras
+            for respondent in self.respondents
+        ]
+
+    def test_backfill(self):
+        modified_at = Respondent.objects.get(pk=self.respondents[0].pk).modified_at
+        backfill = HierarchyExtrasBackfill(self.project, batch_size=2)
+        progress = []
+        # a select and an update of each batch in its own savepoint
+        with self.assertNumQueries(11):
+            result = backfill.run(callback=lambda *args: progress.append(args))
+
+        self.assertEqual(result, (3, 3))
+        self.assertEqual(progress, [(self.respondents[1].pk, 2, 2), (self.respondents[2].pk, 1, 1)])
+        self.assertEqual(self.get_extras(), [
+            {
+                'source': 'import',
+                'hierarchy_dict': {'region': 'Coast', 'district': 'Ilala'},
+                'hierarchy_id_dict': {'region': self.region.pk, 'district': self.district.pk},
+            },
+            {
+                'source': 'import',
+                'hierarchy_dict': {'region': 'Coast', 'district': None},
+                'hierarchy_id_dict': {'region': self.region.pk, 'district': None},
+            },
+            {
+                'source': 'import',
+                'hierarchy_dict': {'region': None, 'district': None},
+                'hierarchy_id_dict': {'region': None, 'district': None},
+            },
+        ])
+        self.assertGreater(Respondent.objects.get(pk=self.respondents[0].pk).modified_at, modified_at)
+
+        # nothing left to update
+        self.assertEqual(backfill.run(), (3, 0))
+
+    def test_resume(self):
+        result = HierarchyExtrasBackfill(self.project).run(start_after=self.respondents[1].pk)
+
+        self.assertEqual(result, (1, 1))
+        self.assertEqual(self.get_extras()[1]['hierarchy_dict'], {'zone': 'North'})
+
+    def test_command_dry_run(self):
+        stdout = io.StringIO()
+        call_command('backfill_hierarchy_extras', self.project.pk, dry_run=True, stdout=stdout)
+
+        self.assertIn('3 of 3 respondents would be updated.', stdout.getvalue())
+        self.assertEqual(self.get_extras()[0]['hierarchy_dict'], {'zone': 'North'})
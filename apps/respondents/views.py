@@ -8,6 +8,7 @@ from django.views.generic import FormView, UpdateView
 from django_filters.views import FilterView
 
 from apps.responses.mixins import ConsentCheckMixin, RespondentSurveyMixin
+from apps.surveys.configuration import get_survey_configuration
 from core.exceptions import NotAuthenticated
 from core.mixins import CSVResponseMixin, PageMixin
 
@@ -30,6 +31,7 @@ class RespondentListView(RespondentFacilitatorMixin, PageMixin, CSVResponseMixin
     filterset_class = RespondentFilter
     ordering = ['-created_at']
     paginate_by = 30
+    sheet_name = 'respondents'
 
     def get_queryset(self):
         return super().get_queryset()\
@@ -40,7 +42,7 @@ class RespondentListView(RespondentFacilitatorMixin, PageMixin, CSVResponseMixin
         yield ('id', 'email', 'first_name', 'last_name', 'gender', 'registered',
                'survey', 'survey_id', 'project', 'project_id', 'status')
 
-        for obj in self.object_list:
+        for obj in self.object_list.iterator():
             gender = obj.gender.name if obj.gender else ''
             yield (obj.id, obj.email, obj.first_name, obj.last_name, gender, obj.registered,
                    obj.survey.name, obj.survey.id, obj.survey.project.name, obj.survey.project.id, obj.status)
@@ -49,9 +51,10 @@ class RespondentListView(RespondentFacilitatorMixin, PageMixin, CSVResponseMixin
         return f'respondents-{str(timezone.now().date())}.csv'
 
     def get_renderer(self):
-        # When `format=csv` in URL query string return csv
-        if self.request.GET.get('format') == 'csv':
-            return 'csv'
+        # When `format=csv` or `format=xlsx` in URL query string return csv or xlsx
+        renderer = self.request.GET.get('format')
+        if renderer in ('csv', 'xlsx'):
+            return renderer
 
 
 class RespondentConsentView(PageMixin, RespondentSurveyMixin, FormView):
@@ -103,11 +106,7 @@ class RespondentConsentView(PageMixin, RespondentSurveyMixin, FormView):
         self.respondent = self.survey.get_or_create_respondent(**respondent_lookup)[0]
 
         # store consent details
-        session_surveys = self.request.session.get('surveys', {})
-        session_surveys[str(self.survey.pk)] = {
-            'consented_at': timezone.now().isoformat()
-        }
-        self.request.session['surveys'] = session_surveys
+        self.update_session_survey(self.survey, consented_at=timezone.now().isoformat())
         return super().form_valid(form)
 
     def get_context_data(self, **kwargs):
@@ -128,7 +127,7 @@ class RespondentConsentView(PageMixin, RespondentSurveyMixin, FormView):
         return {'user': user, 'email': email}
 
     def get_footer_logos(self):
-        return self.survey.logos.all()
+        return get_survey_configuration(self.survey).logos
 
 
 class RespondentUpdateView(PageMixin, RespondentSurveyMixin, ConsentCheckMixin, UpdateView):
@@ -211,11 +210,11 @@ class RespondentUpdateView(PageMixin, RespondentSurveyMixin, ConsentCheckMixin,
         return reverse('respondents:respondent-consent', kwargs={'survey': self.survey.pk})
 
     def get_footer_logos(self):
-        return self.survey.logos.all()
+        return get_survey_configuration(self.survey).logos
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        context['hierarchy_levels'] = self.survey.project.hierarchy_levels.values('id', 'level', 'name')
+        context['hierarchy_levels'] = get_survey_configuration(self.survey).hierarchy_levels
         context['hierarchies'] = self.survey.project.hierarchies.values('id', 'level', 'name', 'parent')
         return context
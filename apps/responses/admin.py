@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 from .models import (DatasetResponse, DatasetTopicReceived, DatasetTopicResponse, DatasetTopicShared,
-                     DatasetTopicStorageAccess, QuestionResponse, SurveyResponse)
+                     DatasetTopicStorageAccess, ExportJob, QuestionResponse, SurveyResponse, SurveyStatistics)
 
 
 class CreatorAdminMixin:
@@ -75,3 +75,22 @@ class DatasetTopicSharedAdmin(admin.ModelAdmin):
 @admin.register(DatasetTopicStorageAccess)
 class DatasetTopicStorageAccessAdmin(admin.ModelAdmin):
     readonly_fields = ['id', 'uuid', 'created_at', 'modified_at']
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['pk', 'survey', 'export', 'status', 'created_at']
+    list_display_links = ['pk', 'survey']
+    list_select_related = ['survey']
+    list_filter = ['status', 'export', 'survey__project']
+    raw_id_fields = ['survey', 'creator']
+    readonly_fields = ['id', 'uuid', 'created_at', 'modified_at']
+
+
+@admin.register(SurveyStatistics)
+class SurveyStatisticsAdmin(admin.ModelAdmin):
+    list_display = ['pk', 'survey', 'respondent_count', 'not_started_count', 'in_progress_count', 'completed_count']
+    list_display_links = ['pk', 'survey']
+    list_select_related = ['survey']
+    raw_id_fields = ['survey']
+    readonly_fields = ['id', 'created_at', 'modified_at']
@@ -5,3 +5,6 @@ from django.utils.translation import ugettext_lazy as _
 class ResponsesConfig(AppConfig):
     name = 'apps.responses'
     verbose_name = _('Responses')
+
+    def ready(self):
+        from . import signals  # noqa
@@ -0,0 +1,171 @@
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import translation
+
+from .models import DatasetResponse, DatasetTopicResponse, ExportJob, SurveyResponse
+from .views.exports import EXPORT_VIEWS
+
+#: A benchmarked page, requested by a project facilitator or an anonymous respondent.
+Benchmark = namedtuple('Benchmark', ['name', 'url', 'facilitator'])
+
+
+def get_benchmarks(survey):
+    """Returns benchmarks of facilitator and respondent pages of a survey."""
+    survey_kwargs = {'survey': survey.pk}
+    query = urlencode({'survey': survey.pk})
+
+    benchmarks = [
+        Benchmark('respondent-list', f"{reverse('respondents:respondent-list')}?{query}", True),
+        Benchmark('respondent-list-csv', f"{reverse('respondents:respondent-list')}?{query}&format=csv", True),
+        Benchmark('survey-response-list', f"{reverse('responses:survey-response-list')}?{query}", True),
+        Benchmark(
+            'survey-response-list-csv', f"{reverse('responses:survey-response-list')}?{query}&format=csv", True
+        ),
+    ]
+
+    for export in EXPORT_VIEWS:
+        url = reverse(f'responses:{export}', kwargs=survey_kwargs)
+        benchmarks += [
+            Benchmark(export, url, True),
+            Benchmark(f'{export}-parquet', f'{url}?format=parquet', True),
+        ]
+
+    benchmarks += [
+        Benchmark('survey-export-workbook', reverse('responses:survey-export-workbook', kwargs=survey_kwargs), True),
+        Benchmark('project-export', reverse('responses:project-export', kwargs={
+            'project': survey.project_id, 'export': ExportJob.DATASET_SHARED
+        }), True),
+    ]
+
+    survey_response = SurveyResponse.objects.filter(survey=survey).order_by('pk').first()
+    if survey_response is None:
+        return benchmarks
+
+    dataset_response = DatasetResponse.objects.filter(response=survey_response).order_by('pk').first()
+    topic_response = DatasetTopicResponse.objects.filter(dataset_response=dataset_response).order_by('pk').first()
+    benchmarks += [
+        Benchmark('respondent-consent', reverse('respondents:respondent-consent', kwargs=survey_kwargs), False),
+        Benchmark('respondent-update', reverse('respondents:respondent-update', kwargs={
+            'pk': survey_response.respondent_id
+        }), False),
+        Benchmark('dataset-response-list-create', reverse('responses:dataset-response-list-create', kwargs={
+            'pk': survey_response.pk
+        }), False),
+        Benchmark('survey-response-complete', reverse('responses:survey-response-complete', kwargs={
+            'pk': survey_response.pk
+        }), False),
+    ]
+
+    if dataset_response is not None:
+        benchmarks += [
+            Benchmark(f'dataset-response-update-{name}', reverse(f'responses:dataset-response-update-{name}', kwargs={
+                'pk': dataset_response.pk
+            }), False)
+            for name in ('frequency', 'shared', 'received')
+        ]
+
+    if topic_response is not None:
+        benchmarks.append(Benchmark(
+            'dataset-topic-response-update',
+            reverse('responses:dataset-topic-response-update', kwargs={'pk': topic_response.pk}),
+            False
+        ))
+
+    return benchmarks
+
+
+def get_content_size(response):
+    """Reads the whole response content and returns its size in bytes."""
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def measure(client, url, repeat=3):
+    """
+    Requests a URL and returns its median wall time, query count and peak memory.
+
+    Wall time is measured separately from memory since tracing memory
+    allocations slows down requests. Streaming responses are read fully
+    so that time and memory include rendering of all rows.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        get_content_size(response)
+        durations.append(time.perf_counter() - start)
+
+    with CaptureQueriesContext(connection) as queries:
+        tracemalloc.start()
+        try:
+            response = client.get(url)
+            size = get_content_size(response)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'time': statistics.median(durations),
+        'queries': len(queries),
+        'peak_memory': peak_memory,
+        'size': size,
+    }
+
+
+def run_benchmarks(survey, facilitator, repeat=3, callback=None):
+    """
+    Measures every benchmark of a survey and returns results by benchmark name.
+
+    The export cache is disabled so that exports are rendered on every request
+    and URLs are reversed in the default language, outside of a request
+    management commands have no active language.
+    """
+    # requests from an internal IP would include the debug toolbar
+    facilitator_client = Client(REMOTE_ADDR='192.0.2.1')
+    facilitator_client.force_login(facilitator)
+    respondent_client = Client(REMOTE_ADDR='192.0.2.1')
+
+    results = {}
+    language = translation.get_supported_language_variant(settings.LANGUAGE_CODE)
+    allowed_hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+    with translation.override(language), override_settings(ALLOWED_HOSTS=allowed_hosts, RESPONSES_EXPORT_CACHE_SIZE=0):
+        for benchmark in get_benchmarks(survey):
+            client = facilitator_client if benchmark.facilitator else respondent_client
+            results[benchmark.name] = result = measure(client, benchmark.url, repeat)
+            if callback is not None:
+                callback(benchmark, result)
+
+    return results
+
+
+def compare_results(baseline, results, tolerance=0.25):
+    """
+    Returns descriptions of results which regressed compared to the baseline.
+
+    Wall time and peak memory regress when they exceed the baseline by more
+    than ``tolerance``, query counts regress on any increase.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+
+        if result['queries'] > expected['queries']:
+            regressions.append(f"{name}: {result['queries']} queries, baseline {expected['queries']}")
+        for key in ('time', 'peak_memory'):
+            if result[key] > expected[key] * (1 + tolerance):
+                regressions.append(f'{name}: {key} {result[key]:.6g}, baseline {expected[key]:.6g}')
+
+    return regressions
@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+
+
+class ExportCache:
+    """
+    Rendered exports cached in a local directory.
+
+    Each entry is a file with the rendered content and a JSON file with
+    response headers. When the total size of cached content exceeds
+    ``max_size`` bytes, least recently used entries are removed.
+
+    Args:
+        location (str): Directory of cached exports.
+        max_size (int): Maximum total size in bytes, ``0`` disables the cache.
+    """
+
+    #: Size in bytes of chunks read from cached files.
+    chunk_size = 64 * 1024
+
+    def __init__(self, location, max_size):
+        self.location = location
+        self.max_size = max_size
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get_path(self, key):
+        return os.path.join(self.location, key)
+
+    def get(self, key):
+        """
+        Returns an open file of cached content and its headers, or ``None``
+        if the key is not cached.
+        """
+        if not self.enabled:
+            return None
+
+        path = self.get_path(key)
+        try:
+            with open(f'{path}.json') as f:
+                headers = json.load(f)
+            file = open(path, 'rb')
+        except (OSError, ValueError):
+            return None
+
+        # mark as recently used
+        os.utime(path)
+        return file, headers
+
+    def tee(self, key, chunks, headers):
+        """
+        Yields chunks while writing them to the cache.
+
+        The entry is only added once all chunks have been yielded, an
+        interrupted download leaves the cache untouched.
+        """
+        if not self.enabled:
+            yield from chunks
+            return
+
+        os.makedirs(self.location, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.location, prefix='.tmp-')
+        completed = False
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+
+            path = self.get_path(key)
+            with open(f'{path}.json', 'w') as f:
+                json.dump(headers, f)
+            os.replace(temp_path, path)
+            completed = True
+        finally:
+            if not completed and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits in ``max_size``."""
+        entries = []
+        for entry in os.scandir(self.location):
+            if entry.name.startswith('.') or entry.name.endswith('.json'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            for name in (path, f'{path}.json'):
+                try:
+                    os.remove(name)
+                except OSError:
+                    pass
+            total_size -= size
+
+    def iter_file(self, file):
+        """Yields chunks of a cached file and closes it."""
+        with file:
+            yield from iter(lambda: file.read(self.chunk_size), b'')
+
+
+def get_export_cache():
+    """Returns export cache configured by ``RESPONSES_EXPORT_CACHE_*`` settings."""
+    return ExportCache(settings.RESPONSES_EXPORT_CACHE_ROOT, settings.RESPONSES_EXPORT_CACHE_SIZE)
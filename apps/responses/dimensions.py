@@ -0,0 +1,140 @@
+from apps.respondents.models import Respondent
+from apps.surveys.models import DataflowHierarchy, Role
+from apps.users.models import Gender
+
+from .models import SurveyResponse
+
+
+class SurveyDimensions:
+    """
+    Survey dimension tables loaded once into dictionaries keyed by id.
+
+    Survey exports stream narrow rows from fact tables (shared, received,
+    storage access and dataset responses) using ``values_list()`` and join
+    them with the dimensions in python instead of walking ``select_related``
+    joins and related objects for every row.
+
+    Only responses which have been completed are loaded, since exports
+    ignore incomplete responses.
+    """
+
+    def __init__(self, survey):
+        self.survey = survey
+        self.project = survey.project
+        self.load()
+
+    def load(self):
+        """Load all survey dimensions."""
+        survey = self.survey
+
+        self.hierarchy_levels = dict(self.project.hierarchy_levels.values_list('id', 'name'))
+        self.hierarchy_level_names = list(self.hierarchy_levels.values())
+
+        self.entities = {
+            pk: (name, hierarchy_level_id)
+            for pk, name, hierarchy_level_id in survey.entities.order_by().values_list(
+                'id', 'name', 'hierarchy_level_id'
+            )
+        }
+        self.topics = dict(survey.topics.order_by().values_list('id', 'name'))
+        self.datasets = dict(survey.datasets.order_by().values_list('id', 'name'))
+        self.dataset_frequencies = dict(survey.dataset_frequencies.order_by().values_list('id', 'name'))
+        self.dataset_storages = dict(survey.dataset_storages.order_by().values_list('id', 'name'))
+        self.dataset_access = dict(survey.dataset_access.order_by().values_list('id', 'name'))
+
+        responses = SurveyResponse.objects\
+            .filter(survey=survey, completed_at__isnull=False)\
+            .order_by()
+
+        self.responses = {
+            pk: (respondent_id, completed_at, consented_at)
+            for pk, respondent_id, completed_at, consented_at in responses.values_list(
+                'id', 'respondent_id', 'completed_at', 'consented_at'
+            )
+        }
+
+        respondents = list(
+            Respondent.objects
+            .filter(id__in=responses.values('respondent_id'))
+            .order_by()
+            .values_list('id', 'first_name', 'last_name', 'email', 'gender_id', 'role_id', 'hierarchy_id')
+        )
+
+        self.genders = dict(Gender.objects.order_by().values_list('id', 'name'))
+        self.roles = {
+            pk: (name, hierarchy_level_id)
+            for pk, name, hierarchy_level_id in Role.objects
+            .filter(id__in={respondent[5] for respondent in respondents if respondent[5]})
+            .order_by()
+            .values_list('id', 'name', 'hierarchy_level_id')
+        }
+
+        # Materialised paths resolve ancestors without loading hierarchy trees.
+        hierarchy_ids = {respondent[6] for respondent in respondents if respondent[6]}
+        self.hierarchies = dict(
+            DataflowHierarchy.objects
+            .filter(id__in=hierarchy_ids)
+            .order_by()
+            .values_list('id', 'path_names')
+        )
+
+        self.respondents = {}
+        self.respondent_hierarchies = {}
+        for pk, first_name, last_name, email, gender_id, role_id, hierarchy_id in respondents:
+            role_name, role_hierarchy_level_id = self.roles.get(role_id, ('', None))
+
+            self.respondents[pk] = [
+                pk,
+                first_name,
+                last_name,
+                email,
+                self.genders.get(gender_id, ''),
+                gender_id,
+                self.hierarchy_levels.get(role_hierarchy_level_id, ''),
+                role_hierarchy_level_id,
+                self.hierarchies[hierarchy_id][-1] if self.hierarchies.get(hierarchy_id) else '',
+                hierarchy_id,
+                role_name,
+                role_id,
+            ]
+            self.respondent_hierarchies[pk] = self.build_hierarchy_values(hierarchy_id)
+
+    def build_hierarchy_values(self, hierarchy_id):
+        """
+        Returns names of the hierarchy and its ancestors ordered by
+        project hierarchy levels.
+
+        This mirrors values of :meth:`.Respondent.build_hierarchy_dict`
+        without querying the database.
+        """
+        levels = self.hierarchy_level_names
+
+        tree = list(self.hierarchies.get(hierarchy_id, []))
+        if not tree:
+            return list({level: None for level in levels}.values())
+
+        tree += [None] * (len(levels) - len(tree))
+        return list(dict(zip(levels, tree)).values())
+
+    def get_entity(self, entity_id):
+        """Returns entity name, id, hierarchy level name and hierarchy level id."""
+        name, hierarchy_level_id = self.entities.get(entity_id, ('', None))
+        return [name, entity_id, self.hierarchy_levels.get(hierarchy_level_id, ''), hierarchy_level_id]
+
+    def get_respondent(self, respondent_id):
+        """Returns respondent columns shared by all survey exports."""
+        return self.respondents[respondent_id]
+
+    def get_respondent_hierarchy(self, respondent_id):
+        """Returns respondent hierarchy names ordered by project hierarchy levels."""
+        return self.respondent_hierarchies[respondent_id]
+
+    def get_survey(self):
+        """Returns survey and project columns shared by all survey exports."""
+        return [
+            self.survey.name,
+            self.survey.display_name,
+            self.survey.id,
+            self.project.name,
+            self.project.id,
+        ]
@@ -1,14 +1,17 @@
 from django import forms
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
-from apps.surveys.models import DatasetFrequency, Role, Topic
+from apps.surveys.configuration import get_survey_configuration
+from apps.surveys.models import Topic
+from core.fields import CachedChoicesFormMixin, CachedModelChoiceField, CachedModelMultipleChoiceField
 
 from ..models import (DatasetResponse, DatasetTopicReceived, DatasetTopicResponse, DatasetTopicShared,
                       DatasetTopicStorageAccess)
 
 
 class DatasetSelectForm(forms.Form):
-    datasets = forms.ModelMultipleChoiceField(
+    datasets = CachedModelMultipleChoiceField(
         queryset=None,
         widget=forms.CheckboxSelectMultiple,
         label=_('In my everday work, I usually encounter information about:'),
@@ -30,10 +33,11 @@ class DatasetSelectForm(forms.Form):
             self.initial['datasets'] = survey_response.get_datasets()
 
         self.fields['datasets'].queryset = survey.datasets.all()
+        get_survey_configuration(survey).get_choice_cache().bind(self.fields['datasets'], 'datasets')
 
 
-class DatasetResponseForm(forms.ModelForm):
-    dataset_frequency = forms.ModelChoiceField(
+class DatasetResponseForm(CachedChoicesFormMixin, forms.ModelForm):
+    dataset_frequency = CachedModelChoiceField(
         queryset=None,
         widget=forms.RadioSelect,
         required=True,
@@ -47,12 +51,13 @@ class DatasetResponseForm(forms.ModelForm):
     def __init__(self, survey=None, survey_response=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        if survey:
-            self.fields['dataset_frequency'].queryset = survey.dataset_frequencies.all()
-        elif self.instance:
-            self.fields['dataset_frequency'].queryset = self.instance.response.survey.dataset_frequencies.all()
-        else:
-            self.fields['dataset_frequency'].queryset = DatasetFrequency.objects.none()
+        if not survey:
+            survey = self.instance.response.survey
+
+        self.fields['dataset_frequency'].queryset = survey.dataset_frequencies.all()
+        get_survey_configuration(survey).get_choice_cache().bind(
+            self.fields['dataset_frequency'], 'dataset_frequencies'
+        )
 
 
 class DatasetResponseFrequencyForm(DatasetResponseForm):
@@ -71,9 +76,9 @@ class DatasetResponseFrequencyForm(DatasetResponseForm):
             self.fields['dataset_frequency'].help_text = _('Select one')
 
 
-class DatasetTopicResponseForm(forms.ModelForm):
+class DatasetTopicResponseForm(CachedChoicesFormMixin, forms.ModelForm):
 
-    percieved_owner = forms.ModelChoiceField(
+    percieved_owner = CachedModelChoiceField(
         queryset=None,
         widget=forms.RadioSelect,
         required=True,
@@ -101,17 +106,22 @@ class DatasetTopicResponseForm(forms.ModelForm):
         if not survey and self.instance:
             survey = self.instance.dataset_response.response.survey
 
-        self.fields['percieved_owner'].queryset = Role.objects.filter(survey=survey)
+        self.fields['percieved_owner'].queryset = survey.roles.all()
+        get_survey_configuration(survey).get_choice_cache().bind(self.fields['percieved_owner'], 'roles')
 
 
-class DatasetTopicStorageAccessForm(forms.ModelForm):
+class DatasetTopicStorageAccessForm(CachedChoicesFormMixin, forms.ModelForm):
     selected = forms.BooleanField(required=False)
 
     class Meta:
         model = DatasetTopicStorageAccess
         fields = ['selected', 'storage', 'access']
+        field_classes = {
+            'storage': CachedModelChoiceField,
+            'access': CachedModelChoiceField,
+        }
 
-    def __init__(self, survey=None, *args, **kwargs):
+    def __init__(self, survey=None, choice_cache=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.storage_name = None
@@ -125,15 +135,91 @@ class DatasetTopicStorageAccessForm(forms.ModelForm):
         self.fields['storage'].queryset = survey.dataset_storages.all()
         self.fields['access'].queryset = survey.dataset_access.all()
 
+        if choice_cache is not None:
+            choice_cache.bind(self.fields['storage'], 'dataset_storages')
+            choice_cache.bind(self.fields['access'], 'dataset_access')
+
     def clean(self):
         super().clean()
 
-        if self.cleaned_data['selected']:
+        if self.cleaned_data['selected'] and 'access' in self.cleaned_data:
             if not self.cleaned_data['access']:
                 raise forms.ValidationError(_('Please specify how this is accessible'))
 
 
-class BaseDatasetTopicStorageAccessFormSet(forms.BaseModelFormSet):
+class SelectionFormSetMixin:
+    """
+    Saves a formset whose forms select rows of the formset model.
+
+    Each selected form stands for one row of ``key_field`` with a value of
+    ``value_field``. Selections are compared with existing rows so that only
+    rows no longer selected are deleted, only rows with a changed value are
+    updated and only newly selected rows are created, each in bulk.
+    """
+
+    #: Field of the formset model pointing to the formset instance.
+    parent_field = None
+
+    #: Field identifying the row selected by a form.
+    key_field = None
+
+    #: Field set on the selected rows.
+    value_field = None
+
+    def get_existing_rows(self):
+        """Returns queryset of existing rows of the formset instance."""
+        raise NotImplementedError
+
+    def save(self):
+        if not self.instance:
+            raise ValueError(_('Instance not specified'))
+
+        model = self.model
+        key_attname = model._meta.get_field(self.key_field).attname
+        value_attname = model._meta.get_field(self.value_field).attname
+
+        existing = {}
+        removed_ids = []
+        for row in self.get_existing_rows().order_by('pk'):
+            if getattr(row, key_attname) in existing:
+                removed_ids.append(row.pk)
+            else:
+                existing[getattr(row, key_attname)] = row
+
+        saved_rows = []
+        created_rows = []
+        updated_rows = []
+        now = timezone.now()
+        for form in self.forms:
+            if not form.cleaned_data.get('selected'):
+                continue
+
+            key = form.cleaned_data[self.key_field]
+            value = form.cleaned_data[self.value_field]
+            row = existing.pop(key.pk, None)
+            if row is None:
+                row = model(**{self.parent_field: self.instance, self.key_field: key, self.value_field: value})
+                created_rows.append(row)
+            elif getattr(row, value_attname) != value.pk:
+                setattr(row, self.value_field, value)
+                row.modified_at = now
+                updated_rows.append(row)
+            saved_rows.append(row)
+
+        removed_ids.extend(row.pk for row in existing.values())
+        if removed_ids:
+            model.objects.filter(pk__in=removed_ids).delete()
+        if updated_rows:
+            model.objects.bulk_update(updated_rows, [self.value_field, 'modified_at'])
+        model.objects.bulk_create(created_rows)
+
+        return saved_rows
+
+
+class BaseDatasetTopicStorageAccessFormSet(SelectionFormSetMixin, forms.BaseModelFormSet):
+    parent_field = 'response'
+    key_field = 'storage'
+    value_field = 'access'
 
     def __init__(self, instance=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -143,9 +229,14 @@ class BaseDatasetTopicStorageAccessFormSet(forms.BaseModelFormSet):
 
         if self.instance:
             self.queryset = self.instance.storages.all()
-            self.form_kwargs['survey'] = self.instance.dataset_response.response.survey
+            survey = self.instance.dataset_response.response.survey
+            configuration = get_survey_configuration(survey)
+            self.form_kwargs['survey'] = survey
+
+            # share choices of the survey configuration with all forms
+            self.form_kwargs['choice_cache'] = configuration.get_choice_cache()
 
-            storages = self.instance.dataset_response.response.survey.dataset_storages.all()
+            storages = configuration.dataset_storages
 
             # set number of forms equal to storage options
             self.extra = self.max_num = len(storages)
@@ -164,22 +255,8 @@ class BaseDatasetTopicStorageAccessFormSet(forms.BaseModelFormSet):
                     except ValueError:
                         item['access'] = None
 
-    def save(self):
-        if not self.instance:
-            raise ValueError(_('Instance not specified'))
-
-        saved_forms = []
-
-        # clear existing records
-        self.instance.storages.all().delete()
-
-        # save each of the selected records
-        for form in self.forms:
-            if form.cleaned_data.get('selected'):
-                form.instance.response = self.instance
-                saved_forms.append(form.save())
-
-        return saved_forms
+    def get_existing_rows(self):
+        return self.instance.storages.all()
 
 
 DatasetTopicStorageAccessFormSet = forms.modelformset_factory(
@@ -189,14 +266,18 @@ DatasetTopicStorageAccessFormSet = forms.modelformset_factory(
 )
 
 
-class DatasetTopicSharedForm(forms.ModelForm):
+class DatasetTopicSharedForm(CachedChoicesFormMixin, forms.ModelForm):
     selected = forms.BooleanField(required=False)
 
     class Meta:
         model = DatasetTopicShared
         fields = ['selected', 'entity', 'topic']
+        field_classes = {
+            'entity': CachedModelChoiceField,
+            'topic': CachedModelChoiceField,
+        }
 
-    def __init__(self, survey=None, *args, **kwargs):
+    def __init__(self, survey=None, choice_cache=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.entity_name = None
@@ -209,18 +290,26 @@ class DatasetTopicSharedForm(forms.ModelForm):
         self.fields['topic'].required = False
 
         if survey:
+            self.fields['entity'].queryset = survey.entities.all()
             self.fields['topic'].queryset = survey.topics.all()
         else:
             self.fields['topic'].queryset = Topic.objects.none()
 
+        if choice_cache is not None:
+            choice_cache.bind(self.fields['entity'], 'entities')
+            choice_cache.bind(self.fields['topic'], 'topics')
+
     def clean(self):
         super().clean()
-        if self.cleaned_data['selected']:
+        if self.cleaned_data['selected'] and 'topic' in self.cleaned_data:
             if not self.cleaned_data['topic']:
                 raise forms.ValidationError(_('Please specify topic'))
 
 
-class BaseDatasetTopicSharedFormSet(forms.BaseModelFormSet):
+class BaseDatasetTopicSharedFormSet(SelectionFormSetMixin, forms.BaseModelFormSet):
+    parent_field = 'dataset_response'
+    key_field = 'entity'
+    value_field = 'topic'
 
     def __init__(self, instance=None, survey=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -232,10 +321,14 @@ class BaseDatasetTopicSharedFormSet(forms.BaseModelFormSet):
             self.queryset = self._get_queryset()
 
             survey = survey or self.instance.dataset_response.response.survey
-            entities = survey.entities.all()
+            configuration = get_survey_configuration(survey)
+            entities = configuration.entities
 
             self.form_kwargs['survey'] = survey
 
+            # share choices of the survey configuration with all forms
+            self.form_kwargs['choice_cache'] = configuration.get_choice_cache()
+
             # set number of forms equal to entity options
             self.extra = self.max_num = len(entities)
 
@@ -254,23 +347,8 @@ class BaseDatasetTopicSharedFormSet(forms.BaseModelFormSet):
                     except ValueError:
                         item['topic'] = None
 
-    def save(self):
-        if not self.instance:
-            raise ValueError(_('Instance not specified'))
-
-        saved_forms = []
-
-        # clear existing records
-        self.clear_entities()
-
-        # save each of the selected records
-        for form in self.forms:
-
-            if form.cleaned_data.get('selected'):
-                form.instance.dataset_response = self.instance
-                saved_forms.append(form.save())
-
-        return saved_forms
+    def get_existing_rows(self):
+        return self._get_queryset()
 
     def _get_queryset(self):
         return self.instance.datasettopicshared_set.all()
@@ -278,9 +356,6 @@ class BaseDatasetTopicSharedFormSet(forms.BaseModelFormSet):
     def get_initial_selected(self):
         return self.instance.datasettopicshared_set.select_related('entity', 'topic')
 
-    def clear_entities(self):
-        self.instance.shared_to.clear()
-
 
 DatasetTopicSharedFormSet = forms.modelformset_factory(
     DatasetTopicShared,
@@ -291,9 +366,8 @@ DatasetTopicSharedFormSet = forms.modelformset_factory(
 
 class DatasetTopicReceivedForm(DatasetTopicSharedForm):
 
-    class Meta:
+    class Meta(DatasetTopicSharedForm.Meta):
         model = DatasetTopicReceived
-        fields = ['selected', 'entity', 'topic']
 
 
 class BaseDatasetTopicReceivedFormSet(BaseDatasetTopicSharedFormSet):
@@ -304,9 +378,6 @@ class BaseDatasetTopicReceivedFormSet(BaseDatasetTopicSharedFormSet):
     def get_initial_selected(self):
         return self.instance.datasettopicreceived_set.select_related('entity', 'topic')
 
-    def clear_entities(self):
-        self.instance.received_from.clear()
-
 
 DatasetTopicReceivedFormSet = forms.modelformset_factory(
     DatasetTopicReceived,
@@ -0,0 +1,137 @@
+import json
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import Coalesce
+
+from apps.surveys.models import DataflowHierarchy
+from core.utils import iter_keyset
+
+from .models import DatasetTopicReceived, DatasetTopicShared
+
+#: Fields of compact node and edge arrays.
+NODE_FIELDS = ['kind', 'id', 'name', 'level']
+EDGE_FIELDS = ['source', 'target', 'role', 'dataset', 'topic', 'weight']
+
+#: Fields by which edges are aggregated, and paginated when streamed.
+EDGE_KEYS = ['hierarchy', 'role', 'entity_id', 'dataset_response__dataset_id', 'topic_id']
+
+
+class DataflowGraph:
+    """
+    Dataflow graph of a survey, who shares data with whom.
+
+    Nodes are the dataflow hierarchies of the project and the entities of
+    the survey. Datasets shared by respondents are edges from the respondent
+    hierarchy to the entity and received datasets are edges from the entity
+    to the respondent hierarchy. Edges of respondents without a hierarchy
+    have a ``None`` hierarchy node and edges of respondents without a role
+    have a ``None`` role.
+
+    Edges are aggregated in the database, one per source, target, role,
+    :class:`.Dataset` and :class:`.Topic`, weighted by the number of shared
+    or received rows of completed survey responses.
+    """
+
+    def __init__(self, survey):
+        self.survey = survey
+        self.load()
+
+    def load(self):
+        """Loads graph nodes, roles, datasets and topics."""
+        survey = self.survey
+
+        self.nodes = []
+        self.node_indexes = {}
+        hierarchies = DataflowHierarchy.objects\
+            .filter(project=survey.project_id)\
+            .order_by('tree_id', 'lft')\
+            .values_list('id', 'name', 'hierarchy_level__name')
+        entities = survey.entities\
+            .order_by('pk')\
+            .values_list('id', 'name', 'hierarchy_level__name')
+        for kind, rows in (('hierarchy', hierarchies), ('entity', entities)):
+            for pk, name, level in rows:
+                self.node_indexes[kind, pk] = len(self.nodes)
+                self.nodes.append([kind, pk, name, level])
+
+        self.roles = list(survey.roles.order_by('pk').values_list('id', 'name'))
+        self.datasets = list(survey.datasets.order_by('pk').values_list('id', 'name'))
+        self.topics = list(survey.topics.order_by('pk').values_list('id', 'name'))
+
+    def get_edge_queryset(self, model):
+        """
+        Returns shared or received rows aggregated by :data:`EDGE_KEYS`, with
+        a ``weight`` count of rows.
+
+        Missing respondent hierarchies and roles are aggregated as ``0``, so
+        that edges can be paginated by their keys.
+        """
+        respondent = 'dataset_response__response__respondent__'
+        return model.objects\
+            .filter(dataset_response__response__survey=self.survey)\
+            .exclude(dataset_response__response__completed_at__isnull=True)\
+            .annotate(
+                hierarchy=Coalesce(f'{respondent}hierarchy_id', 0),
+                role=Coalesce(f'{respondent}role_id', 0),
+            )\
+            .values(*EDGE_KEYS)\
+            .annotate(weight=Count('pk'))
+
+    def iter_edges(self):
+        """
+        Yields edges as lists of :data:`EDGE_FIELDS` with node indexes.
+
+        Edges are fetched ``RESPONSES_EXPORT_BATCH_SIZE`` edges per query,
+        see :func:`core.utils.iter_keyset`.
+        """
+        nodes = self.node_indexes
+        for model, shared in ((DatasetTopicShared, True), (DatasetTopicReceived, False)):
+            rows = iter_keyset(
+                self.get_edge_queryset(model),
+                EDGE_KEYS + ['weight'],
+                key=EDGE_KEYS,
+                batch_size=settings.RESPONSES_EXPORT_BATCH_SIZE
+            )
+            for hierarchy_id, role_id, entity_id, dataset_id, topic_id, weight in rows:
+                hierarchy = nodes.get(('hierarchy', hierarchy_id))
+                entity = nodes.get(('entity', entity_id))
+                source, target = (hierarchy, entity) if shared else (entity, hierarchy)
+                yield [source, target, role_id or None, dataset_id, topic_id, weight]
+
+    def to_dict(self):
+        """Returns the graph with compact arrays of nodes and edges."""
+        return {
+            'survey': self.survey.pk,
+            'roles': self.roles,
+            'datasets': self.datasets,
+            'topics': self.topics,
+            'node_fields': NODE_FIELDS,
+            'nodes': self.nodes,
+            'edge_fields': EDGE_FIELDS,
+            'edges': list(self.iter_edges()),
+        }
+
+    def iter_ndjson(self):
+        """
+        Yields the graph as newline delimited JSON objects.
+
+        Roles, datasets, topics and nodes come first, each with a ``type``
+        key, then edges are streamed as they are fetched from the database.
+        """
+        def line(**obj):
+            return json.dumps(obj) + '\n'
+
+        yield line(type='survey', id=self.survey.pk)
+        for kind, rows in (('role', self.roles), ('dataset', self.datasets), ('topic', self.topics)):
+            for pk, name in rows:
+                yield line(type=kind, id=pk, name=name)
+        for index, node in enumerate(self.nodes):
+            yield line(type='node', index=index, **dict(zip(NODE_FIELDS, node)))
+        for edge in self.iter_edges():
+            yield line(type='edge', **dict(zip(EDGE_FIELDS, edge)))
+
+
+def get_dataflow_graph(survey):
+    """Returns the dataflow graph of a survey, see :class:`DataflowGraph`."""
+    return DataflowGraph(survey).to_dict()
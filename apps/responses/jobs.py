@@ -0,0 +1,150 @@
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connection, transaction
+from django.http import HttpRequest
+from django.utils import timezone
+
+from .models import ExportJob
+from .views.exports import EXPORT_VIEWS
+
+logger = logging.getLogger(__name__)
+
+
+def get_export_view(job):
+    """
+    Returns the export view of a job set up to render rows outside of a request.
+    """
+    request = HttpRequest()
+    request.user = job.creator
+
+    view = EXPORT_VIEWS[job.export]()
+    view.setup(request, survey=job.survey_id)
+    view.setup_export(job.survey)
+    return view
+
+
+def fail_stale_export_jobs():
+    """
+    Marks running export jobs whose worker stopped reporting progress as
+    failed, so that the export is rendered again by a new job.
+    """
+    return ExportJob.objects.stale().update(
+        status=ExportJob.FAILED,
+        error='Export job timed out.',
+        finished_at=timezone.now(),
+        modified_at=timezone.now()
+    )
+
+
+def claim_export_job():
+    """
+    Marks the oldest pending export job as running and returns it.
+
+    Rows locked by other workers are skipped so that several workers can
+    process jobs concurrently. Returns ``None`` if there are no pending jobs.
+    Stale running jobs are failed first, see :func:`fail_stale_export_jobs`.
+    """
+    fail_stale_export_jobs()
+
+    with transaction.atomic():
+        job = ExportJob.objects\
+            .pending()\
+            .select_for_update(skip_locked=True, of=('self',))\
+            .select_related('survey__project', 'creator')\
+            .first()
+
+        if job is None:
+            return None
+
+        job.status = ExportJob.RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'modified_at'])
+
+    return job
+
+
+def touch_export_job(job):
+    """
+    Touches the modification time of a running job, which is the heartbeat
+    of its worker, see :func:`fail_stale_export_jobs`.
+    """
+    return ExportJob.objects\
+        .filter(pk=job.pk, status=ExportJob.RUNNING)\
+        .update(modified_at=timezone.now())
+
+
+@contextmanager
+def export_job_heartbeat(job, interval=None):
+    """
+    Touches a running job every ``interval`` seconds, a third of
+    ``RESPONSES_EXPORT_JOB_TIMEOUT`` by default, from a thread of its own.
+
+    Slow queries such as loading survey dimensions or the first batch of
+    rows then do not make the job of a live worker stale.
+    """
+    if interval is None:
+        interval = settings.RESPONSES_EXPORT_JOB_TIMEOUT / 3
+    stopped = threading.Event()
+
+    def beat():
+        try:
+            while not stopped.wait(interval):
+                touch_export_job(job)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def update_export_job_progress(job, last_id, count):
+    """
+    Records number of rows and last fact table row id rendered so far, and
+    touches the modification time of the job.
+    """
+    progress = job.extras.setdefault('progress', {'rows': 0})
+    progress['rows'] += count
+    progress['last_id'] = last_id
+    ExportJob.objects.filter(pk=job.pk).update(extras=job.extras, modified_at=timezone.now())
+
+
+def render_export_job(job):
+    """
+    Renders export rows of a job to its file in the default file storage.
+
+    Rows are spooled to a temporary file so that memory usage stays flat
+    regardless of the export size. The job is touched before rendering and
+    periodically while rendering, see :func:`export_job_heartbeat`.
+    """
+    touch_export_job(job)
+    try:
+        with export_job_heartbeat(job), tempfile.TemporaryFile() as f:
+            view = get_export_view(job)
+            view.on_batch = partial(update_export_job_progress, job)
+            for chunk in view.iter_csv():
+                f.write(chunk.encode())
+
+            f.seek(0)
+            job.filename = view.get_filename()
+            job.file.save(f'{job.uuid}.csv', File(f), save=False)
+    except Exception as e:
+        logger.exception('Export job %s failed', job.pk)
+        job.status = ExportJob.FAILED
+        job.error = str(e)
+    else:
+        job.status = ExportJob.COMPLETED
+
+    job.finished_at = timezone.now()
+    job.save()
+    return job
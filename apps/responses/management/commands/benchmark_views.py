@@ -0,0 +1,88 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.surveys.models import Survey
+
+from ...benchmarks import compare_results, run_benchmarks
+from ...synthetic import SurveyDataGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures wall time, query count and peak memory of survey export, listing '
+        'and respondent pages and writes them to a JSON baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--survey',
+            type=int,
+            help='Primary key of the benchmarked survey, a synthetic survey is generated by default.',
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10000,
+            help='Approximate number of export fact rows of a generated survey (default: 10000).',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Number of timed requests of each page, the median is recorded (default: 3).',
+        )
+        parser.add_argument(
+            '--output',
+            help='Path of the JSON file the results are written to.',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Path of a JSON baseline, the command fails if any page regressed.',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Allowed relative increase of wall time and peak memory (default: 0.25).',
+        )
+
+    def handle(self, *args, **options):
+        if options['survey']:
+            try:
+                survey = Survey.objects.select_related('project').get(pk=options['survey'])
+            except Survey.DoesNotExist:
+                raise CommandError(f"Survey {options['survey']} does not exist.")
+        else:
+            project = SurveyDataGenerator(rows=options['rows']).generate()
+            survey = project.surveys.select_related('project').get()
+
+        facilitator = survey.project.facilitators.filter(is_facilitator=True).first()
+        if facilitator is None:
+            raise CommandError(f'Survey {survey.pk} has no facilitators.')
+
+        def report(benchmark, result):
+            self.stdout.write(
+                f"{benchmark.name:<40} {result['status']} {result['time'] * 1000:10.1f}ms "
+                f"{result['queries']:5d} queries {result['peak_memory'] / 1024:10.0f}KiB"
+            )
+
+        results = run_benchmarks(survey, facilitator, options['repeat'], callback=report)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'created_at': timezone.now().isoformat(),
+                    'survey': survey.pk,
+                    'results': results,
+                }, f, indent=2, sort_keys=True)
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)['results']
+
+            regressions = compare_results(baseline, results, options['tolerance'])
+            if regressions:
+                raise CommandError('Regressions compared to the baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions compared to the baseline.'))
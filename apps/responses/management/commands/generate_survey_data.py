@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.models import User
+
+from ...synthetic import SurveyDataGenerator
+
+
+class Command(BaseCommand):
+    help = 'Generates a project with surveys filled with synthetic responses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10000,
+            help='Approximate number of export fact rows per survey (default: 10000).',
+        )
+        parser.add_argument(
+            '--surveys',
+            type=int,
+            default=1,
+            help='Number of surveys in the project (default: 1).',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of the random generator (default: 0).',
+        )
+        parser.add_argument(
+            '--facilitator',
+            help='Username of the project facilitator, a new facilitator is created by default.',
+        )
+
+    def handle(self, *args, **options):
+        creator = None
+        if options['facilitator']:
+            try:
+                creator = User.objects.get(username=options['facilitator'], is_facilitator=True)
+            except User.DoesNotExist:
+                raise CommandError(f"Facilitator {options['facilitator']!r} does not exist.")
+
+        generator = SurveyDataGenerator(
+            rows=options['rows'],
+            surveys=options['surveys'],
+            seed=options['seed'],
+            creator=creator
+        )
+        project = generator.generate()
+
+        self.stdout.write(f'Project {project.pk} created by {generator.creator.username}.')
+        for survey in project.surveys.order_by('pk'):
+            self.stdout.write(f'Survey {survey.pk} with {generator.respondent_count} respondents.')
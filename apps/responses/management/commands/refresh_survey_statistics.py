@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from apps.surveys.models import Survey
+
+from ...models import SurveyStatistics
+
+
+class Command(BaseCommand):
+    help = 'Computes survey statistics from scratch, e.g. after responses were imported in bulk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--survey',
+            type=int,
+            action='append',
+            help='Id of a survey to refresh, all surveys are refreshed by default.',
+        )
+
+    def handle(self, *args, **options):
+        surveys = Survey.objects.order_by('pk')
+        if options['survey']:
+            surveys = surveys.filter(pk__in=options['survey'])
+
+        for survey_id in surveys.values_list('pk', flat=True).iterator():
+            statistics, refreshed = SurveyStatistics.get_for_survey(survey_id)
+            if not refreshed:
+                statistics.refresh()
+            self.stdout.write(f'Survey {survey_id} statistics refreshed.')
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...jobs import claim_export_job, render_export_job
+
+
+class Command(BaseCommand):
+    help = 'Renders pending survey export jobs to the default file storage.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once there are no pending jobs instead of waiting for new ones.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5,
+            help='Seconds to wait before checking for new jobs (default: 5).',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_export_job()
+
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
+                continue
+
+            render_export_job(job)
+            self.stdout.write(f'Export job {job.pk} {job.status}.')
@@ -1,5 +1,9 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
 from django.db.models import Case, CharField, Q, Value, When
+from django.utils import timezone
 
 
 class SurveyResponseQuerySet(models.QuerySet):
@@ -39,3 +43,46 @@ class SurveyResponseManager(models.Manager):
 
     def with_status(self):
         return self.get_queryset().with_status()
+
+
+class ExportJobQuerySet(models.QuerySet):
+
+    def pending(self):
+        """Returns a queryset of jobs waiting to be rendered, oldest first."""
+        return self.filter(status=self.model.PENDING).order_by('created_at')
+
+    def stale(self):
+        """
+        Returns a queryset of running jobs whose worker has not reported
+        progress for ``RESPONSES_EXPORT_JOB_TIMEOUT`` seconds, most likely
+        because it was killed.
+        """
+        timeout = timezone.now() - timedelta(seconds=settings.RESPONSES_EXPORT_JOB_TIMEOUT)
+        return self.filter(status=self.model.RUNNING, modified_at__lt=timeout)
+
+    def reusable(self, survey, export, snapshot):
+        """
+        Returns a queryset of completed or unfinished jobs of an export
+        which can be reused for the survey snapshot, latest first.
+        """
+        return self\
+            .filter(survey=survey, export=export, snapshot=snapshot)\
+            .exclude(status=self.model.FAILED)\
+            .exclude(pk__in=self.stale().values('pk'))\
+            .order_by('-created_at')
+
+
+class ExportJobManager(models.Manager):
+    """Export Job model manager."""
+
+    def get_queryset(self):
+        return ExportJobQuerySet(self.model, using=self._db)
+
+    def pending(self):
+        return self.get_queryset().pending()
+
+    def stale(self):
+        return self.get_queryset().stale()
+
+    def reusable(self, survey, export, snapshot):
+        return self.get_queryset().reusable(survey, export, snapshot)
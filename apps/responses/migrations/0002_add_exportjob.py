@@ -0,0 +1,44 @@
+# Generated by Django 3.0.14 on 2026-10-17 19:14
+
+from django.conf import settings
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0002_add_survey_allow_respondent_roles'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('responses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='modified at')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='UUID')),
+                ('export', models.CharField(choices=[('dataset-shared-list', 'Entities & information shared to'), ('dataset-received-list', 'Entities & information received from'), ('dataset-shared-received-list', 'Entities & information shared & received'), ('dataset-storage-access-list', 'Information storage & access'), ('dataset-response-list', 'Information encounter frequency')], max_length=50, verbose_name='export')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20, verbose_name='status')),
+                ('snapshot', models.CharField(blank=True, db_index=True, max_length=64, verbose_name='snapshot')),
+                ('file', models.FileField(blank=True, upload_to='exports/%Y/%m/', verbose_name='file')),
+                ('filename', models.CharField(blank=True, max_length=255, verbose_name='filename')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='started at')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='finished at')),
+                ('error', models.TextField(blank=True, verbose_name='error')),
+                ('extras', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, verbose_name='extras')),
+                ('creator', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_export_jobs', related_query_name='created_export_job', to=settings.AUTH_USER_MODEL, verbose_name='creator')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', related_query_name='export_job', to='surveys.Survey', verbose_name='survey')),
+            ],
+            options={
+                'verbose_name': 'Export Job',
+                'verbose_name_plural': 'Export Jobs',
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.0.14 on 2026-10-17 19:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0002_add_survey_allow_respondent_roles'),
+        ('responses', '0002_add_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportTombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='modified at')),
+                ('model', models.CharField(max_length=100, verbose_name='model')),
+                ('object_id', models.PositiveIntegerField(verbose_name='object id')),
+                ('survey', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='export_tombstones', related_query_name='export_tombstone', to='surveys.Survey', verbose_name='survey')),
+            ],
+            options={
+                'verbose_name': 'Export Tombstone',
+                'verbose_name_plural': 'Export Tombstones',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='exporttombstone',
+            index=models.Index(fields=['survey', 'model', 'created_at'], name='responses_e_survey__e8821d_idx'),
+        ),
+    ]
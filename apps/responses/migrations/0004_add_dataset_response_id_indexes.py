@@ -0,0 +1,21 @@
+# Generated by Django 3.0.14 on 2026-10-17 19:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('responses', '0003_add_exporttombstone'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='datasettopicreceived',
+            index=models.Index(fields=['dataset_response', 'id'], name='responses_d_dataset_91b4d2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datasettopicshared',
+            index=models.Index(fields=['dataset_response', 'id'], name='responses_d_dataset_da87fe_idx'),
+        ),
+    ]
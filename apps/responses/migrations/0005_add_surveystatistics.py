@@ -0,0 +1,36 @@
+# Generated by Django 3.0.14 on 2026-10-17 19:49
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0003_add_dataflowhierarchy_paths'),
+        ('responses', '0004_add_dataset_response_id_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyStatistics',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='created at')),
+                ('modified_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='modified at')),
+                ('respondent_count', models.PositiveIntegerField(default=0, verbose_name='respondents')),
+                ('not_started_count', models.PositiveIntegerField(default=0, verbose_name='not started')),
+                ('in_progress_count', models.PositiveIntegerField(default=0, verbose_name='in progress')),
+                ('completed_count', models.PositiveIntegerField(default=0, verbose_name='completed')),
+                ('completions', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, verbose_name='completions per day')),
+                ('dataset_counts', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, verbose_name='completed responses per dataset')),
+                ('topic_counts', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, verbose_name='completed responses per topic')),
+                ('survey', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='surveys.Survey', verbose_name='survey')),
+            ],
+            options={
+                'verbose_name': 'Survey Statistics',
+                'verbose_name_plural': 'Survey Statistics',
+            },
+        ),
+    ]
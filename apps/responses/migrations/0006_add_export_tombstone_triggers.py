@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# Deleted rows of each table and joins from them to their survey response.
+TOMBSTONE_TABLES = {
+    'responses_datasetresponse': (
+        'responses.datasetresponse',
+        'JOIN responses_surveyresponse r ON r.id = d.response_id',
+    ),
+    'responses_datasettopicshared': (
+        'responses.datasettopicshared',
+        'JOIN responses_datasetresponse dr ON dr.id = d.dataset_response_id '
+        'JOIN responses_surveyresponse r ON r.id = dr.response_id',
+    ),
+    'responses_datasettopicreceived': (
+        'responses.datasettopicreceived',
+        'JOIN responses_datasetresponse dr ON dr.id = d.dataset_response_id '
+        'JOIN responses_surveyresponse r ON r.id = dr.response_id',
+    ),
+    'responses_datasettopicstorageaccess': (
+        'responses.datasettopicstorageaccess',
+        'JOIN responses_datasettopicresponse tr ON tr.id = d.response_id '
+        'JOIN responses_datasetresponse dr ON dr.id = tr.dataset_response_id '
+        'JOIN responses_surveyresponse r ON r.id = dr.response_id',
+    ),
+}
+
+CREATE_TRIGGER = """
+CREATE FUNCTION {table}_add_tombstones() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO responses_exporttombstone (created_at, modified_at, survey_id, model, object_id)
+    SELECT statement_timestamp(), statement_timestamp(), r.survey_id, '{model}', d.id
+    FROM deleted_rows d {joins};
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER {table}_add_tombstones
+    AFTER DELETE ON {table}
+    REFERENCING OLD TABLE AS deleted_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE {table}_add_tombstones();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER {table}_add_tombstones ON {table};
+DROP FUNCTION {table}_add_tombstones();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('responses', '0005_add_surveystatistics'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            CREATE_TRIGGER.format(table=table, model=model, joins=joins),
+            DROP_TRIGGER.format(table=table)
+        )
+        for table, (model, joins) in TOMBSTONE_TABLES.items()
+    ]
@@ -0,0 +1,104 @@
+from django.db import migrations
+
+# Foreign key and parent table of each table below a survey response.
+PARENT_TABLES = {
+    'responses_datasetresponse': ('response_id', 'responses_surveyresponse'),
+    'responses_datasettopicresponse': ('dataset_response_id', 'responses_datasetresponse'),
+    'responses_datasettopicshared': ('dataset_response_id', 'responses_datasetresponse'),
+    'responses_datasettopicreceived': ('dataset_response_id', 'responses_datasetresponse'),
+    'responses_datasettopicstorageaccess': ('response_id', 'responses_datasettopicresponse'),
+}
+
+# Model labels of tables whose deleted rows are recorded as tombstones.
+TOMBSTONE_MODELS = {
+    'responses_datasetresponse': 'responses.datasetresponse',
+    'responses_datasettopicshared': 'responses.datasettopicshared',
+    'responses_datasettopicreceived': 'responses.datasettopicreceived',
+    'responses_datasettopicstorageaccess': 'responses.datasettopicstorageaccess',
+}
+
+# Tables deleted before their children by raw or parent-first deletes, and
+# which therefore also record tombstones of descendant rows still present.
+PARENT_TRIGGER_TABLES = ['responses_surveyresponse', 'responses_datasettopicresponse']
+
+CREATE_FUNCTION = """
+CREATE OR REPLACE FUNCTION {table}_add_tombstones() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO responses_exporttombstone (created_at, modified_at, survey_id, model, object_id)
+    {selects};
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+CREATE_TRIGGER = """
+CREATE TRIGGER {table}_add_tombstones
+    AFTER DELETE ON {table}
+    REFERENCING OLD TABLE AS deleted_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE {table}_add_tombstones();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER {table}_add_tombstones ON {table};
+DROP FUNCTION {table}_add_tombstones();
+"""
+
+
+def get_ancestors(table):
+    """Return the table followed by its ancestor tables up to survey responses."""
+    tables = [table]
+    while tables[-1] in PARENT_TABLES:
+        tables.append(PARENT_TABLES[tables[-1]][1])
+    return tables
+
+
+def get_select(table, tombstone_table):
+    """Return the select of tombstones of ``tombstone_table`` rows deleted along with rows of ``table``.
+
+    Rows of ``tombstone_table`` are joined down from the deleted rows and the
+    survey up from them, so that the survey of deleted survey responses is
+    read from the deleted rows themselves.
+    """
+    ancestors = get_ancestors(tombstone_table)
+    descendants = ancestors[:ancestors.index(table)][::-1]
+    joins = []
+    object_alias = 'd'
+    for i, child in enumerate(descendants):
+        joins.append(f'JOIN {child} c{i} ON c{i}.{PARENT_TABLES[child][0]} = {object_alias}.id')
+        object_alias = f'c{i}'
+
+    alias, alias_table = 'd', table
+    for i, parent in enumerate(get_ancestors(table)[1:]):
+        joins.append(f'JOIN {parent} p{i} ON p{i}.id = {alias}.{PARENT_TABLES[alias_table][0]}')
+        alias, alias_table = f'p{i}', parent
+
+    return (
+        f"SELECT statement_timestamp(), statement_timestamp(), {alias}.survey_id, "
+        f"'{TOMBSTONE_MODELS[tombstone_table]}', {object_alias}.id "
+        f"FROM deleted_rows d {' '.join(joins)}"
+    )
+
+
+def get_function(table, descendants=True):
+    """Return the trigger function recording tombstones of rows deleted along with rows of ``table``."""
+    tombstone_tables = [
+        tombstone_table for tombstone_table in TOMBSTONE_MODELS
+        if tombstone_table == table or (descendants and table in get_ancestors(tombstone_table))
+    ]
+    selects = '\n    UNION ALL '.join(get_select(table, tombstone_table) for tombstone_table in tombstone_tables)
+    return CREATE_FUNCTION.format(table=table, selects=selects)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('responses', '0006_add_export_tombstone_triggers'),
+    ]
+
+    operations = [
+        migrations.RunSQL(get_function(table), get_function(table, descendants=False))
+        for table in TOMBSTONE_MODELS
+    ] + [
+        migrations.RunSQL(get_function(table) + CREATE_TRIGGER.format(table=table), DROP_TRIGGER.format(table=table))
+        for table in PARENT_TRIGGER_TABLES
+    ]
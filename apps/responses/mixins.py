@@ -1,3 +1,4 @@
+from django.core import signing
 from django.core.exceptions import PermissionDenied
 from django.http import Http404
 from django.utils.translation import ugettext_lazy as _
@@ -5,6 +6,7 @@ from django.utils.translation import ugettext_lazy as _
 from dateutil.parser import ParserError as DateTimeParserError
 from dateutil.parser import parse as parse_datetime
 
+from apps.surveys.configuration import get_version
 from apps.surveys.models import Survey
 from core.exceptions import NotAuthenticated
 from core.mixins import FacilitatorMixin
@@ -24,7 +26,62 @@ class ResponseFacilitatorMixin(FacilitatorMixin):
         return self.model.objects.filter(survey__project__facilitators=self.request.user)
 
 
-class ConsentCheckMixin:
+class SessionSurveyMixin:
+    """
+    Provides access to details of surveys kept in the respondent's session,
+    ``request.session['surveys'][<survey id>]``.
+    """
+
+    def get_session_survey(self, survey):
+        """Returns session details of the survey."""
+        return self.request.session.get('surveys', {}).get(str(survey.pk), {})
+
+    def update_session_survey(self, survey, **kwargs):
+        """Updates session details of the survey."""
+        session_surveys = self.request.session.get('surveys', {})
+        session_surveys.setdefault(str(survey.pk), {}).update(kwargs)
+        self.request.session['surveys'] = session_surveys
+
+
+class ResumePathMixin(SessionSurveyMixin):
+    """
+    Keeps resume paths of survey responses which are not written yet, see
+    :meth:`.SurveyResponse.set_resume_path`, in the respondent's session.
+    """
+
+    def get_resume_path(self, survey_response):
+        """Returns the latest resume path of the survey response."""
+        resume_paths = self.get_session_survey(survey_response.survey).get('resume_paths', {})
+        return resume_paths.get(str(survey_response.pk)) or survey_response.get_resume_path()
+
+    def set_resume_path(self, survey_response, path=None):
+        """
+        Set resume path of the survey response, the current path by default,
+        keeping it in the session until it is written.
+        """
+        path = path or self.request.get_full_path()
+        written = survey_response.set_resume_path(path)
+
+        key = str(survey_response.pk)
+        resume_paths = dict(self.get_session_survey(survey_response.survey).get('resume_paths', {}))
+        if written:
+            changed = resume_paths.pop(key, None) is not None
+        else:
+            changed = resume_paths.get(key) != path
+            resume_paths[key] = path
+        if changed:
+            self.update_session_survey(survey_response.survey, resume_paths=resume_paths)
+
+    def pop_resume_path(self, survey_response):
+        """Removes the resume path of the survey response from the session."""
+        resume_paths = dict(self.get_session_survey(survey_response.survey).get('resume_paths', {}))
+        resume_path = resume_paths.pop(str(survey_response.pk), None)
+        if resume_path:
+            self.update_session_survey(survey_response.survey, resume_paths=resume_paths)
+        return resume_path
+
+
+class ConsentCheckMixin(SessionSurveyMixin):
 
     def get_consent(self, respondent=None, survey=None):
         """
@@ -36,28 +93,30 @@ class ConsentCheckMixin:
         survey = survey or self.survey
 
         # Check session
-        session_surveys = self.request.session.get('surveys', {})
-        session_survey = session_surveys.get(str(survey.pk), {})
-        _consented_at = session_survey.get('consented_at')
+        _consented_at = self.get_session_survey(survey).get('consented_at')
         if _consented_at:
             try:
                 return parse_datetime(_consented_at)
             except DateTimeParserError:
                 pass
 
-        # Check pre existing responses
+        # Check pre existing responses, keeping the consent in the session
         latest_response = respondent.get_latest_response()
-        if latest_response:
+        if latest_response and latest_response.consented_at:
+            self.update_session_survey(survey, consented_at=latest_response.consented_at.isoformat())
             return latest_response.consented_at
 
         return None
 
 
-class RespondentSurveyMixin:
+class RespondentSurveyMixin(SessionSurveyMixin):
     """
     Provides ability to retrive a Survey object for user as a respondent.
     """
 
+    #: Salt of signed eligibility tokens kept in the session.
+    eligibility_salt = 'apps.responses.eligibility'
+
     #: Survey field to be queried against
     survey_lookup_field = 'pk'
 
@@ -105,11 +164,54 @@ class RespondentSurveyMixin:
         if not self.request.user.is_authenticated and survey.login_required:
             raise NotAuthenticated
 
-        if survey.invitation_required and (
-                not self.request.user.is_authenticated
+        if not survey.invitation_required or self.has_eligibility_token(survey):
+            return
+
+        if (not self.request.user.is_authenticated
                 or not survey.respondents.filter(user=self.request.user).exists()):
             raise PermissionDenied(_('You are not allowed to take this survey'))
 
+        self.set_eligibility_token(survey)
+
+    def get_eligibility_scope(self, survey):
+        """
+        Returns what an eligibility token is valid for, the survey and its
+        version, the respondent of the view and the user.
+
+        Tokens are revoked by any change of the survey, including unpublishing,
+        and a deleted respondent can no longer be the respondent of a view.
+        """
+        respondent = getattr(self, 'respondent', None)
+        return {
+            'survey': survey.pk,
+            'version': get_version(survey),
+            'respondent': respondent.pk if respondent else None,
+            'user': self.request.user.pk,
+        }
+
+    def get_eligibility_key(self):
+        """Returns key of the eligibility token of the view respondent."""
+        respondent = getattr(self, 'respondent', None)
+        return str(respondent.pk) if respondent else ''
+
+    def has_eligibility_token(self, survey):
+        """Check if the session has a valid eligibility token for the survey."""
+        token = self.get_session_survey(survey).get('eligibility', {}).get(self.get_eligibility_key())
+        if not token:
+            return False
+
+        try:
+            return signing.loads(token, salt=self.eligibility_salt) == self.get_eligibility_scope(survey)
+        except signing.BadSignature:
+            return False
+
+    def set_eligibility_token(self, survey):
+        """Keep a signed eligibility token for the survey in the session."""
+        tokens = dict(self.get_session_survey(survey).get('eligibility', {}))
+        scope = self.get_eligibility_scope(survey)
+        tokens[self.get_eligibility_key()] = signing.dumps(scope, salt=self.eligibility_salt)
+        self.update_session_survey(survey, eligibility=tokens)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
@@ -2,13 +2,21 @@ import uuid
 
 from django.conf import settings
 from django.contrib.postgres.fields import JSONField
-from django.db import models
+from django.contrib.postgres.fields.jsonb import KeyTransform
+from django.db import models, transaction
+from django.db.models import Count, F, Func, Value
+from django.db.models.functions import Cast, Coalesce, TruncDate
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.translation import ugettext_lazy as _
 
+from apps.respondents.models import Respondent
 from apps.surveys.models import Dataset
 from core.models import TimeStampedModel
+from core.utils import get_adjacent
 
-from .managers import SurveyResponseManager
+from .managers import ExportJobManager, SurveyResponseManager
 
 
 class SurveyResponse(TimeStampedModel):
@@ -93,6 +101,23 @@ class SurveyResponse(TimeStampedModel):
     def __str__(self):
         return f'{self.survey.display_name} response'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the saved status, survey statistics are updated when it changes
+        if 'consented_at' in field_names and 'completed_at' in field_names:
+            instance._saved_status = (instance.consented_at, instance.completed_at)
+        return instance
+
+    @classmethod
+    def get_status(cls, consented_at, completed_at):
+        """Returns status of a response, as annotated by :meth:`.SurveyResponseQuerySet.with_status`."""
+        if completed_at is not None:
+            return cls.COMPLETED
+        if consented_at is not None:
+            return cls.IN_PROGRESS
+        return cls.NOT_STARTED
+
     def get_datasets(self, topic=False):
         """
         Get queryset of datasets associated with this response.
@@ -107,29 +132,206 @@ class SurveyResponse(TimeStampedModel):
         return Dataset.objects.filter(response__response=self)
 
     def set_dataset_responses(self, datasets):
-        """Created or delete dataset responses according to the datasets."""
-
-        # remove existing datasets responses according to the datasets.
-        self.dataset_responses.exclude(dataset__in=datasets).delete()
+        """
+        Create or delete dataset responses and their dataset-topic responses
+        according to the datasets.
 
-        # get old dataset responses
-        old_datasets = self.get_datasets()
+        Topics of the datasets, or topics of the survey for datasets without
+        topics, are loaded at once and compared with existing responses in
+        memory. Unwanted responses are then deleted and missing ones are
+        created in bulk, see also :meth:`set_navigation_plan`.
+        """
+        dataset_ids = [dataset.pk for dataset in datasets]
+
+        # wanted topics of every dataset
+        wanted = {dataset_id: set() for dataset_id in dataset_ids}
+        dataset_topics = Dataset.topics.through.objects\
+            .filter(dataset__in=dataset_ids)\
+            .values_list('dataset_id', 'topic_id')
+        for dataset_id, topic_id in dataset_topics:
+            wanted[dataset_id].add(topic_id)
+        if not all(wanted.values()):
+            survey_topic_ids = set(self.survey.topics.values_list('pk', flat=True))
+            for topic_ids in wanted.values():
+                if not topic_ids:
+                    topic_ids.update(survey_topic_ids)
+
+        # existing dataset responses and their topics
+        existing = {}
+        counted_datasets, counted_topics = set(), set()
+        unwanted_dataset_response_ids = []
+        unwanted_topic_response_ids = []
+        rows = self.dataset_responses.values_list(
+            'pk', 'dataset_id', 'topic_response__pk', 'topic_response__topic_id'
+        )
+        for dataset_response_id, dataset_id, topic_response_id, topic_id in rows:
+            counted_datasets.add(dataset_id)
+            if topic_id is not None:
+                counted_topics.add(topic_id)
+            if dataset_id not in wanted:
+                unwanted_dataset_response_ids.append(dataset_response_id)
+                continue
+            topic_responses = existing.setdefault(dataset_id, (dataset_response_id, {}))[1]
+            if topic_response_id is None:
+                continue
+            if topic_id in wanted[dataset_id]:
+                topic_responses[topic_id] = topic_response_id
+            else:
+                unwanted_topic_response_ids.append(topic_response_id)
+
+        # remove unwanted dataset and dataset-topic responses
+        if unwanted_dataset_response_ids:
+            DatasetResponse.objects.filter(pk__in=unwanted_dataset_response_ids).delete()
+        if unwanted_topic_response_ids:
+            DatasetTopicResponse.objects.filter(pk__in=unwanted_topic_response_ids).delete()
 
         # add newly added datasets
-        for dataset in datasets:
-            if dataset not in old_datasets:
-                self.dataset_responses.create(dataset=dataset)
+        new_dataset_responses = DatasetResponse.objects.bulk_create([
+            DatasetResponse(response=self, dataset_id=dataset_id)
+            for dataset_id in dataset_ids
+            if dataset_id not in existing
+        ])
+        for dataset_response in new_dataset_responses:
+            existing[dataset_response.dataset_id] = (dataset_response.pk, {})
 
-        # set topic responses
-        for dataset_response in self.dataset_responses.all():
-            dataset_response.set_topic_responses()
+        # add missing topic responses
+        new_topic_responses = DatasetTopicResponse.objects.bulk_create([
+            DatasetTopicResponse(dataset_response_id=dataset_response_id, topic_id=topic_id)
+            for dataset_id, (dataset_response_id, topic_responses) in existing.items()
+            for topic_id in sorted(wanted[dataset_id] - topic_responses.keys())
+        ])
+        topic_response_ids = {
+            dataset_response_id: list(topic_responses.values())
+            for dataset_response_id, topic_responses in existing.values()
+        }
+        for topic_response in new_topic_responses:
+            topic_response_ids[topic_response.dataset_response_id].append(topic_response.pk)
+
+        # navigation plan is known without loading the responses again
+        self.set_state(plan=[
+            [dataset_response_id, sorted(topic_response_ids[dataset_response_id])]
+            for dataset_response_id in sorted(topic_response_ids)
+        ])
+
+        # bulk changes bypass signals, so datasets and topics of completed
+        # responses are counted again here
+        if self.completed_at:
+            SurveyStatistics.update_response_datasets(
+                self.survey_id,
+                (counted_datasets, counted_topics),
+                (set(dataset_ids), set().union(*wanted.values()))
+            )
+
+    def set_state(self, **kwargs):
+        """
+        Update keys of the ``_state`` extras of the response.
 
-    def set_resume_path(self, path):
-        """Set resume URL path for the response."""
+        Only the given keys of ``_state`` are written, with ``jsonb_set``,
+        rather than the whole extras of the response.
+        """
         _state = self.extras.get('_state', {})
-        _state['resume_path'] = path
+        _state.update(kwargs)
         self.extras['_state'] = _state
-        self.__class__.objects.filter(id=self.id).update(extras=self.extras)
+
+        empty = Cast(Value({}, output_field=JSONField()), JSONField())
+        state = Func(
+            Coalesce(KeyTransform('_state', 'extras'), empty, output_field=JSONField()),
+            Cast(Value(kwargs, output_field=JSONField()), JSONField()),
+            template='%(expressions)s', arg_joiner=' || ', output_field=JSONField()
+        )
+        extras = Func(F('extras'), Value(['_state']), state, function='jsonb_set', output_field=JSONField())
+        self.__class__.objects.filter(id=self.id).update(extras=extras)
+
+    def set_resume_path(self, path):
+        """
+        Set resume URL path for the response.
+
+        Paths are written at most once per ``RESPONSES_RESUME_PATH_WRITE_INTERVAL``
+        seconds. Returns ``True`` if the path was written, otherwise callers
+        keep it until the next write, see
+        :class:`~apps.responses.mixins.ResumePathMixin`.
+        """
+        _state = self.extras.get('_state', {})
+        if path == _state.get('resume_path'):
+            return True
+
+        now = timezone.now()
+        written_at = _state.get('resume_written_at')
+        interval = settings.RESPONSES_RESUME_PATH_WRITE_INTERVAL
+        if written_at and (now - parse_datetime(written_at)).total_seconds() < interval:
+            return False
+
+        self.set_state(resume_path=path, resume_written_at=now.isoformat())
+        return True
+
+    def get_resume_path(self):
+        """Get the written resume URL path of the response."""
+        return self.extras.get('_state', {}).get('resume_path')
+
+    def complete(self, resume_path=None):
+        """
+        Set completion time of the response along with its latest resume
+        URL path if given, both are written when the response is saved.
+        """
+        if resume_path:
+            self.extras.setdefault('_state', {})['resume_path'] = resume_path
+        self.completed_at = timezone.now()
+
+    def set_navigation_plan(self):
+        """
+        Store ordered ids of dataset responses and their topic responses,
+        ``[[dataset_response_id, [topic_response_id, ...]], ...]``, in the
+        order respondents go through them.
+        """
+        plan = []
+        rows = self.dataset_responses\
+            .order_by('pk', 'topic_response__pk')\
+            .values_list('pk', 'topic_response__pk')
+        for dataset_response_id, topic_response_id in rows:
+            if not plan or plan[-1][0] != dataset_response_id:
+                plan.append([dataset_response_id, []])
+            if topic_response_id is not None:
+                plan[-1][1].append(topic_response_id)
+
+        self.set_state(plan=plan)
+        return plan
+
+    def get_navigation_plan(self, dataset_response_id=None):
+        """
+        Get the navigation plan of the response, see :meth:`set_navigation_plan`.
+
+        The plan is stored when datasets are selected and it is built again
+        if it is missing or does not include ``dataset_response_id``, so
+        next and back URLs of the respondent pages need no queries.
+        """
+        plan = self.extras.get('_state', {}).get('plan')
+        if plan is None or (
+            dataset_response_id is not None and dataset_response_id not in (step[0] for step in plan)
+        ):
+            plan = self.set_navigation_plan()
+        return plan
+
+    def get_dataset_response_step(self, dataset_response_id):
+        """
+        Get ids of the previous and the next dataset responses and the topic
+        responses of a dataset response from the navigation plan, ``None``
+        when there is no previous or next dataset response.
+        """
+        plan = self.get_navigation_plan(dataset_response_id)
+        steps = dict(plan)
+        previous_id, next_id = get_adjacent([step[0] for step in plan], dataset_response_id)
+        return previous_id, steps[dataset_response_id], next_id
+
+    def get_topic_response_step(self, dataset_response_id, topic_response_id):
+        """
+        Get ids of the previous and the next topic responses of the same
+        dataset response from the navigation plan, ``None`` when there is
+        no previous or next topic response.
+        """
+        topic_response_ids = self.get_dataset_response_step(dataset_response_id)[1]
+        if topic_response_id not in topic_response_ids:
+            topic_response_ids = dict(self.set_navigation_plan())[dataset_response_id]
+        return get_adjacent(topic_response_ids, topic_response_id)
 
 
 class DatasetResponse(TimeStampedModel):
@@ -221,24 +423,6 @@ class DatasetResponse(TimeStampedModel):
     def get_previous_in_response(self):
         return self.response.dataset_responses.filter(pk__lt=self.pk).order_by('-pk').first()
 
-    def set_topic_responses(self):
-        """Created or delete dataset-topic responses for the dataset."""
-
-        # get dataset topics
-        topics = self.dataset.topics.all() or self.survey.topics.all()
-
-        # remove existing dataset-topic unwanted topic responses.
-        self.topic_responses.exclude(topic__in=topics).delete()
-
-        # get old topics
-        old_topics = list(self.topic_responses.values_list('topic_id', flat=True))
-
-        # add missing topic responses
-        for topic in topics:
-            if topic.id not in old_topics:
-                self.topic_responses
-                self.topic_responses.create(topic=topic)
-
 
 class DatasetTopicResponse(TimeStampedModel):
     """A survey response related to a specific :class:`.Dataset`
@@ -445,6 +629,9 @@ class DatasetTopicShared(TimeStampedModel):
     class Meta:
         verbose_name = _('Dataset Topic Shared')
         verbose_name_plural = _('Dataset Topics Shared')
+        indexes = [
+            models.Index(fields=['dataset_response', 'id']),
+        ]
 
     def __str__(self):
         return f'{self.entity} - {self.topic}'
@@ -481,6 +668,9 @@ class DatasetTopicReceived(TimeStampedModel):
     class Meta:
         verbose_name = _('Dataset Topic Received')
         verbose_name_plural = _('Dataset Topics Received')
+        indexes = [
+            models.Index(fields=['dataset_response', 'id']),
+        ]
 
     def __str__(self):
         return f'{self.entity} - {self.topic}'
@@ -489,3 +679,329 @@ class DatasetTopicReceived(TimeStampedModel):
     def dataset(self):
         """The dataset."""
         return self.dataset_response.dataset
+
+
+class ExportJob(TimeStampedModel):
+    """A survey export rendered in the background.
+
+    Jobs are created by facilitators and picked up by the ``run_export_jobs``
+    management command which renders rows of the corresponding export view
+    to :attr:`~file` in the default file storage.
+
+    :attr:`~snapshot` fingerprints the survey data the job was created for,
+    so that repeated exports of an unchanged survey reuse the stored file.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (RUNNING, _('Running')),
+        (COMPLETED, _('Completed')),
+        (FAILED, _('Failed')),
+    )
+
+    DATASET_SHARED = 'dataset-shared-list'
+    DATASET_RECEIVED = 'dataset-received-list'
+    DATASET_SHARED_RECEIVED = 'dataset-shared-received-list'
+    DATASET_STORAGE_ACCESS = 'dataset-storage-access-list'
+    DATASET_RESPONSE = 'dataset-response-list'
+
+    EXPORT_CHOICES = (
+        (DATASET_SHARED, _('Entities & information shared to')),
+        (DATASET_RECEIVED, _('Entities & information received from')),
+        (DATASET_SHARED_RECEIVED, _('Entities & information shared & received')),
+        (DATASET_STORAGE_ACCESS, _('Information storage & access')),
+        (DATASET_RESPONSE, _('Information encounter frequency')),
+    )
+
+    #: Export job UUID.
+    uuid = models.UUIDField(
+        _('UUID'),
+        default=uuid.uuid4,
+        editable=False,
+        unique=True
+    )
+
+    #: Survey being exported.
+    survey = models.ForeignKey(
+        'surveys.Survey',
+        related_name='export_jobs',
+        related_query_name='export_job',
+        verbose_name=_('survey'),
+        on_delete=models.CASCADE
+    )
+
+    #: User who requested the export.
+    creator = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name=_('creator'),
+        null=True,
+        blank=True,
+        related_name='created_export_jobs',
+        related_query_name='created_export_job',
+        on_delete=models.SET_NULL
+    )
+
+    #: Export to be rendered, this is the URL name of the export view.
+    export = models.CharField(_('export'), max_length=50, choices=EXPORT_CHOICES)
+
+    #: Job status.
+    status = models.CharField(_('status'), max_length=20, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+
+    #: Fingerprint of the survey data at the time the job was created.
+    snapshot = models.CharField(_('snapshot'), max_length=64, blank=True, db_index=True)
+
+    #: Rendered export file.
+    file = models.FileField(_('file'), upload_to='exports/%Y/%m/', blank=True)
+
+    #: Download file name.
+    filename = models.CharField(_('filename'), max_length=255, blank=True)
+
+    #: Date and time when rendering started.
+    started_at = models.DateTimeField(_('started at'), blank=True, null=True)
+
+    #: Date and time when rendering finished, successfully or not.
+    finished_at = models.DateTimeField(_('finished at'), blank=True, null=True)
+
+    #: Error message of failed jobs.
+    error = models.TextField(_('error'), blank=True)
+
+    #: Extra data.
+    extras = JSONField(_('extras'), blank=True, default=dict)
+
+    #: Default manager.
+    objects = ExportJobManager()
+
+    class Meta:
+        verbose_name = _('Export Job')
+        verbose_name_plural = _('Export Jobs')
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return f'{self.survey} - {self.get_export_display()}'
+
+    def get_absolute_url(self):
+        return reverse('responses:export-job-detail', kwargs={'pk': self.pk})
+
+    @property
+    def is_finished(self):
+        """Whether the job has either completed or failed."""
+        return self.status in (self.COMPLETED, self.FAILED)
+
+
+class ExportTombstone(TimeStampedModel):
+    """A record of a deleted row of a survey export.
+
+    Tombstones let delta exports report rows deleted since a previous
+    export. They are recorded by database triggers of the export tables,
+    one insert per delete statement, so that deletes of export rows need
+    no signals and cascade without loading rows. :attr:`~created_at` is the
+    date and time of deletion.
+    """
+
+    #: Survey of the deleted row.
+    #:
+    #: There is no database constraint so that tombstones can be recorded
+    #: while the survey itself is being deleted.
+    survey = models.ForeignKey(
+        'surveys.Survey',
+        related_name='export_tombstones',
+        related_query_name='export_tombstone',
+        verbose_name=_('survey'),
+        on_delete=models.DO_NOTHING,
+        db_constraint=False
+    )
+
+    #: Label of the deleted row model, for example ``responses.datasettopicshared``.
+    model = models.CharField(_('model'), max_length=100)
+
+    #: Primary key of the deleted row.
+    object_id = models.PositiveIntegerField(_('object id'))
+
+    class Meta:
+        verbose_name = _('Export Tombstone')
+        verbose_name_plural = _('Export Tombstones')
+        indexes = [
+            models.Index(fields=['survey', 'model', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
+
+
+class SurveyStatistics(TimeStampedModel):
+    """Counters of survey respondents and responses.
+
+    Counters are kept up to date as respondents and responses are saved or
+    deleted, in the same transaction, see :mod:`apps.responses.signals`, so
+    that pages can read them instead of aggregating responses. Statistics
+    missing for a survey are computed from scratch with :meth:`~refresh`.
+    """
+
+    #: Fields counting responses of each status.
+    STATUS_COUNT_FIELDS = {
+        SurveyResponse.NOT_STARTED: 'not_started_count',
+        SurveyResponse.IN_PROGRESS: 'in_progress_count',
+        SurveyResponse.COMPLETED: 'completed_count',
+    }
+
+    #: Survey of the statistics.
+    survey = models.OneToOneField(
+        'surveys.Survey',
+        related_name='statistics',
+        verbose_name=_('survey'),
+        on_delete=models.CASCADE
+    )
+
+    #: Number of survey respondents.
+    respondent_count = models.PositiveIntegerField(_('respondents'), default=0)
+
+    #: Number of responses which have not been started.
+    not_started_count = models.PositiveIntegerField(_('not started'), default=0)
+
+    #: Number of responses in progress.
+    in_progress_count = models.PositiveIntegerField(_('in progress'), default=0)
+
+    #: Number of completed responses.
+    completed_count = models.PositiveIntegerField(_('completed'), default=0)
+
+    #: Number of completed responses by ISO date of completion.
+    completions = JSONField(_('completions per day'), blank=True, default=dict)
+
+    #: Number of completed responses by id of their datasets.
+    dataset_counts = JSONField(_('completed responses per dataset'), blank=True, default=dict)
+
+    #: Number of completed responses by id of their topics.
+    topic_counts = JSONField(_('completed responses per topic'), blank=True, default=dict)
+
+    class Meta:
+        verbose_name = _('Survey Statistics')
+        verbose_name_plural = _('Survey Statistics')
+
+    def __str__(self):
+        return f'{self.survey} statistics'
+
+    @classmethod
+    def get_for_survey(cls, survey_id, lock=False):
+        """
+        Returns statistics of a survey and whether they have been computed
+        from scratch because they were missing.
+
+        Args:
+            survey_id (int): Id of the survey.
+            lock (bool): Lock the statistics until the end of the transaction.
+        """
+        queryset = cls.objects.select_for_update() if lock else cls.objects.all()
+        try:
+            return queryset.get(survey_id=survey_id), False
+        except cls.DoesNotExist:
+            pass
+
+        # concurrent transactions insert a single row, the others wait for
+        # it and get statistics refreshed by the transaction which inserted it
+        statistics, created = cls.objects.get_or_create(survey_id=survey_id)
+        if created:
+            statistics.refresh()
+        elif lock:
+            statistics = queryset.get(pk=statistics.pk)
+        return statistics, created
+
+    @classmethod
+    def update_response_datasets(cls, survey_id, previous, current):
+        """
+        Counts changed datasets and topics of a completed response.
+
+        Args:
+            survey_id (int): Id of the survey.
+            previous (tuple): Dataset ids and topic ids counted so far.
+            current (tuple): Dataset ids and topic ids of the response now.
+        """
+        (previous_datasets, previous_topics), (datasets, topics) = previous, current
+        if previous_datasets == datasets and previous_topics == topics:
+            return
+
+        with transaction.atomic():
+            statistics, refreshed = cls.get_for_survey(survey_id, lock=True)
+            if refreshed:
+                return
+            statistics.count_datasets(previous_datasets - datasets, previous_topics - topics, sign=-1)
+            statistics.count_datasets(datasets - previous_datasets, topics - previous_topics)
+            statistics.save()
+
+    @staticmethod
+    def get_counted_state(consented_at, completed_at):
+        """Returns the status and date of completion by which a response is counted."""
+        day = timezone.localdate(completed_at).isoformat() if completed_at else None
+        return SurveyResponse.get_status(consented_at, completed_at), day
+
+    def refresh(self):
+        """Computes all counters from survey respondents and responses and saves them."""
+        responses = SurveyResponse.objects.filter(survey_id=self.survey_id).order_by()
+        completed = responses.filter(completed_at__isnull=False)
+
+        self.respondent_count = Respondent.objects.filter(survey_id=self.survey_id).count()
+
+        statuses = dict(responses.with_status().values_list('status').annotate(count=Count('pk')))
+        for status, field in self.STATUS_COUNT_FIELDS.items():
+            setattr(self, field, statuses.get(status, 0))
+
+        self.completions = {
+            day.isoformat(): count
+            for day, count in completed
+            .annotate(day=TruncDate('completed_at'))
+            .values_list('day')
+            .annotate(count=Count('pk'))
+        }
+        self.dataset_counts = {
+            str(pk): count
+            for pk, count in DatasetResponse.objects
+            .filter(response__in=completed)
+            .order_by()
+            .values_list('dataset_id')
+            .annotate(count=Count('response_id', distinct=True))
+        }
+        self.topic_counts = {
+            str(pk): count
+            for pk, count in DatasetTopicResponse.objects
+            .filter(dataset_response__response__in=completed)
+            .order_by()
+            .values_list('topic_id')
+            .annotate(count=Count('dataset_response__response_id', distinct=True))
+        }
+        self.save()
+
+    def count_response(self, state, datasets=(), topics=(), sign=1):
+        """
+        Adds a response to the counters, or removes it when ``sign`` is ``-1``.
+
+        Args:
+            state (tuple): Status and date of completion, see :meth:`~get_counted_state`.
+            datasets (iterable): Dataset ids of the response, counted if it is completed.
+            topics (iterable): Topic ids of the response, counted if it is completed.
+            sign (int): ``1`` to add the response, ``-1`` to remove it.
+        """
+        status, day = state
+        field = self.STATUS_COUNT_FIELDS[status]
+        setattr(self, field, getattr(self, field) + sign)
+        if day is None:
+            return
+
+        self.count_keys(self.completions, [day], sign)
+        self.count_datasets(datasets, topics, sign)
+
+    def count_datasets(self, datasets=(), topics=(), sign=1):
+        """Adds datasets and topics of a completed response to the counters, see :meth:`~count_response`."""
+        self.count_keys(self.dataset_counts, datasets, sign)
+        self.count_keys(self.topic_counts, topics, sign)
+
+    @staticmethod
+    def count_keys(counts, keys, sign):
+        """Adds ``sign`` to ``counts`` of every key, removing keys counted down to zero."""
+        for key in map(str, keys):
+            counts[key] = counts.get(key, 0) + sign
+            if not counts[key]:
+                del counts[key]
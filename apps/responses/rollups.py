@@ -0,0 +1,102 @@
+from django.db import connection
+from django.db.models import Count, IntegerField, Value
+
+from apps.surveys.models import DataflowHierarchy
+
+from .models import DatasetTopicReceived, DatasetTopicShared, DatasetTopicStorageAccess, SurveyResponse
+
+#: Counts of each hierarchy node, the counted model and the lookup of
+#: the survey response from the counted rows.
+ROLLUP_COUNTS = [
+    ('responses', SurveyResponse, ''),
+    ('shared', DatasetTopicShared, 'dataset_response__response__'),
+    ('received', DatasetTopicReceived, 'dataset_response__response__'),
+    ('storage', DatasetTopicStorageAccess, 'response__dataset_response__response__'),
+]
+
+COUNT_NAMES = [name for name, model, lookup in ROLLUP_COUNTS]
+
+#: Sums counts of respondent hierarchies over the nested-set range of every
+#: ancestor hierarchy, counts of respondents without a hierarchy are summed
+#: with a ``NULL`` ancestor.
+ROLLUP_SQL = """
+SELECT ancestor.id, counts.count_index, SUM(counts.count)
+FROM ({counts}) AS counts (hierarchy_id, count_index, count)
+LEFT JOIN {table} AS hierarchy ON hierarchy.id = counts.hierarchy_id
+LEFT JOIN {table} AS ancestor
+    ON ancestor.tree_id = hierarchy.tree_id AND hierarchy.lft BETWEEN ancestor.lft AND ancestor.rght
+GROUP BY ancestor.id, counts.count_index
+"""
+
+
+def get_hierarchy_counts(survey):
+    """
+    Returns counts of rows of completed survey responses of every dataflow
+    hierarchy, including rows of respondents at its descendants, keyed by
+    hierarchy id, ``None`` for respondents without a hierarchy.
+
+    Rows are grouped by respondent hierarchy and the groups are summed over
+    the ``tree_id``, ``lft`` and ``rght`` range of every ancestor, all in a
+    single query.
+    """
+    querysets = [
+        model.objects
+        .filter(**{f'{lookup}survey': survey})
+        .exclude(**{f'{lookup}completed_at__isnull': True})
+        .order_by()
+        .annotate(_count_index=Value(index, output_field=IntegerField()))
+        .values(f'{lookup}respondent__hierarchy_id', '_count_index')
+        .annotate(_count=Count('pk'))
+        .values_list(f'{lookup}respondent__hierarchy_id', '_count_index', '_count')
+        for index, (name, model, lookup) in enumerate(ROLLUP_COUNTS)
+    ]
+    counts_sql, params = querysets[0].union(*querysets[1:], all=True).query.sql_with_params()
+    sql = ROLLUP_SQL.format(counts=counts_sql, table=DataflowHierarchy._meta.db_table)
+
+    counts = {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for hierarchy_id, index, count in cursor.fetchall():
+            counts.setdefault(hierarchy_id, dict.fromkeys(COUNT_NAMES, 0))[COUNT_NAMES[index]] = int(count)
+    return counts
+
+
+def get_hierarchy_rollup(survey):
+    """
+    Returns counts of responses, shared, received and storage access rows
+    of completed survey responses aggregated at every dataflow hierarchy.
+
+    Counts are aggregated over nested-set ranges in the database, see
+    :func:`get_hierarchy_counts`. Totals are counts of root hierarchies and
+    of respondents without a hierarchy. Nodes are ordered as the hierarchy
+    tree, parents before their children.
+    """
+    empty = dict.fromkeys(COUNT_NAMES, 0)
+    counts = get_hierarchy_counts(survey)
+    nodes = []
+    hierarchies = DataflowHierarchy.objects\
+        .filter(project=survey.project_id)\
+        .order_by('tree_id', 'lft')\
+        .values_list('id', 'name', 'level_name', 'parent_id', 'level')
+    for pk, name, level_name, parent_id, depth in hierarchies:
+        nodes.append({
+            'id': pk,
+            'name': name,
+            'level': level_name,
+            'parent_id': parent_id,
+            'depth': depth,
+            **counts.get(pk, empty),
+        })
+
+    totals = dict(counts.get(None, empty))
+    for node in nodes:
+        if node['parent_id'] is None:
+            for name in COUNT_NAMES:
+                totals[name] += node[name]
+
+    return {
+        'survey': survey.pk,
+        'levels': list(survey.project.hierarchy_levels.values_list('name', flat=True)),
+        'totals': totals,
+        'nodes': nodes,
+    }
@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.respondents.models import Respondent
+
+from .models import DatasetResponse, DatasetTopicResponse, SurveyResponse, SurveyStatistics
+
+
+def get_response_datasets(response_id):
+    """Returns dataset ids and topic ids of a survey response."""
+    datasets = DatasetResponse.objects\
+        .filter(response_id=response_id)\
+        .order_by()\
+        .values_list('dataset_id', flat=True)\
+        .distinct()
+    topics = DatasetTopicResponse.objects\
+        .filter(dataset_response__response_id=response_id)\
+        .order_by()\
+        .values_list('topic_id', flat=True)\
+        .distinct()
+    return list(datasets), list(topics)
+
+
+def is_status_saved(update_fields):
+    """Returns whether a save of a survey response may change its status."""
+    return update_fields is None or bool({'consented_at', 'completed_at'}.intersection(update_fields))
+
+
+@receiver(pre_save, sender=SurveyResponse)
+def load_survey_response_state(sender, instance, update_fields=None, **kwargs):
+    """
+    Remember the saved state of a survey response before it is updated.
+
+    The state is known without a query for responses loaded from the
+    database, see :meth:`.SurveyResponse.from_db`.
+    """
+    instance._counted_state = None
+    if not instance.pk or not is_status_saved(update_fields):
+        return
+
+    saved = getattr(instance, '_saved_status', None)
+    if saved is None:
+        saved = SurveyResponse.objects.filter(pk=instance.pk).values_list('consented_at', 'completed_at').first()
+    if saved is not None:
+        instance._counted_state = SurveyStatistics.get_counted_state(*saved)
+
+
+@receiver(post_save, sender=SurveyResponse)
+def update_survey_statistics(sender, instance, update_fields=None, **kwargs):
+    """Update survey statistics when the status or completion date of a response changes."""
+    if not is_status_saved(update_fields):
+        return
+
+    instance._saved_status = (instance.consented_at, instance.completed_at)
+    previous = getattr(instance, '_counted_state', None)
+    state = SurveyStatistics.get_counted_state(instance.consented_at, instance.completed_at)
+    if state == previous:
+        return
+
+    with transaction.atomic():
+        statistics, refreshed = SurveyStatistics.get_for_survey(instance.survey_id, lock=True)
+        if refreshed:
+            return
+
+        was_completed = previous is not None and previous[1] is not None
+        datasets = get_response_datasets(instance.pk) if was_completed or state[1] is not None else ((), ())
+        if previous is not None:
+            statistics.count_response(previous, *datasets, sign=-1)
+        statistics.count_response(state, *datasets)
+        statistics.save()
+
+
+@receiver(pre_delete, sender=SurveyResponse)
+def remove_survey_response_statistics(sender, instance, **kwargs):
+    """Remove a survey response from statistics while its dataset responses still exist."""
+    state = SurveyStatistics.get_counted_state(instance.consented_at, instance.completed_at)
+    with transaction.atomic():
+        # missing statistics are not computed, the survey itself may be being deleted
+        statistics = SurveyStatistics.objects.select_for_update().filter(survey_id=instance.survey_id).first()
+        if statistics is None:
+            return
+
+        datasets = get_response_datasets(instance.pk) if state[1] is not None else ((), ())
+        statistics.count_response(state, *datasets, sign=-1)
+        statistics.save()
+
+
+@receiver(post_save, sender=Respondent)
+def add_respondent_statistics(sender, instance, created, **kwargs):
+    """Count new survey respondents."""
+    if created:
+        SurveyStatistics.objects\
+            .filter(survey_id=instance.survey_id)\
+            .update(respondent_count=F('respondent_count') + 1)
+
+
+@receiver(post_delete, sender=Respondent)
+def remove_respondent_statistics(sender, instance, **kwargs):
+    """Stop counting deleted survey respondents."""
+    SurveyStatistics.objects\
+        .filter(survey_id=instance.survey_id)\
+        .update(respondent_count=F('respondent_count') - 1)
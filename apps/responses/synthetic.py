@@ -0,0 +1,253 @@
+import math
+import random
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.projects.models import Project
+from apps.respondents.models import Respondent
+from apps.surveys.models import DataflowHierarchy, Dataset, DatasetStorage, Entity, HierarchyLevel, Role, Survey, Topic
+from apps.users.models import Gender, User
+
+from .models import (DatasetResponse, DatasetTopicReceived, DatasetTopicResponse, DatasetTopicShared,
+                     DatasetTopicStorageAccess, SurveyResponse, SurveyStatistics)
+
+
+class SurveyDataGenerator:
+    """
+    Generates a project with surveys filled with synthetic responses.
+
+    The amount of generated responses is driven by the number of fact rows,
+    the rows of dataset-topic responses, storage access, shared and received
+    tables which end up in survey exports. Respondents are created in
+    batches with ``bulk_create`` so that memory usage stays flat regardless
+    of the number of rows.
+
+    Args:
+        rows (int): Approximate number of fact rows per survey.
+        surveys (int): Number of surveys in the project.
+        seed (int): Seed of the random generator, the same seed generates the same data.
+        creator (User): Project facilitator and creator of generated objects.
+    """
+
+    #: Names of project hierarchy levels and number of children of each
+    #: hierarchy at the level.
+    hierarchy_levels = (('region', 5), ('district', 6), ('ward', 8))
+
+    #: Number of survey options of each kind.
+    entity_count = 40
+    topic_count = 20
+    dataset_count = 15
+    storage_count = 8
+    role_count = 6
+
+    #: Number of response rows of each kind.
+    datasets_per_response = 3
+    topics_per_dataset = 2
+    shared_per_dataset = 2
+    received_per_dataset = 2
+
+    #: Ratio of responses which are completed.
+    completed_ratio = 0.9
+
+    #: Number of respondents created at once.
+    batch_size = 500
+
+    def __init__(self, rows, surveys=1, seed=0, creator=None):
+        self.rows = rows
+        self.surveys = surveys
+        self.random = random.Random(seed)
+        self.creator = creator
+
+    @property
+    def rows_per_respondent(self):
+        """Number of fact rows generated for each respondent."""
+        per_dataset = self.topics_per_dataset * 2 + self.shared_per_dataset + self.received_per_dataset
+        return self.datasets_per_response * per_dataset
+
+    @property
+    def respondent_count(self):
+        return math.ceil(self.rows / self.rows_per_respondent)
+
+    def generate(self):
+        """Returns a new project with generated surveys."""
+        # unique names are not drawn from the seeded generator so that
+        # the same seed can be generated more than once
+        suffix = uuid.uuid4().hex[:8]
+        if self.creator is None:
+            self.creator = User.objects.create_user(username=f'facilitator-{suffix}', is_facilitator=True)
+
+        with transaction.atomic():
+            project = Project.objects.create(
+                name=f'Synthetic project {suffix}',
+                creator=self.creator
+            )
+            project.facilitators.add(self.creator)
+            self.create_hierarchies(project)
+
+        for index in range(self.surveys):
+            self.generate_survey(project, index)
+
+        return project
+
+    def create_hierarchies(self, project):
+        """Creates hierarchy levels and a tree of hierarchies of the project."""
+        parent_level = None
+        parents = [None]
+        self.hierarchies = []
+        self.genders = list(Gender.objects.all()) or [Gender.objects.create(name='Female')]
+
+        for name, children in self.hierarchy_levels:
+            level = HierarchyLevel.objects.create(
+                project=project, parent=parent_level, name=name, creator=self.creator
+            )
+            hierarchies = []
+            for parent in parents:
+                for index in range(children):
+                    hierarchies.append(DataflowHierarchy.objects.create(
+                        project=project,
+                        parent=parent,
+                        hierarchy_level=level,
+                        level_name=name,
+                        name=f'{name.title()} {len(hierarchies) + 1}',
+                        creator=self.creator
+                    ))
+            self.hierarchies.extend(hierarchies)
+            parent_level, parents = level, hierarchies
+
+    def create_survey_options(self, project, index):
+        """Creates a survey with entities, topics, datasets, storages and roles."""
+        survey = Survey.objects.create(
+            project=project,
+            name=f'Synthetic survey {index + 1}',
+            description='Survey with synthetic responses.',
+            research_question='How does data flow across the project?',
+            creator=self.creator,
+            is_active=True,
+            login_required=False,
+            invitation_required=False
+        )
+        levels = list(project.hierarchy_levels.all())
+
+        def options(model, count, prefix=None, **kwargs):
+            prefix = prefix or model._meta.verbose_name
+            return model.objects.bulk_create(
+                model(survey=survey, name=f'{prefix} {i + 1}', creator=self.creator, **kwargs)
+                for i in range(count)
+            )
+
+        self.entities = options(Entity, self.entity_count)
+        for entity in self.entities:
+            entity.hierarchy_level = self.random.choice(levels)
+        Entity.objects.bulk_update(self.entities, ['hierarchy_level'])
+
+        self.topics = options(Topic, self.topic_count)
+        self.datasets = options(Dataset, self.dataset_count)
+        self.dataset_topics = {}
+        for dataset in self.datasets:
+            self.dataset_topics[dataset.pk] = self.random.sample(self.topics, self.topics_per_dataset * 2)
+            dataset.topics.set(self.dataset_topics[dataset.pk])
+
+        self.storages = options(DatasetStorage, self.storage_count)
+        self.roles = {
+            level.pk: options(Role, self.role_count, f'{level.name.title()} role', hierarchy_level=level)
+            for level in levels
+        }
+        self.frequencies = list(survey.dataset_frequencies.all())
+        self.access = list(survey.dataset_access.all())
+        self.hierarchy_extras = {
+            hierarchy.pk: self.get_hierarchy_extras(survey, hierarchy)
+            for hierarchy in self.hierarchies
+        }
+        return survey
+
+    def get_hierarchy_extras(self, survey, hierarchy):
+        respondent = Respondent(survey=survey, hierarchy=hierarchy)
+        return {
+            'hierarchy_dict': respondent.build_hierarchy_dict(),
+            'hierarchy_id_dict': respondent.build_hierarchy_dict('id'),
+        }
+
+    def generate_survey(self, project, index):
+        """Creates a survey and its responses in batches of respondents."""
+        with transaction.atomic():
+            survey = self.create_survey_options(project, index)
+
+        remaining = self.respondent_count
+        while remaining > 0:
+            count = min(remaining, self.batch_size)
+            with transaction.atomic():
+                self.create_responses(survey, count)
+            remaining -= count
+
+        # responses are created in bulk, without updating statistics
+        SurveyStatistics.get_for_survey(survey.pk)[0].refresh()
+        return survey
+
+    def create_responses(self, survey, count):
+        """Creates ``count`` respondents with their responses."""
+        rnd = self.random
+        now = timezone.now()
+
+        respondents = []
+        for _ in range(count):
+            hierarchy = rnd.choice(self.hierarchies)
+            respondents.append(Respondent(
+                survey=survey,
+                first_name='Respondent',
+                last_name=f'{rnd.getrandbits(32):08x}',
+                email=f'respondent-{rnd.getrandbits(48):012x}@example.com',
+                gender=rnd.choice(self.genders),
+                role=rnd.choice(self.roles[hierarchy.hierarchy_level_id]),
+                hierarchy=hierarchy,
+                hierarchy_level_id=hierarchy.hierarchy_level_id,
+                extras=self.hierarchy_extras[hierarchy.pk],
+            ))
+        Respondent.objects.bulk_create(respondents)
+
+        responses = SurveyResponse.objects.bulk_create(
+            SurveyResponse(
+                survey=survey,
+                respondent=respondent,
+                consented_at=now,
+                completed_at=now if rnd.random() < self.completed_ratio else None
+            )
+            for respondent in respondents
+        )
+
+        dataset_responses = DatasetResponse.objects.bulk_create(
+            DatasetResponse(response=response, dataset=dataset, dataset_frequency=rnd.choice(self.frequencies))
+            for response in responses
+            for dataset in rnd.sample(self.datasets, self.datasets_per_response)
+        )
+
+        topic_responses = []
+        shared = []
+        received = []
+        for dataset_response in dataset_responses:
+            topics = rnd.sample(self.dataset_topics[dataset_response.dataset_id], self.topics_per_dataset)
+            topic_responses.extend(
+                DatasetTopicResponse(dataset_response=dataset_response, topic=topic)
+                for topic in topics
+            )
+            shared.extend(
+                DatasetTopicShared(dataset_response=dataset_response, entity=entity, topic=rnd.choice(topics))
+                for entity in rnd.sample(self.entities, self.shared_per_dataset)
+            )
+            received.extend(
+                DatasetTopicReceived(dataset_response=dataset_response, entity=entity, topic=rnd.choice(topics))
+                for entity in rnd.sample(self.entities, self.received_per_dataset)
+            )
+
+        DatasetTopicResponse.objects.bulk_create(topic_responses)
+        DatasetTopicShared.objects.bulk_create(shared)
+        DatasetTopicReceived.objects.bulk_create(received)
+        DatasetTopicStorageAccess.objects.bulk_create(
+            DatasetTopicStorageAccess(
+                response=topic_response,
+                storage=rnd.choice(self.storages),
+                access=rnd.choice(self.access)
+            )
+            for topic_response in topic_responses
+        )
@@ -0,0 +1,63 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.respondents.models import Respondent
+
+from ..benchmarks import compare_results
+from ..models import DatasetTopicReceived, DatasetTopicResponse, DatasetTopicShared, DatasetTopicStorageAccess
+from ..synthetic import SurveyDataGenerator
+
+
+class SurveyDataGeneratorTest(TestCase):
+
+    def test_generate(self):
+        """Test that the generator creates about the requested number of fact rows."""
+        generator = SurveyDataGenerator(rows=100, surveys=2)
+        project = generator.generate()
+
+        self.assertEqual(generator.respondent_count, 5)
+        self.assertEqual(project.hierarchies.count(), 5 + 5 * 6 + 5 * 6 * 8)
+        for survey in project.surveys.all():
+            lookup = {'dataset_response__response__survey': survey}
+            fact_rows = sum([
+                DatasetTopicResponse.objects.filter(**lookup).count(),
+                DatasetTopicShared.objects.filter(**lookup).count(),
+                DatasetTopicReceived.objects.filter(**lookup).count(),
+                DatasetTopicStorageAccess.objects.filter(response__dataset_response__response__survey=survey).count(),
+            ])
+            self.assertEqual(fact_rows, 5 * generator.rows_per_respondent)
+
+        respondent = Respondent.objects.filter(survey__project=project).first()
+        self.assertEqual(respondent.extras['hierarchy_dict'], respondent.build_hierarchy_dict())
+
+
+class BenchmarkViewsCommandTest(TestCase):
+
+    def test_benchmark_baseline(self):
+        """Test that every benchmarked page succeeds and compares to its own baseline."""
+        project = SurveyDataGenerator(rows=50).generate()
+        survey = project.surveys.get()
+
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        call_command('benchmark_views', survey=survey.pk, repeat=1, output=path, stdout=io.StringIO())
+        with open(path) as f:
+            results = json.load(f)['results']
+
+        self.assertIn('dataset-shared-list', results)
+        self.assertIn('dataset-topic-response-update', results)
+        for name, result in results.items():
+            self.assertEqual(result['status'], 200, name)
+            self.assertGreater(result['queries'], 0, name)
+
+        self.assertEqual(compare_results(results, results), [])
+
+        slower = dict(results['respondent-list'], time=results['respondent-list']['time'] * 2, queries=1000)
+        self.assertEqual(len(compare_results(results, {'respondent-list': slower})), 2)
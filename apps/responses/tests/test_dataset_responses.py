@@ -0,0 +1,53 @@
+from django.test import TestCase
+
+from model_bakery import baker
+
+from apps.projects.models import Project
+from apps.respondents.models import Respondent
+from apps.surveys.models import Dataset, Survey, Topic
+from apps.users.models import User
+
+from ..models import DatasetTopicResponse, SurveyResponse
+
+
+class SetDatasetResponsesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = baker.make(User)
+        project = baker.make(Project, creator=user)
+        survey = baker.make(Survey, project=project, creator=user)
+        cls.topics = [baker.make(Topic, survey=survey, creator=user) for i in range(3)]
+        cls.datasets = [baker.make(Dataset, survey=survey, creator=user) for i in range(3)]
+        cls.datasets[0].topics.set(cls.topics[:2])
+        cls.datasets[1].topics.set(cls.topics[2:])
+        respondent = Respondent.objects.create(survey=survey)
+        cls.response = SurveyResponse.objects.create(survey=survey, respondent=respondent)
+
+    def get_topics(self):
+        rows = DatasetTopicResponse.objects\
+            .filter(dataset_response__response=self.response)\
+            .values_list('dataset_response__dataset_id', 'topic_id')
+        topics = {}
+        for dataset_id, topic_id in rows:
+            topics.setdefault(dataset_id, set()).add(topic_id)
+        return topics
+
+    def test_set_dataset_responses(self):
+        first, second, third = self.datasets
+        topic_ids = [topic.pk for topic in self.topics]
+
+        # topics, survey topics, existing responses, two inserts and the navigation plan
+        with self.assertNumQueries(6):
+            self.response.set_dataset_responses([first, third])
+        self.assertEqual(self.get_topics(), {first.pk: set(topic_ids[:2]), third.pk: set(topic_ids)})
+
+        dataset_response_id = self.response.dataset_responses.get(dataset=first).pk
+        first.topics.set(self.topics[1:])
+        self.response.set_dataset_responses([first, second])
+        self.assertEqual(self.get_topics(), {first.pk: set(topic_ids[1:]), second.pk: set(topic_ids[2:])})
+        self.assertEqual(self.response.dataset_responses.get(dataset=first).pk, dataset_response_id)
+
+        # nothing changes when the same datasets are selected again
+        with self.assertNumQueries(3):
+            self.response.set_dataset_responses([first, second])
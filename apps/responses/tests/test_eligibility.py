@@ -0,0 +1,59 @@
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.exceptions import PermissionDenied
+from django.test import RequestFactory, TestCase
+
+from model_bakery import baker
+
+from apps.projects.models import Project
+from apps.respondents.models import Respondent
+from apps.surveys.models import Survey
+from apps.users.models import User
+
+from ..mixins import RespondentSurveyMixin
+
+
+class EligibilityTokenTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(User)
+        project = baker.make(Project, creator=cls.user)
+        cls.survey = baker.make(Survey, project=project, creator=cls.user, invitation_required=True)
+        cls.respondent = Respondent.objects.create(survey=cls.survey, user=cls.user)
+
+    def setUp(self):
+        self.session = SessionStore()
+
+    def get_view(self, user=None):
+        view = RespondentSurveyMixin()
+        view.request = RequestFactory().get('/')
+        view.request.user = user or self.user
+        view.request.session = self.session
+        view.survey = Survey.objects.get(pk=self.survey.pk)
+        view.respondent = self.respondent
+        return view
+
+    def test_eligibility_is_kept_in_session(self):
+        view = self.get_view()
+        with self.assertNumQueries(1):
+            view.validate_respondent_for_survey()
+        view = self.get_view()
+        with self.assertNumQueries(0):
+            view.validate_respondent_for_survey()
+
+        # tokens are scoped to the user
+        with self.assertRaises(PermissionDenied):
+            self.get_view(user=baker.make(User)).validate_respondent_for_survey()
+
+    def test_survey_changes_revoke_token(self):
+        self.get_view().validate_respondent_for_survey()
+
+        self.survey.is_active = False
+        self.survey.save()
+        view = self.get_view()
+        with self.assertNumQueries(1):
+            view.validate_respondent_for_survey()
+
+        self.respondent.delete()
+        with self.assertRaises(PermissionDenied):
+            self.get_view().validate_respondent_for_survey()
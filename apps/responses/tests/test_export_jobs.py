@@ -0,0 +1,105 @@
+import io
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..jobs import export_job_heartbeat
+from ..models import DatasetTopicShared, ExportJob
+from .test_exports import SurveyExportTestCase
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ExportJobTest(SurveyExportTestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def create_job(self, export=ExportJob.DATASET_SHARED):
+        url = reverse('responses:export-job-create', kwargs={'survey': self.survey.pk, 'export': export})
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 302)
+        return ExportJob.objects.get(pk=response.url.rstrip('/').split('/')[-1])
+
+    def test_job_renders_export_rows(self):
+        """Test that the worker renders the same rows as the export view."""
+        job = self.create_job()
+        self.assertEqual(job.status, ExportJob.PENDING)
+
+        call_command('run_export_jobs', once=True, stdout=io.StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.COMPLETED)
+        self.assertTrue(job.filename.startswith('entities-datasets-shared-to-'))
+        self.assertEqual(job.extras['progress'], {'rows': 1, 'last_id': self.shared.pk})
+
+        with job.file.open('rb') as f:
+            self.assertTrue(f.read())
+
+        response = self.client.get(reverse('responses:export-job-download', kwargs={'pk': job.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        content = b''.join(response.streaming_content).decode()
+
+        url = reverse('responses:dataset-shared-list', kwargs={'survey': self.survey.pk})
+        expected = b''.join(self.client.get(url).streaming_content).decode()
+        self.assertEqual(content, expected)
+
+    def test_job_is_reused_for_same_snapshot(self):
+        """Test that a job is only created again when survey data changes."""
+        job = self.create_job()
+        self.assertEqual(self.create_job(), job)
+        self.assertNotEqual(self.create_job(ExportJob.DATASET_RECEIVED), job)
+
+        DatasetTopicShared.objects.create(
+            dataset_response=self.dataset_response, entity=self.entity, topic=self.topic
+        )
+        self.assertNotEqual(self.create_job(), job)
+
+    def test_stale_jobs_are_failed(self):
+        """Test that jobs left running by a dead worker are not reused."""
+        job = self.create_job()
+        ExportJob.objects.filter(pk=job.pk).update(
+            status=ExportJob.RUNNING, modified_at=timezone.now() - timedelta(hours=1)
+        )
+        new_job = self.create_job()
+        self.assertNotEqual(new_job, job)
+
+        call_command('run_export_jobs', once=True, stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.FAILED)
+        new_job.refresh_from_db()
+        self.assertEqual(new_job.status, ExportJob.COMPLETED)
+
+    def test_heartbeat(self):
+        """Test that running jobs are touched while they render."""
+        job = self.create_job()
+        beats = threading.Semaphore(0)
+        with mock.patch('apps.responses.jobs.touch_export_job', side_effect=lambda job: beats.release()) as touch:
+            with export_job_heartbeat(job, interval=0.01):
+                self.assertTrue(beats.acquire(timeout=5))
+                self.assertTrue(beats.acquire(timeout=5))
+        touch.assert_called_with(job)
+
+    def test_status_polling(self):
+        job = self.create_job()
+        url = reverse('responses:export-job-detail', kwargs={'pk': job.pk})
+
+        self.assertContains(self.client.get(url), 'http-equiv="refresh"')
+        self.assertEqual(
+            self.client.get(url, {'format': 'json'}).json(),
+            {'status': ExportJob.PENDING, 'is_finished': False, 'error': '', 'progress': None}
+        )
+
+        download_url = reverse('responses:export-job-download', kwargs={'pk': job.pk})
+        self.assertEqual(self.client.get(download_url).status_code, 404)
@@ -0,0 +1,506 @@
+import csv
+import gzip
+import io
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone, translation
+
+import openpyxl
+import pyarrow as pa
+import pyarrow.parquet as pq
+from model_bakery import baker
+
+from apps.projects.models import Project
+from apps.respondents.models import Respondent
+from apps.surveys.models import DataflowHierarchy, Dataset, DatasetStorage, Entity, HierarchyLevel, Role, Survey, Topic
+from apps.users.models import Gender, User
+from core.mixins import CSVResponseMixin
+
+from ..cache import ExportCache
+from ..models import (DatasetResponse, DatasetTopicReceived, DatasetTopicResponse, DatasetTopicShared,
+                      DatasetTopicStorageAccess, ExportTombstone, SurveyResponse)
+
+
+@override_settings(RESPONSES_EXPORT_CACHE_SIZE=0)
+class SurveyExportTestCase(TestCase):
+    """Base test case with a survey having a completed and an incomplete response."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.facilitator = baker.make(User, is_facilitator=True)
+
+        cls.project = baker.make(Project, creator=cls.facilitator)
+        cls.project.facilitators.add(cls.facilitator)
+
+        region = HierarchyLevel.objects.create(project=cls.project, name='region', creator=cls.facilitator)
+        district = HierarchyLevel.objects.create(parent=region, name='district', creator=cls.facilitator)
+        cls.region = DataflowHierarchy.objects.create(
+            project=cls.project, name='Arusha', hierarchy_level=region, creator=cls.facilitator
+        )
+        cls.district = DataflowHierarchy.objects.create(
+            parent=cls.region, name='Meru', hierarchy_level=district, creator=cls.facilitator
+        )
+
+        cls.survey = baker.make(Survey, project=cls.project, creator=cls.facilitator, is_active=True)
+        cls.role = baker.make(Role, survey=cls.survey, hierarchy_level=district, creator=cls.facilitator)
+        cls.entity = baker.make(Entity, survey=cls.survey, hierarchy_level=region, creator=cls.facilitator)
+        cls.topic = baker.make(Topic, survey=cls.survey, creator=cls.facilitator)
+        cls.dataset = baker.make(Dataset, survey=cls.survey, creator=cls.facilitator)
+        cls.storage = baker.make(DatasetStorage, survey=cls.survey, creator=cls.facilitator)
+        cls.access = cls.survey.dataset_access.first()
+        cls.frequency = cls.survey.dataset_frequencies.first()
+        cls.gender = baker.make(Gender, name='Female')
+
+        cls.respondent = Respondent.objects.create(
+            survey=cls.survey,
+            first_name='Asha',
+            email='asha@example.com',
+            gender=cls.gender,
+            role=cls.role,
+            hierarchy=cls.district,
+        )
+        cls.response = SurveyResponse.objects.create(
+            survey=cls.survey,
+            respondent=cls.respondent,
+            consented_at=timezone.now(),
+            completed_at=timezone.now()
+        )
+        cls.dataset_response = DatasetResponse.objects.create(
+            response=cls.response,
+            dataset=cls.dataset,
+            dataset_frequency=cls.frequency
+        )
+        cls.topic_response = DatasetTopicResponse.objects.create(dataset_response=cls.dataset_response, topic=cls.topic)
+        cls.shared = DatasetTopicShared.objects.create(
+            dataset_response=cls.dataset_response, entity=cls.entity, topic=cls.topic
+        )
+        cls.received = DatasetTopicReceived.objects.create(
+            dataset_response=cls.dataset_response, entity=cls.entity, topic=cls.topic
+        )
+        cls.storage_access = DatasetTopicStorageAccess.objects.create(
+            response=cls.topic_response, storage=cls.storage, access=cls.access
+        )
+
+        # incomplete responses are not exported
+        incomplete_respondent = Respondent.objects.create(survey=cls.survey, hierarchy=cls.region)
+        incomplete_response = SurveyResponse.objects.create(survey=cls.survey, respondent=incomplete_respondent)
+        incomplete_dataset_response = DatasetResponse.objects.create(
+            response=incomplete_response,
+            dataset=cls.dataset,
+            dataset_frequency=cls.frequency
+        )
+        DatasetTopicShared.objects.create(
+            dataset_response=incomplete_dataset_response, entity=cls.entity, topic=cls.topic
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.facilitator)
+        # URLs are reversed before any request activates a language
+        translation.activate('en')
+        self.addCleanup(translation.deactivate)
+
+    def get_rows(self, url_name, **params):
+        response = self.client.get(reverse(url_name, kwargs={'survey': self.survey.pk}), params)
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content).decode()
+        return list(csv.reader(io.StringIO(content)))
+
+    def get_dict_rows(self, url_name, **params):
+        header, *rows = self.get_rows(url_name, **params)
+        return [dict(zip(header, row)) for row in rows]
+
+
+class DatasetSharedListViewTest(SurveyExportTestCase):
+
+    def test_export_rows(self):
+        """Test that completed shared rows are joined with survey dimensions."""
+        rows = self.get_dict_rows('responses:dataset-shared-list')
+
+        self.assertEqual(len(rows), 1)
+        row = rows[0]
+        self.assertEqual(row['id'], str(self.shared.pk))
+        self.assertEqual(row['entity'], self.entity.name)
+        self.assertEqual(row['entity_hierarchy_level'], 'region')
+        self.assertEqual(row['topic'], self.dataset.name)
+        self.assertEqual(row['topic_frequency'], self.frequency.name)
+        self.assertEqual(row['dataset'], self.topic.name)
+        self.assertEqual(row['respondent_email'], 'asha@example.com')
+        self.assertEqual(row['respondent_gender'], self.gender.name)
+        self.assertEqual(row['respondent_hierarchy_level'], 'district')
+        self.assertEqual(row['respondent_hierarchy'], 'Meru')
+        self.assertEqual(row['respondent_role'], self.role.name)
+        self.assertEqual(row['topic_response_id'], str(self.dataset_response.pk))
+        self.assertEqual(row['project'], self.project.name)
+        self.assertEqual(row['_respondent_region'], 'Arusha')
+        self.assertEqual(row['_respondent_district'], 'Meru')
+
+    def test_query_count_is_independent_of_rows(self):
+        """Test that rows don't issue queries of their own."""
+        url = reverse('responses:dataset-shared-list', kwargs={'survey': self.survey.pk})
+
+        with self.assertNumQueries(19):
+            response = self.client.get(url)
+            b''.join(response.streaming_content)
+
+        for i in range(3):
+            respondent = Respondent.objects.create(survey=self.survey, hierarchy=self.region)
+            survey_response = SurveyResponse.objects.create(
+                survey=self.survey, respondent=respondent, completed_at=timezone.now()
+            )
+            dataset_response = DatasetResponse.objects.create(response=survey_response, dataset=self.dataset)
+            DatasetTopicShared.objects.create(dataset_response=dataset_response, entity=self.entity, topic=self.topic)
+
+        with self.assertNumQueries(19):
+            response = self.client.get(url)
+            b''.join(response.streaming_content)
+
+    @override_settings(RESPONSES_EXPORT_BATCH_SIZE=2)
+    def test_rows_are_fetched_in_batches(self):
+        """Test that rows are fetched in id order with a query per batch."""
+        for i in range(4):
+            DatasetTopicShared.objects.create(
+                dataset_response=self.dataset_response, entity=self.entity, topic=self.topic
+            )
+        url = reverse('responses:dataset-shared-list', kwargs={'survey': self.survey.pk})
+
+        with self.assertNumQueries(19 + 2):
+            response = self.client.get(url)
+            content = b''.join(response.streaming_content).decode()
+
+        ids = [int(row[0]) for row in list(csv.reader(io.StringIO(content)))[1:]]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(ids), 5)
+
+
+class DatasetSharedReceivedListViewTest(SurveyExportTestCase):
+
+    def test_export_rows(self):
+        """Test that both shared and received rows are exported with direction."""
+        rows = self.get_dict_rows('responses:dataset-shared-received-list')
+
+        self.assertEqual(
+            sorted((row['direction'], row['id']) for row in rows),
+            [('received from', str(self.received.pk)), ('shared to', str(self.shared.pk))]
+        )
+
+    @override_settings(RESPONSES_EXPORT_BATCH_SIZE=1)
+    def test_rows_are_merged_by_dataset_response(self):
+        other_dataset_response = DatasetResponse.objects.create(response=self.response, dataset=self.dataset)
+        for model in [DatasetTopicReceived, DatasetTopicShared, DatasetTopicReceived]:
+            model.objects.create(dataset_response=other_dataset_response, entity=self.entity, topic=self.topic)
+
+        rows = self.get_dict_rows('responses:dataset-shared-received-list')
+
+        self.assertEqual(
+            [(row['topic_response_id'], row['direction']) for row in rows],
+            [(str(self.dataset_response.pk), 'shared to'), (str(self.dataset_response.pk), 'received from')]
+            + [(str(other_dataset_response.pk), 'shared to')]
+            + [(str(other_dataset_response.pk), 'received from')] * 2
+        )
+
+
+class DatasetStorageAccessListViewTest(SurveyExportTestCase):
+
+    def test_export_rows(self):
+        rows = self.get_dict_rows('responses:dataset-storage-access-list')
+
+        self.assertEqual(len(rows), 1)
+        row = rows[0]
+        self.assertEqual(row['storage'], self.storage.name)
+        self.assertEqual(row['access'], self.access.name)
+        self.assertEqual(row['dataset'], self.topic.name)
+        self.assertEqual(row['topic_response_id'], str(self.dataset_response.pk))
+        self.assertEqual(row['dataset_response_id'], str(self.topic_response.pk))
+        self.assertEqual(row['_respondent_district'], 'Meru')
+
+
+class DatasetResponseListViewTest(SurveyExportTestCase):
+
+    def test_export_rows(self):
+        rows = self.get_dict_rows('responses:dataset-response-list')
+
+        self.assertEqual(len(rows), 1)
+        row = rows[0]
+        self.assertEqual(row['topic'], self.dataset.name)
+        self.assertEqual(row['topic_frequency'], self.frequency.name)
+        self.assertEqual(row['response_id'], str(self.response.pk))
+
+
+class CSVStreamingTest(SurveyExportTestCase):
+
+    def test_header_is_streamed_first(self):
+        """Test that header is flushed on its own and rows follow in chunks."""
+        url = reverse('responses:dataset-response-list', kwargs={'survey': self.survey.pk})
+        chunks = list(self.client.get(url).streaming_content)
+
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(chunks[0].startswith(b'id,topic,'))
+        self.assertEqual(chunks[0].count(b'\r\n'), 1)
+        self.assertEqual(chunks[1].count(b'\r\n'), 1)
+
+
+class DeltaExportTest(SurveyExportTestCase):
+
+    def test_only_rows_modified_since_are_exported(self):
+        since = timezone.now().isoformat()
+        self.assertEqual(self.get_rows('responses:dataset-shared-list', since=since)[1:], [])
+
+        self.shared.save()
+        rows = self.get_dict_rows('responses:dataset-shared-list', since=since)
+        self.assertEqual([row['id'] for row in rows], [str(self.shared.pk)])
+
+        # updating the frequency changes the exported row
+        self.dataset_response.save()
+        rows = self.get_dict_rows('responses:dataset-response-list', since=since)
+        self.assertEqual([row['id'] for row in rows], [str(self.dataset_response.pk)])
+
+    def test_deleted_rows_are_exported_as_tombstones(self):
+        since = timezone.now().isoformat()
+        received_pk = self.received.pk
+        DatasetTopicReceived.objects.filter(pk=received_pk).delete()
+
+        rows = self.get_dict_rows('responses:dataset-shared-received-list', since=since)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['id'], str(received_pk))
+        self.assertEqual(rows[0]['direction'], 'received from')
+        self.assertEqual(rows[0]['entity'], '')
+
+        self.assertEqual(self.get_rows('responses:dataset-shared-list', since=since)[1:], [])
+
+    def test_cascaded_deletes_are_recorded(self):
+        """Test that rows deleted along with a dataset response are recorded."""
+        DatasetResponse.objects.filter(pk=self.dataset_response.pk).delete()
+
+        tombstones = ExportTombstone.objects.filter(survey=self.survey).values_list('model', 'object_id')
+        self.assertCountEqual(tombstones, [
+            ('responses.datasetresponse', self.dataset_response.pk),
+            ('responses.datasettopicshared', self.shared.pk),
+            ('responses.datasettopicreceived', self.received.pk),
+            ('responses.datasettopicstorageaccess', self.storage_access.pk),
+        ])
+
+    def test_parent_first_deletes_are_recorded(self):
+        """Test that rows deleted after their survey response are recorded."""
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM responses_surveyresponse WHERE id = %s', [self.response.pk])
+            cursor.execute('DELETE FROM responses_datasetresponse WHERE response_id = %s', [self.response.pk])
+            cursor.execute('DELETE FROM responses_datasettopicresponse WHERE dataset_response_id = %s',
+                           [self.dataset_response.pk])
+            cursor.execute('DELETE FROM responses_datasettopicshared WHERE dataset_response_id = %s',
+                           [self.dataset_response.pk])
+            cursor.execute('DELETE FROM responses_datasettopicreceived WHERE dataset_response_id = %s',
+                           [self.dataset_response.pk])
+            cursor.execute('DELETE FROM responses_datasettopicstorageaccess WHERE id = %s', [self.storage_access.pk])
+
+        tombstones = ExportTombstone.objects.filter(survey=self.survey).values_list('model', 'object_id')
+        self.assertCountEqual(tombstones, [
+            ('responses.datasetresponse', self.dataset_response.pk),
+            ('responses.datasettopicshared', self.shared.pk),
+            ('responses.datasettopicreceived', self.received.pk),
+            ('responses.datasettopicstorageaccess', self.storage_access.pk),
+        ])
+
+    def test_next_cursor(self):
+        url = reverse('responses:dataset-shared-list', kwargs={'survey': self.survey.pk})
+
+        response = self.client.get(url, {'since': timezone.now().isoformat()})
+        self.assertIn('X-Next-Cursor', response)
+        self.assertNotIn('X-Next-Cursor', self.client.get(url))
+
+        self.assertEqual(self.client.get(url, {'since': 'yesterday'}).status_code, 400)
+
+
+class ParquetExportTest(SurveyExportTestCase):
+
+    def test_export_rows(self):
+        """Test that parquet exports have the same rows as CSV exports with typed columns."""
+        url = reverse('responses:dataset-shared-list', kwargs={'survey': self.survey.pk})
+        response = self.client.get(url, {'format': 'parquet'})
+        self.assertTrue(response['Content-Disposition'].endswith('.parquet"'))
+
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        csv_header, csv_row = self.get_rows('responses:dataset-shared-list')
+
+        self.assertEqual(table.column_names, csv_header)
+        self.assertEqual(table.schema.field('entity').type, pa.dictionary(pa.int32(), pa.string()))
+        row = table.to_pylist()[0]
+        self.assertEqual(row['id'], self.shared.pk)
+        self.assertEqual(row['entity'], self.entity.name)
+        self.assertEqual(row['response_completed_at'], self.response.completed_at)
+        self.assertEqual(row['_respondent_district'], 'Meru')
+
+    def test_hierarchy_columns_are_strings(self):
+        """Test that hierarchy level names do not determine column types."""
+        HierarchyLevel.objects.filter(project=self.project, name='district').update(name='visited_at')
+        url = reverse('responses:dataset-shared-list', kwargs={'survey': self.survey.pk})
+        response = self.client.get(url, {'format': 'parquet'})
+
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(table.schema.field('_respondent_visited_at').type, pa.dictionary(pa.int32(), pa.string()))
+        self.assertEqual(table.to_pylist()[0]['_respondent_visited_at'], 'Meru')
+
+
+class XLSXExportTest(SurveyExportTestCase):
+
+    def get_workbook(self, url_name, **params):
+        response = self.client.get(reverse(url_name, kwargs={'survey': self.survey.pk}), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Disposition'].endswith('.xlsx"'))
+        return openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+
+    def test_export_rows(self):
+        workbook = self.get_workbook('responses:dataset-response-list', format='xlsx')
+        rows = list(workbook['encounter frequency'].values)
+
+        self.assertEqual(list(rows[0]), self.get_rows('responses:dataset-response-list')[0])
+        self.assertEqual(rows[1][0], self.dataset_response.pk)
+        self.assertEqual(rows[1][1], self.dataset.name)
+
+    def test_rows_continue_in_further_worksheets(self):
+        other_dataset = baker.make(Dataset, survey=self.survey, creator=self.facilitator)
+        other_response = DatasetResponse.objects.create(response=self.response, dataset=other_dataset)
+
+        with mock.patch.object(CSVResponseMixin, 'xlsx_max_rows', 2):
+            workbook = self.get_workbook('responses:dataset-response-list', format='xlsx')
+
+        self.assertEqual(workbook.sheetnames, ['encounter frequency', 'encounter frequency (2)'])
+        header, row = workbook['encounter frequency'].values
+        other_header, other_row = workbook['encounter frequency (2)'].values
+        self.assertEqual(other_header, header)
+        self.assertEqual([row[0], other_row[0]], [self.dataset_response.pk, other_response.pk])
+
+    def test_survey_workbook(self):
+        """Test that survey workbook has a worksheet for each export."""
+        workbook = self.get_workbook('responses:survey-export-workbook')
+
+        self.assertEqual(
+            workbook.sheetnames,
+            ['shared to', 'received from', 'shared and received', 'storage and access', 'encounter frequency']
+        )
+        self.assertEqual(len(list(workbook['shared and received'].values)), 3)
+
+
+class CompressedExportTest(SurveyExportTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('responses:dataset-shared-list', kwargs={'survey': self.survey.pk})
+        self.content = b''.join(self.client.get(self.url).streaming_content)
+
+    def test_gzip(self):
+        response = self.client.get(self.url, {'compress': 'gzip'})
+
+        self.assertTrue(response['Content-Disposition'].endswith('.csv.gz"'))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.content)
+
+    def test_zip(self):
+        response = self.client.get(self.url, {'compress': 'zip'})
+
+        self.assertTrue(response['Content-Disposition'].endswith('.zip"'))
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.read(archive.namelist()[0]), self.content)
+
+    def test_accept_encoding(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['Content-Disposition'].endswith('.csv"'))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.content)
+
+    def test_refused_encoding(self):
+        for accept_encoding in ('gzip;q=0', 'deflate, gzip; q=0.0', '*;q=0', 'identity'):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING=accept_encoding)
+            self.assertFalse(response.has_header('Content-Encoding'), accept_encoding)
+            self.assertEqual(b''.join(response.streaming_content), self.content)
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='br, gzip;q=0.5')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+
+class CachedExportTest(SurveyExportTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_root, ignore_errors=True)
+        self.url = reverse('responses:dataset-shared-list', kwargs={'survey': self.survey.pk})
+
+    def get(self, **extra):
+        with self.settings(RESPONSES_EXPORT_CACHE_ROOT=self.cache_root, RESPONSES_EXPORT_CACHE_SIZE=1024 * 1024):
+            response = self.client.get(self.url, **extra)
+            if response.status_code == 200:
+                response.content_bytes = b''.join(response.streaming_content)
+            return response
+
+    def test_not_modified(self):
+        response = self.get()
+        etag = response['ETag']
+
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.shared.save()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_cached_content(self):
+        response = self.get()
+
+        with self.assertNumQueries(6):
+            cached_response = self.get()
+
+        self.assertEqual(cached_response.content_bytes, response.content_bytes)
+        self.assertEqual(cached_response['Content-Disposition'], response['Content-Disposition'])
+
+        self.assertNotEqual(self.get(HTTP_ACCEPT_ENCODING='gzip')['ETag'], response['ETag'])
+
+    def test_etag_is_unique_to_survey(self):
+        """Test that surveys with the same snapshot do not share cached exports."""
+        other_survey = baker.make(Survey, project=self.project, creator=self.facilitator, is_active=True)
+        with mock.patch('apps.responses.views.exports.get_survey_snapshot', return_value='snapshot'):
+            etag = self.get()['ETag']
+            self.url = reverse('responses:dataset-shared-list', kwargs={'survey': other_survey.pk})
+            self.assertNotEqual(self.get()['ETag'], etag)
+
+    def test_cache_eviction(self):
+        response = self.get()
+        size = len(response.content_bytes)
+
+        cache = ExportCache(self.cache_root, size)
+        list(cache.tee('other', [b'x' * size], {}))
+
+        self.assertIsNone(cache.get(response['ETag'].strip('"')))
+        self.assertIsNotNone(cache.get('other'))
+
+
+class ProjectExportTest(SurveyExportTestCase):
+
+    def get_project_rows(self):
+        url = reverse('responses:project-export', kwargs={'project': self.project.pk, 'export': 'dataset-shared-list'})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_export_rows(self):
+        """Test that rows of all project surveys are exported under a single header."""
+        other_survey = baker.make(Survey, project=self.project, creator=self.facilitator)
+        respondent = Respondent.objects.create(survey=other_survey, hierarchy=self.region)
+        response = SurveyResponse.objects.create(
+            survey=other_survey, respondent=respondent, completed_at=timezone.now()
+        )
+        dataset_response = DatasetResponse.objects.create(response=response, dataset=self.dataset)
+        DatasetTopicShared.objects.create(dataset_response=dataset_response, entity=self.entity, topic=self.topic)
+
+        header, *rows = self.get_project_rows()
+
+        self.assertEqual(header, self.get_rows('responses:dataset-shared-list')[0])
+        survey_ids = [row[header.index('survey_id')] for row in rows]
+        self.assertEqual(survey_ids, [str(self.survey.pk), str(other_survey.pk)])
+        self.assertEqual(rows[1][header.index('_respondent_region')], 'Arusha')
@@ -0,0 +1,103 @@
+from django.test import TestCase
+
+from model_bakery import baker
+
+from apps.projects.models import Project
+from apps.respondents.models import Respondent
+from apps.surveys.configuration import get_survey_configuration
+from apps.surveys.models import Dataset, Entity, Survey, Topic
+from apps.users.models import User
+
+from ..forms import DatasetTopicSharedFormSet
+from ..models import DatasetResponse, DatasetTopicShared, SurveyResponse
+
+
+class DatasetTopicSharedFormSetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = baker.make(User)
+        project = baker.make(Project, creator=user)
+        cls.survey = baker.make(Survey, project=project, creator=user)
+        cls.entities = [baker.make(Entity, survey=cls.survey, creator=user) for i in range(3)]
+        cls.topics = [baker.make(Topic, survey=cls.survey, creator=user) for i in range(2)]
+        respondent = Respondent.objects.create(survey=cls.survey)
+        response = SurveyResponse.objects.create(survey=cls.survey, respondent=respondent)
+        cls.dataset_response = DatasetResponse.objects.create(
+            response=response, dataset=baker.make(Dataset, survey=cls.survey, creator=user)
+        )
+
+    def get_formset(self, selected):
+        """Returns validated formset with topics of selected entities."""
+        data = {
+            'form-TOTAL_FORMS': len(self.entities),
+            'form-INITIAL_FORMS': 0,
+        }
+        for i, entity in enumerate(self.entities):
+            data[f'form-{i}-entity'] = entity.pk
+            if entity in selected:
+                data[f'form-{i}-selected'] = 'on'
+                data[f'form-{i}-topic'] = selected[entity].pk
+
+        formset = DatasetTopicSharedFormSet(instance=self.dataset_response, survey=self.survey, data=data)
+        self.assertTrue(formset.is_valid(), formset.errors)
+        return formset
+
+    def save(self, selected):
+        return self.get_formset(selected).save()
+
+    def get_rows(self):
+        return {
+            row.entity: row
+            for row in DatasetTopicShared.objects.filter(dataset_response=self.dataset_response)
+        }
+
+    def test_save(self):
+        first, second, third = self.entities
+        self.save({first: self.topics[0], second: self.topics[0]})
+        rows = self.get_rows()
+        self.assertEqual({entity: row.topic for entity, row in rows.items()}, {
+            first: self.topics[0],
+            second: self.topics[0],
+        })
+
+        saved = self.save({second: self.topics[1], third: self.topics[0]})
+        self.assertEqual([row.entity for row in saved], [second, third])
+
+        new_rows = self.get_rows()
+        self.assertEqual({entity: row.topic for entity, row in new_rows.items()}, {
+            second: self.topics[1],
+            third: self.topics[0],
+        })
+        # changed rows are updated in place
+        self.assertEqual(new_rows[second].pk, rows[second].pk)
+        self.assertGreater(new_rows[second].modified_at, rows[second].modified_at)
+
+        # unchanged rows are left untouched
+        formset = self.get_formset({second: self.topics[1], third: self.topics[0]})
+        with self.assertNumQueries(1):
+            formset.save()
+        self.assertEqual(self.get_rows()[third].modified_at, new_rows[third].modified_at)
+
+    def test_choices_are_shared(self):
+        first, second, third = self.entities
+
+        # choices are read from the survey configuration, only initial rows are loaded
+        get_survey_configuration(self.survey)
+        with self.assertNumQueries(1):
+            formset = self.get_formset({first: self.topics[0], third: self.topics[1]})
+            formset.forms[1].as_p()
+        self.assertEqual(formset.forms[2].cleaned_data['topic'], self.topics[1])
+
+        other_survey = baker.make(Survey, project=self.survey.project, creator=self.survey.creator)
+        other_topic = baker.make(Topic, survey=other_survey, creator=self.survey.creator)
+        data = {
+            'form-TOTAL_FORMS': 1,
+            'form-INITIAL_FORMS': 0,
+            'form-0-entity': first.pk,
+            'form-0-selected': 'on',
+            'form-0-topic': other_topic.pk,
+        }
+        formset = DatasetTopicSharedFormSet(instance=self.dataset_response, survey=self.survey, data=data)
+        self.assertFalse(formset.is_valid())
+        self.assertIn('topic', formset.forms[0].errors)
@@ -0,0 +1,84 @@
+import json
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+
+from model_bakery import baker
+
+from apps.surveys.models import Survey
+
+from ..models import DatasetTopicShared
+from .test_exports import SurveyExportTestCase
+
+
+class DataflowGraphViewTest(SurveyExportTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('responses:dataflow-graph', kwargs={'survey': self.survey.pk})
+
+    def test_graph(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        graph = response.json()
+        nodes = graph['nodes']
+        self.assertEqual(nodes[:2], [
+            ['hierarchy', self.region.pk, 'Arusha', 'region'],
+            ['hierarchy', self.district.pk, 'Meru', 'district'],
+        ])
+        self.assertEqual(len(nodes), 2 + self.survey.entities.count())
+        entity = nodes.index(['entity', self.entity.pk, self.entity.name, 'region'])
+
+        # shared from the respondent hierarchy to the entity, received the other way round
+        self.assertEqual(graph['edges'], [
+            [1, entity, self.role.pk, self.dataset.pk, self.topic.pk, 1],
+            [entity, 1, self.role.pk, self.dataset.pk, self.topic.pk, 1],
+        ])
+        self.assertEqual(graph['edge_fields'][2:5], ['role', 'dataset', 'topic'])
+        self.assertEqual(graph['roles'], [[self.role.pk, self.role.name]])
+        self.assertEqual(graph['datasets'], [[self.dataset.pk, self.dataset.name]])
+        self.assertEqual(graph['topics'], [[self.topic.pk, self.topic.name]])
+
+    @override_settings(RESPONSES_EXPORT_BATCH_SIZE=1)
+    def test_edges_are_paginated(self):
+        DatasetTopicShared.objects.create(
+            dataset_response=self.dataset_response, entity=self.survey.entities.exclude(pk=self.entity.pk).first(),
+            topic=self.topic
+        )
+        edges = self.client.get(self.url).json()['edges']
+        self.assertEqual(len(edges), 3)
+        self.assertEqual(len({tuple(edge) for edge in edges}), 3)
+
+    def test_ndjson(self):
+        response = self.client.get(self.url, {'format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(lines[0], {'type': 'survey', 'id': self.survey.pk})
+        nodes = 2 + self.survey.entities.count()
+        self.assertEqual(
+            [line['type'] for line in lines[1:]],
+            ['role', 'dataset', 'topic'] + ['node'] * nodes + ['edge'] * 2
+        )
+        self.assertEqual(lines[2], {'type': 'dataset', 'id': self.dataset.pk, 'name': self.dataset.name})
+        self.assertEqual(lines[-1], {
+            'type': 'edge', 'source': lines[-1]['source'], 'target': 1, 'role': self.role.pk,
+            'dataset': self.dataset.pk, 'topic': self.topic.pk, 'weight': 1
+        })
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(self.client.get(self.url, {'format': 'ndjson'})['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.shared.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_is_unique_to_survey(self):
+        other_survey = baker.make(Survey, project=self.project, creator=self.facilitator)
+        with mock.patch('apps.responses.views.graphs.get_survey_snapshot', return_value='snapshot'):
+            etag = self.client.get(self.url)['ETag']
+            url = reverse('responses:dataflow-graph', kwargs={'survey': other_survey.pk})
+            self.assertNotEqual(self.client.get(url)['ETag'], etag)
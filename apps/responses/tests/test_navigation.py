@@ -0,0 +1,57 @@
+from django.test import TestCase
+
+from model_bakery import baker
+
+from apps.projects.models import Project
+from apps.respondents.models import Respondent
+from apps.surveys.models import Dataset, Survey, Topic
+from apps.users.models import User
+
+from ..models import SurveyResponse
+
+
+class NavigationPlanTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = baker.make(User)
+        project = baker.make(Project, creator=user)
+        survey = baker.make(Survey, project=project, creator=user)
+        cls.topics = [baker.make(Topic, survey=survey, creator=user) for i in range(2)]
+        cls.datasets = [baker.make(Dataset, survey=survey, creator=user) for i in range(3)]
+        respondent = Respondent.objects.create(survey=survey)
+        cls.response = SurveyResponse.objects.create(survey=survey, respondent=respondent)
+
+    def get_plan(self):
+        return [
+            [dataset_response.pk, list(dataset_response.topic_responses.order_by('pk').values_list('pk', flat=True))]
+            for dataset_response in self.response.dataset_responses.order_by('pk')
+        ]
+
+    def test_plan_is_stored_with_datasets(self):
+        self.response.set_dataset_responses(self.datasets)
+        plan = self.get_plan()
+        self.assertEqual(SurveyResponse.objects.get(pk=self.response.pk).extras['_state']['plan'], plan)
+
+        first, second, third = plan
+        with self.assertNumQueries(0):
+            self.assertEqual(self.response.get_dataset_response_step(first[0]), (None, first[1], second[0]))
+            self.assertEqual(self.response.get_dataset_response_step(second[0]), (first[0], second[1], third[0]))
+            self.assertEqual(self.response.get_dataset_response_step(third[0]), (second[0], third[1], None))
+            self.assertEqual(self.response.get_topic_response_step(first[0], first[1][0]), (None, first[1][1]))
+            self.assertEqual(self.response.get_topic_response_step(first[0], first[1][1]), (first[1][0], None))
+
+        # the plan follows datasets selected again
+        self.response.set_dataset_responses(self.datasets[1:])
+        self.assertEqual(self.response.get_navigation_plan(), self.get_plan())
+
+    def test_missing_plan_is_built(self):
+        self.response.set_dataset_responses(self.datasets)
+        SurveyResponse.objects.filter(pk=self.response.pk).update(extras={})
+        response = SurveyResponse.objects.get(pk=self.response.pk)
+
+        first, second, third = self.get_plan()
+        with self.assertNumQueries(2):
+            self.assertEqual(response.get_dataset_response_step(first[0]), (None, first[1], second[0]))
+        with self.assertNumQueries(0):
+            self.assertEqual(response.get_dataset_response_step(third[0]), (second[0], third[1], None))
@@ -0,0 +1,457 @@
+import importlib
+import io
+import re
+import shutil
+import tempfile
+from collections import Counter
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import translation
+
+from model_bakery import baker
+from PIL import Image
+
+from apps.projects.models import Project
+from apps.respondents.models import Respondent
+from apps.surveys.models import Dataset, DatasetStorage, Entity, Logo, Question, Role, Survey, Topic
+from apps.users.models import Gender
+
+from ..models import (DatasetResponse, DatasetTopicReceived, DatasetTopicResponse, DatasetTopicShared,
+                      DatasetTopicStorageAccess, ExportJob, SurveyResponse)
+from ..synthetic import SurveyDataGenerator
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+#: Maximum number of queries of each view, regardless of the number of rows.
+QUERY_BUDGETS = {
+    'users:profile-detail': 4,
+    'users:profile-update': 5,
+    'projects:project-list': 6,
+    'projects:project-create': 4,
+    'projects:project-detail': 7,
+    'projects:project-update': 6,
+    'projects:project-delete': 5,
+    'projects:project-create-survey': 7,
+    'surveys:survey-list': 6,
+    'surveys:survey-detail': 6,
+    'surveys:survey-update': 6,
+    'surveys:survey-delete': 6,
+    'surveys:survey-unpublish': 6,
+    'surveys:survey-publish': 6,
+    'surveys:survey-share': 6,
+    'surveys:survey-edit-start': 6,
+    'surveys:survey-edit-step-one': 15,
+    'surveys:survey-edit-step-two': 15,
+    'surveys:survey-edit-step-three': 15,
+    'surveys:survey-edit-step-four': 15,
+    'surveys:survey-edit-step-five': 15,
+    'surveys:survey-edit-step-six': 15,
+    'surveys:survey-edit-finish': 6,
+    'surveys:survey-create-respondent': 7,
+    'surveys:survey-delete-respondent': 5,
+    'surveys:survey-update-respondent': 8,
+    'surveys:survey-upload-respondents': 5,
+    'surveys:survey-create-role': 7,
+    'surveys:survey-delete-role': 5,
+    'surveys:survey-update-role': 8,
+    'surveys:survey-create-topic': 5,
+    'surveys:survey-delete-topic': 5,
+    'surveys:survey-update-topic': 5,
+    'surveys:survey-create-dataset': 5,
+    'surveys:survey-delete-dataset': 5,
+    'surveys:survey-update-dataset': 5,
+    'surveys:survey-create-dataset-storage': 5,
+    'surveys:survey-delete-dataset-storage': 5,
+    'surveys:survey-update-dataset-storage': 5,
+    'surveys:survey-create-entity': 7,
+    'surveys:survey-delete-entity': 5,
+    'surveys:survey-update-entity': 8,
+    'surveys:survey-create-gender': 5,
+    'surveys:survey-delete-gender': 6,
+    'surveys:survey-update-gender': 5,
+    'surveys:survey-create-question': 5,
+    'surveys:survey-delete-question': 5,
+    'surveys:survey-update-question': 5,
+    'surveys:survey-create-logo': 5,
+    'surveys:survey-delete-logo': 5,
+    'surveys:survey-update-logo': 5,
+    'respondents:respondent-list': 9,
+    'respondents:respondent-update': 6,
+    'respondents:respondent-consent': 5,
+    'responses:survey-response-list': 8,
+    'responses:survey-response-detail': 20,
+    'responses:survey-response-resume': 5,
+    'responses:survey-response-complete': 6,
+    'responses:dataset-response-list-create': 7,
+    'responses:dataset-response-update-frequency': 5,
+    'responses:dataset-topic-response-update': 7,
+    'responses:dataset-response-update-shared': 8,
+    'responses:dataset-response-update-received': 8,
+    'responses:dataset-create': 6,
+    'responses:entity-create': 8,
+    'responses:role-create': 8,
+    'responses:dataset-storage-create': 6,
+    'responses:dataset-shared-list': 19,
+    'responses:dataset-received-list': 19,
+    'responses:dataset-shared-received-list': 20,
+    'responses:dataset-storage-access-list': 19,
+    'responses:dataset-response-list': 19,
+    'responses:survey-export-workbook': 23,
+    'responses:project-export': 19,
+    'responses:hierarchy-rollup': 9,
+    'responses:dataflow-graph': 13,
+    'responses:export-job-create': 8,
+    'responses:export-job-detail': 5,
+    'responses:export-job-download': 5,
+}
+
+#: Maximum number of queries of submitting forms of views which have no fields to fill.
+POST_QUERY_BUDGETS = {
+    'surveys:survey-publish': 13,
+}
+
+#: Views whose number of queries grows with rows, by reason.
+UNBOUNDED_URL_NAMES = {
+    'responses:project-export': 'surveys are exported one by one',
+}
+
+#: Views which are only rendered in popups.
+POPUP_URL_NAMES = re.compile(
+    r'^surveys:survey-(create|update|delete|upload)-|^responses:(dataset|entity|role|dataset-storage)-create$'
+)
+
+#: Views of respondents taking a survey.
+RESPONDENT_URL_NAMES = [
+    'respondents:respondent-consent',
+    'respondents:respondent-update',
+    'responses:survey-response-resume',
+    'responses:survey-response-complete',
+    'responses:dataset-response-list-create',
+    'responses:dataset-response-update-frequency',
+    'responses:dataset-topic-response-update',
+    'responses:dataset-response-update-shared',
+    'responses:dataset-response-update-received',
+]
+
+#: Views which only accept POST requests.
+POST_URL_NAMES = ['responses:export-job-create']
+
+#: Views fetching rows in batches of ``RESPONSES_EXPORT_BATCH_SIZE`` rows.
+BATCHED_URL_NAMES = [
+    'responses:dataset-shared-list',
+    'responses:dataset-received-list',
+    'responses:dataset-shared-received-list',
+    'responses:dataset-storage-access-list',
+    'responses:dataset-response-list',
+    'responses:survey-export-workbook',
+    'responses:dataflow-graph',
+]
+
+#: Batch size small enough for every batched view to fetch several batches.
+BATCH_SIZE = 2
+
+
+def get_url_names():
+    """Returns names of all URL patterns of project apps."""
+    names = []
+    for app_config in apps.get_app_configs():
+        if not app_config.name.startswith('apps.'):
+            continue
+        try:
+            urls = importlib.import_module(f'{app_config.name}.urls')
+        except ImportError:
+            continue
+        names += [f'{urls.app_name}:{pattern.name}' for pattern in urls.urlpatterns]
+    return names
+
+
+def make_logo(survey):
+    """Returns a survey logo with an image file."""
+    image = io.BytesIO()
+    Image.new('RGB', (1, 1)).save(image, 'PNG')
+    logo = baker.prepare(Logo, survey=survey, creator=survey.creator, image=None)
+    logo.image.save('logo.png', ContentFile(image.getvalue()))
+    return logo
+
+
+def normalize_sql(sql):
+    """Returns SQL with literal values replaced by placeholders."""
+    return re.sub(r"'(?:[^']|'')*'|\d+", '?', sql)
+
+
+class QueryBudgetGenerator(SurveyDataGenerator):
+    hierarchy_levels = (('region', 2), ('district', 2))
+    entity_count = 3
+    topic_count = 4
+    dataset_count = 3
+    storage_count = 2
+    role_count = 2
+    datasets_per_response = 2
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RESPONSES_EXPORT_CACHE_SIZE=0)
+class QueryBudgetTest(TestCase):
+    """
+    Drives every URL of project apps and checks the number of queries.
+
+    Each view is requested before and after adding rows of every kind,
+    the number of queries must stay the same and within the view budget.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.generator = QueryBudgetGenerator(rows=0)
+        cls.generator.rows = cls.generator.rows_per_respondent * 2
+        cls.project = cls.generator.generate()
+        cls.facilitator = cls.generator.creator
+        cls.survey = cls.project.surveys.get()
+        Survey.objects.filter(pk=cls.survey.pk).update(
+            allow_respondent_topics=True,
+            allow_respondent_entities=True,
+            allow_respondent_roles=True,
+            allow_respondent_storages=True,
+            invitation_required=True
+        )
+
+        # the facilitator is also taking the survey
+        cls.survey_response = SurveyResponse.objects.filter(survey=cls.survey).earliest('pk')
+        cls.survey_response.completed_at = None
+        cls.survey_response.save()
+        Respondent.objects.filter(pk=cls.survey_response.respondent_id).update(user=cls.facilitator)
+        cls.dataset_response = cls.survey_response.dataset_responses.earliest('pk')
+        cls.topic_response = cls.dataset_response.topic_responses.earliest('pk')
+        cls.survey_response.set_navigation_plan()
+
+        cls.survey.genders.add(baker.make(Gender))
+        cls.question = baker.make(Question, survey=cls.survey, creator=cls.facilitator, name='first')
+        cls.logo = make_logo(cls.survey)
+        cls.export_job = ExportJob.objects.create(
+            survey=cls.survey,
+            creator=cls.facilitator,
+            export=ExportJob.DATASET_SHARED,
+            status=ExportJob.COMPLETED,
+            filename='export.csv'
+        )
+        cls.export_job.file.save('export.csv', ContentFile(b'id\n'))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        # aggregates cached by other tests have the same survey snapshot
+        cache.clear()
+        self.client.force_login(self.facilitator)
+        # URLs are reversed before any request activates a language
+        translation.activate('en')
+        self.addCleanup(translation.deactivate)
+        session = self.client.session
+        session['surveys'] = {str(self.survey.pk): {'consented_at': self.survey_response.consented_at.isoformat()}}
+        session.save()
+
+    def get_url_kwargs(self):
+        """Returns URL keyword arguments by URL name."""
+        survey = {'survey': self.survey.pk}
+        survey_pk = {'survey_pk': self.survey.pk}
+        options = {
+            'role': Role.objects.filter(survey=self.survey).earliest('pk'),
+            # topic views edit datasets and dataset views edit topics
+            'topic': Dataset.objects.filter(survey=self.survey).earliest('pk'),
+            'dataset': Topic.objects.filter(survey=self.survey).earliest('pk'),
+            'dataset-storage': DatasetStorage.objects.filter(survey=self.survey).earliest('pk'),
+            'entity': Entity.objects.filter(survey=self.survey).earliest('pk'),
+            'question': self.question,
+            'logo': self.logo,
+        }
+
+        kwargs = {
+            'projects:project-detail': {'pk': self.project.pk},
+            'projects:project-update': {'pk': self.project.pk},
+            'projects:project-delete': {'pk': self.project.pk},
+            'projects:project-create-survey': {'project': self.project.pk},
+            'surveys:survey-create-respondent': survey_pk,
+            'surveys:survey-delete-respondent': {'pk': self.survey_response.respondent_id},
+            'surveys:survey-update-respondent': {'pk': self.survey_response.respondent_id},
+            'surveys:survey-create-gender': survey_pk,
+            'surveys:survey-delete-gender': {'survey_pk': self.survey.pk, 'pk': self.survey.genders.earliest('pk').pk},
+            'surveys:survey-update-gender': {'pk': self.survey.genders.earliest('pk').pk},
+            'respondents:respondent-update': {'pk': self.survey_response.respondent_id},
+            'respondents:respondent-consent': survey,
+            'responses:survey-response-detail': {'pk': self.survey_response.pk},
+            'responses:survey-response-resume': {'pk': self.survey_response.pk},
+            'responses:survey-response-complete': {'pk': self.survey_response.pk},
+            'responses:dataset-response-list-create': {'pk': self.survey_response.pk},
+            'responses:dataset-response-update-frequency': {'pk': self.dataset_response.pk},
+            'responses:dataset-topic-response-update': {'pk': self.topic_response.pk},
+            'responses:dataset-response-update-shared': {'pk': self.dataset_response.pk},
+            'responses:dataset-response-update-received': {'pk': self.dataset_response.pk},
+            'responses:project-export': {'project': self.project.pk, 'export': ExportJob.DATASET_SHARED},
+            'responses:export-job-create': {'survey': self.survey.pk, 'export': ExportJob.DATASET_SHARED},
+            'responses:export-job-detail': {'pk': self.export_job.pk},
+            'responses:export-job-download': {'pk': self.export_job.pk},
+        }
+
+        for name in [
+            'survey-detail', 'survey-update', 'survey-delete', 'survey-unpublish', 'survey-publish', 'survey-share',
+            'survey-edit-start', 'survey-edit-step-one', 'survey-edit-step-two', 'survey-edit-step-three',
+            'survey-edit-step-four', 'survey-edit-step-five', 'survey-edit-step-six', 'survey-edit-finish',
+            'survey-upload-respondents',
+        ]:
+            kwargs[f'surveys:{name}'] = {'pk': self.survey.pk}
+
+        for option, obj in options.items():
+            kwargs[f'surveys:survey-create-{option}'] = survey_pk
+            kwargs[f'surveys:survey-delete-{option}'] = {'pk': obj.pk}
+            kwargs[f'surveys:survey-update-{option}'] = {'pk': obj.pk}
+
+        for name in [
+            'dataset-create', 'entity-create', 'role-create', 'dataset-storage-create', 'dataset-shared-list',
+            'dataset-received-list', 'dataset-shared-received-list', 'dataset-storage-access-list',
+            'dataset-response-list', 'survey-export-workbook', 'hierarchy-rollup',
+            'dataflow-graph',
+        ]:
+            kwargs[f'responses:{name}'] = survey
+
+        return kwargs
+
+    def add_rows(self):
+        """Adds one more row of every kind displayed or exported by the views."""
+        survey = self.survey
+        creator = self.facilitator
+
+        baker.make(Project, creator=creator).facilitators.add(creator)
+        baker.make(Survey, project=self.project, creator=creator)
+        hierarchy_level = self.project.hierarchy_levels.earliest('pk')
+        baker.make(Entity, survey=survey, hierarchy_level=hierarchy_level, creator=creator)
+        baker.make(Role, survey=survey, hierarchy_level=hierarchy_level, creator=creator)
+        topic = baker.make(Topic, survey=survey, creator=creator)
+        dataset = baker.make(Dataset, survey=survey, creator=creator)
+        dataset.topics.add(topic)
+        storage = baker.make(DatasetStorage, survey=survey, creator=creator)
+        baker.make(Question, survey=survey, creator=creator, name='second')
+        make_logo(survey)
+        survey.genders.add(baker.make(Gender))
+
+        self.generator.create_responses(survey, 1)
+
+        DatasetResponse.objects.create(response=self.survey_response, dataset=dataset)
+        DatasetTopicResponse.objects.create(dataset_response=self.dataset_response, topic=topic)
+        entity = Entity.objects.filter(survey=survey).latest('pk')
+        DatasetTopicShared.objects.create(dataset_response=self.dataset_response, entity=entity, topic=topic)
+        DatasetTopicReceived.objects.create(dataset_response=self.dataset_response, entity=entity, topic=topic)
+        DatasetTopicStorageAccess.objects.create(
+            response=self.topic_response, storage=storage, access=survey.dataset_access.earliest('pk')
+        )
+
+    def warm_up(self, urls):
+        """
+        Requests respondent pages once, which loads the survey configuration
+        and keeps eligibility tokens in the session as respondents do.
+        """
+        for name in RESPONDENT_URL_NAMES:
+            self.request(name, urls[name])
+
+    def get_urls(self):
+        """Returns URLs by URL name."""
+        kwargs = self.get_url_kwargs()
+        return {
+            name: reverse(name, kwargs=kwargs.get(name)) + ('?_popup=1' if POPUP_URL_NAMES.match(name) else '')
+            for name in QUERY_BUDGETS
+        }
+
+    def request(self, name, url, method=None):
+        """Requests a URL, with POST for views which only accept POST by default, and returns captured queries."""
+        if method is None:
+            method = 'post' if name in POST_URL_NAMES else 'get'
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+
+        self.assertLess(response.status_code, 400, url)
+        return [query['sql'] for query in queries]
+
+    def get_report(self, queries, more_queries):
+        """Returns queries which are repeated more often with more rows."""
+        counts = Counter(normalize_sql(sql) for sql in queries)
+        more_counts = Counter(normalize_sql(sql) for sql in more_queries)
+        return '\n'.join(
+            f'{count}x (was {counts[sql]}x) {sql}'
+            for sql, count in more_counts.most_common()
+            if count > counts[sql]
+        )
+
+    def test_all_urls_have_budgets(self):
+        """Test that every URL of project apps is checked."""
+        self.assertCountEqual(QUERY_BUDGETS, get_url_names())
+
+    def test_query_budgets(self):
+        """Test that the number of queries is within budget and doesn't grow with rows."""
+        urls = self.get_urls()
+        budgets = {
+            **{(name, 'get'): budget for name, budget in QUERY_BUDGETS.items()},
+            **{(name, 'post'): budget for name, budget in POST_QUERY_BUDGETS.items()},
+        }
+
+        def request_all():
+            self.warm_up(urls)
+            queries = {(name, 'get'): self.request(name, url) for name, url in urls.items()}
+            # forms are submitted last as they may change what other views display
+            for name in POST_QUERY_BUDGETS:
+                queries[name, 'post'] = self.request(name, urls[name], 'post')
+            return queries
+
+        queries = request_all()
+        self.add_rows()
+        more_queries = request_all()
+
+        for (name, method), budget in budgets.items():
+            with self.subTest(name, method=method):
+                key = (name, method)
+                self.assertLessEqual(len(queries[key]), budget)
+                if name in UNBOUNDED_URL_NAMES:
+                    self.assertGreater(
+                        len(more_queries[key]),
+                        len(queries[key]),
+                        'Number of queries no longer grows with rows, remove the view from UNBOUNDED_URL_NAMES'
+                    )
+                    continue
+
+                self.assertEqual(
+                    len(more_queries[key]),
+                    len(queries[key]),
+                    f'Number of queries grows with rows:\n{self.get_report(queries[key], more_queries[key])}'
+                )
+
+    @override_settings(RESPONSES_EXPORT_BATCH_SIZE=BATCH_SIZE)
+    def test_batch_queries(self):
+        """Test that views fetching rows in batches only add the query fetching each batch."""
+        urls = self.get_urls()
+
+        def request_all():
+            queries = {}
+            for name in BATCHED_URL_NAMES:
+                name_queries = self.request(name, urls[name])
+                batches = [sql for sql in name_queries if sql.endswith(f'LIMIT {BATCH_SIZE}')]
+                self.assertGreater(len(batches), 1, name)
+                queries[name] = (name_queries, len(name_queries) - len(batches))
+            return queries
+
+        queries = request_all()
+        self.add_rows()
+        more_queries = request_all()
+
+        for name in BATCHED_URL_NAMES:
+            with self.subTest(name):
+                self.assertEqual(
+                    more_queries[name][1],
+                    queries[name][1],
+                    f'Number of queries grows with batches:\n{self.get_report(queries[name][0], more_queries[name][0])}'
+                )
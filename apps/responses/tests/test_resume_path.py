@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone, translation
+
+from model_bakery import baker
+
+from apps.projects.models import Project
+from apps.respondents.models import Respondent
+from apps.surveys.models import Survey
+from apps.users.models import User
+
+from ..mixins import ResumePathMixin
+from ..models import SurveyResponse
+
+
+@override_settings(RESPONSES_RESUME_PATH_WRITE_INTERVAL=60)
+class ResumePathTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(User)
+        project = baker.make(Project, creator=cls.user)
+        survey = baker.make(Survey, project=project, creator=cls.user, is_active=True)
+        respondent = Respondent.objects.create(survey=survey, user=cls.user)
+        cls.response = SurveyResponse.objects.create(
+            survey=survey, respondent=respondent, consented_at='2020-01-01T00:00:00Z'
+        )
+
+    def get_response(self):
+        return SurveyResponse.objects.get(pk=self.response.pk)
+
+    def get_view(self, session):
+        view = ResumePathMixin()
+        view.request = RequestFactory().get('/')
+        view.request.session = session
+        return view
+
+    def test_writes_are_coalesced(self):
+        response = self.get_response()
+        with self.assertNumQueries(1):
+            self.assertTrue(response.set_resume_path('/first/'))
+        with self.assertNumQueries(0):
+            self.assertFalse(response.set_resume_path('/second/'))
+        self.assertEqual(self.get_response().get_resume_path(), '/first/')
+
+        # the latest path is written by the next write after the interval
+        response.extras['_state']['resume_written_at'] = (timezone.now() - timedelta(seconds=61)).isoformat()
+        self.assertTrue(response.set_resume_path('/third/'))
+        self.assertEqual(self.get_response().get_resume_path(), '/third/')
+
+    def test_paths_are_kept_in_session(self):
+        session = SessionStore()
+        response = self.get_response()
+        self.get_view(session).set_resume_path(response, '/first/')
+        self.get_view(session).set_resume_path(response, '/second/')
+        self.assertEqual(self.get_view(session).get_resume_path(self.get_response()), '/second/')
+        session.save()
+
+        # resuming redirects to the latest path, which is written once the interval has passed
+        self.client.cookies['sessionid'] = session.session_key
+        self.client.force_login(self.user)
+        with translation.override('en'):
+            url = reverse('responses:survey-response-resume', kwargs={'pk': self.response.pk})
+        self.assertRedirects(self.client.get(url), '/second/', fetch_redirect_response=False)
+        self.assertEqual(self.get_response().get_resume_path(), '/first/')
+
+        response = self.get_response()
+        response.set_state(resume_written_at=(timezone.now() - timedelta(seconds=61)).isoformat())
+        self.assertRedirects(self.client.get(url), '/second/', fetch_redirect_response=False)
+        self.assertEqual(self.get_response().get_resume_path(), '/second/')
+
+    def test_state_keys_are_written(self):
+        response = self.get_response()
+        SurveyResponse.objects.filter(pk=self.response.pk).update(extras={'source': 'import', '_state': {'plan': []}})
+
+        response.set_state(resume_path='/first/')
+        self.assertEqual(self.get_response().extras, {
+            'source': 'import', '_state': {'plan': [], 'resume_path': '/first/'}
+        })
+
+    def test_latest_path_is_written_on_completion(self):
+        response = self.get_response()
+        response.set_resume_path('/first/')
+
+        response.complete(resume_path='/second/')
+        response.save()
+        self.assertEqual(self.get_response().get_resume_path(), '/second/')
+        self.assertIsNotNone(self.get_response().completed_at)
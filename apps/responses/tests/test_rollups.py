@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.urls import reverse
+
+from model_bakery import baker
+
+from apps.surveys.models import DataflowHierarchy, Survey
+
+from .test_exports import SurveyExportTestCase
+
+
+class HierarchyRollupViewTest(SurveyExportTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('responses:hierarchy-rollup', kwargs={'survey': self.survey.pk})
+
+    def test_rollup(self):
+        other = DataflowHierarchy.objects.create(
+            project=self.project, name='Dodoma', hierarchy_level=self.region.hierarchy_level, creator=self.facilitator
+        )
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        counts = {'responses': 1, 'shared': 1, 'received': 1, 'storage': 1}
+        empty = dict.fromkeys(counts, 0)
+        self.assertEqual(response.json(), {
+            'survey': self.survey.pk,
+            'levels': ['region', 'district'],
+            'totals': counts,
+            'nodes': [
+                {'id': self.region.pk, 'name': 'Arusha', 'level': '', 'parent_id': None, 'depth': 0, **counts},
+                {
+                    'id': self.district.pk, 'name': 'Meru', 'level': '', 'parent_id': self.region.pk, 'depth': 1,
+                    **counts
+                },
+                {'id': other.pk, 'name': 'Dodoma', 'level': '', 'parent_id': None, 'depth': 0, **empty},
+            ],
+        })
+
+    def test_cached_until_survey_changes(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+
+        with self.assertNumQueries(6):
+            self.assertEqual(self.client.get(self.url).json(), response.json())
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.shared.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['totals']['shared'], 0)
+
+    def test_etag_is_unique_to_survey(self):
+        other_survey = baker.make(Survey, project=self.project, creator=self.facilitator)
+        with mock.patch('apps.responses.views.rollups.get_survey_snapshot', return_value='snapshot'):
+            etag = self.client.get(self.url)['ETag']
+            url = reverse('responses:hierarchy-rollup', kwargs={'survey': other_survey.pk})
+            self.assertNotEqual(self.client.get(url)['ETag'], etag)
@@ -0,0 +1,123 @@
+import datetime
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from model_bakery import baker
+
+from apps.projects.models import Project
+from apps.respondents.models import Respondent
+from apps.surveys.models import Dataset, Survey, Topic
+from apps.users.models import User
+
+from ..models import DatasetResponse, DatasetTopicResponse, SurveyResponse, SurveyStatistics
+
+
+class SurveyStatisticsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(User)
+        project = baker.make(Project, creator=cls.user)
+        cls.survey = baker.make(Survey, project=project, creator=cls.user)
+        cls.dataset = baker.make(Dataset, survey=cls.survey, creator=cls.user)
+        cls.topic = baker.make(Topic, survey=cls.survey, creator=cls.user)
+
+    def get_statistics(self):
+        return SurveyStatistics.objects.get(survey=self.survey)
+
+    def assertStatistics(self, **expected):
+        statistics = self.get_statistics()
+        self.assertEqual({key: getattr(statistics, key) for key in expected}, expected)
+
+        # incremental counters match counters computed from scratch
+        statistics.refresh()
+        self.assertEqual({key: getattr(statistics, key) for key in expected}, expected)
+
+    def create_response(self, **kwargs):
+        respondent = Respondent.objects.create(survey=self.survey)
+        response = SurveyResponse.objects.create(survey=self.survey, respondent=respondent, **kwargs)
+        dataset_response = DatasetResponse.objects.create(response=response, dataset=self.dataset)
+        DatasetTopicResponse.objects.create(dataset_response=dataset_response, topic=self.topic)
+        return response
+
+    def test_missing_statistics_are_refreshed(self):
+        respondent = Respondent.objects.create(survey=self.survey)
+        SurveyResponse.objects.bulk_create([
+            SurveyResponse(survey=self.survey, respondent=respondent, consented_at=timezone.now())
+        ])
+
+        statistics, refreshed = SurveyStatistics.get_for_survey(self.survey.pk)
+        self.assertTrue(refreshed)
+        self.assertEqual(statistics.respondent_count, 1)
+        self.assertEqual(statistics.in_progress_count, 1)
+        self.assertEqual(SurveyStatistics.get_for_survey(self.survey.pk), (statistics, False))
+
+    def test_counters_follow_responses(self):
+        SurveyStatistics.get_for_survey(self.survey.pk)
+        response = self.create_response()
+        self.assertStatistics(respondent_count=1, not_started_count=1, in_progress_count=0, completed_count=0)
+
+        response.consented_at = timezone.now()
+        response.save()
+        self.assertStatistics(not_started_count=0, in_progress_count=1, completions={})
+
+        completed_at = timezone.make_aware(datetime.datetime(2020, 5, 17, 12))
+        response.completed_at = completed_at
+        response.save()
+        self.assertStatistics(
+            in_progress_count=0,
+            completed_count=1,
+            completions={'2020-05-17': 1},
+            dataset_counts={str(self.dataset.pk): 1},
+            topic_counts={str(self.topic.pk): 1},
+        )
+
+        # saving without a change of status or completion date leaves statistics untouched
+        modified_at = self.get_statistics().modified_at
+        response.completed_at = completed_at + datetime.timedelta(hours=1)
+        response.save()
+        self.assertEqual(self.get_statistics().modified_at, modified_at)
+
+        response.respondent.delete()
+        self.assertStatistics(
+            respondent_count=0,
+            completed_count=0,
+            completions={},
+            dataset_counts={},
+            topic_counts={},
+        )
+
+    def test_refresh_command(self):
+        SurveyStatistics.get_for_survey(self.survey.pk)
+        SurveyResponse.objects.bulk_create([
+            SurveyResponse(survey=self.survey, respondent=baker.make(Respondent, survey=self.survey))
+        ])
+        self.assertEqual(self.get_statistics().not_started_count, 0)
+
+        call_command('refresh_survey_statistics', survey=[self.survey.pk], stdout=io.StringIO())
+        self.assertEqual(self.get_statistics().not_started_count, 1)
+
+    def test_saved_state_is_not_queried(self):
+        SurveyStatistics.get_for_survey(self.survey.pk)
+        response = SurveyResponse.objects.get(pk=self.create_response().pk)
+        with self.assertNumQueries(1):
+            response.save()
+        with self.assertNumQueries(1):
+            response.save(update_fields=['extras'])
+
+    def test_dataset_changes_after_completion(self):
+        SurveyStatistics.get_for_survey(self.survey.pk)
+        other_dataset = baker.make(Dataset, survey=self.survey, creator=self.user)
+        response = self.create_response(consented_at=timezone.now())
+        response.completed_at = timezone.now()
+        response.save()
+
+        response.set_dataset_responses([other_dataset])
+        self.assertStatistics(
+            completed_count=1,
+            dataset_counts={str(other_dataset.pk): 1},
+            topic_counts={str(self.topic.pk): 1},
+        )
@@ -104,4 +104,43 @@ urlpatterns = [
         views.DatasetResponseListView.as_view(),
         name='dataset-response-list'
     ),
+    path(
+        '<int:survey>/responses-workbook',
+        views.SurveyExportWorkbookView.as_view(),
+        name='survey-export-workbook'
+    ),
+    path(
+        'projects/<int:project>/<str:export>',
+        views.ProjectExportView.as_view(),
+        name='project-export'
+    ),
+
+    # aggregates
+    path(
+        '<int:survey>/hierarchy-rollup',
+        views.HierarchyRollupView.as_view(),
+        name='hierarchy-rollup'
+    ),
+    path(
+        '<int:survey>/dataflow-graph',
+        views.DataflowGraphView.as_view(),
+        name='dataflow-graph'
+    ),
+
+    # export jobs
+    path(
+        '<int:survey>/export-jobs/<str:export>/create',
+        views.ExportJobCreateView.as_view(),
+        name='export-job-create'
+    ),
+    path(
+        'export-jobs/<int:pk>/',
+        views.ExportJobDetailView.as_view(),
+        name='export-job-detail'
+    ),
+    path(
+        'export-jobs/<int:pk>/download',
+        views.ExportJobDownloadView.as_view(),
+        name='export-job-download'
+    ),
 ]
@@ -0,0 +1,75 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, Max, Value
+
+from apps.projects.models import Project
+from apps.respondents.models import Respondent
+from apps.surveys.models import Survey
+from apps.users.models import Gender
+
+from .models import (DatasetResponse, DatasetTopicReceived, DatasetTopicResponse, DatasetTopicShared,
+                     DatasetTopicStorageAccess, SurveyResponse)
+
+
+def get_snapshot_querysets(survey):
+    """Returns querysets of all tables whose rows end up in survey exports."""
+    project = survey.project
+    return [
+        Survey.objects.filter(pk=survey.pk),
+        Project.objects.filter(pk=project.pk),
+        project.hierarchy_levels.all(),
+        project.hierarchies.all(),
+        survey.entities.all(),
+        survey.topics.all(),
+        survey.datasets.all(),
+        survey.dataset_frequencies.all(),
+        survey.dataset_storages.all(),
+        survey.dataset_access.all(),
+        survey.roles.all(),
+        Gender.objects.all(),
+        Respondent.objects.filter(survey=survey),
+        SurveyResponse.objects.filter(survey=survey),
+        DatasetResponse.objects.filter(response__survey=survey),
+        DatasetTopicResponse.objects.filter(dataset_response__response__survey=survey),
+        DatasetTopicShared.objects.filter(dataset_response__response__survey=survey),
+        DatasetTopicReceived.objects.filter(dataset_response__response__survey=survey),
+        DatasetTopicStorageAccess.objects.filter(response__dataset_response__response__survey=survey),
+    ]
+
+
+def get_survey_snapshot(survey):
+    """
+    Returns a fingerprint of the survey export data.
+
+    The fingerprint is a digest of the row count and latest ``modified_at``
+    of every table read by survey exports, fetched in a single query.
+    It changes whenever rows are created, updated or deleted.
+    """
+    querysets = [
+        queryset
+        .order_by()
+        .annotate(_table=Value(index, output_field=IntegerField()))
+        .values('_table')
+        .annotate(_modified_at=Max('modified_at'), _count=Count('pk'))
+        .values_list('_table', '_modified_at', '_count')
+        for index, queryset in enumerate(get_snapshot_querysets(survey))
+    ]
+    rows = sorted(querysets[0].union(*querysets[1:], all=True))
+    return hashlib.sha1(repr(rows).encode()).hexdigest()
+
+
+def get_cached_for_snapshot(name, survey, snapshot, func):
+    """
+    Returns ``func(survey)`` from the default cache.
+
+    Entries are keyed by the survey snapshot, see :func:`get_survey_snapshot`,
+    so the value is computed again as soon as the survey data changes.
+    """
+    key = f'responses:{name}:{survey.pk}:{snapshot}'
+    value = cache.get(key)
+    if value is None:
+        value = func(survey)
+        cache.set(key, value, settings.RESPONSES_AGGREGATE_CACHE_TIMEOUT)
+    return value
@@ -1,4 +1,7 @@
 from .dataset_responses import *  # noqa
+from .export_jobs import *  # noqa
 from .exports import *  # noqa
+from .graphs import *  # noqa
 from .respondent_defined_options import *  # noqa
+from .rollups import *  # noqa
 from .survey_response import *  # noqa
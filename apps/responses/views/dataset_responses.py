@@ -5,16 +5,17 @@ from django.urls import reverse
 from django.utils.translation import ugettext_lazy as _
 from django.views.generic import FormView, UpdateView
 
+from apps.surveys.configuration import get_survey_configuration
 from core.exceptions import NotAuthenticated
 from core.mixins import InlineFormsetMixin, PageMixin
 
 from ..forms import (DatasetResponseFrequencyForm, DatasetSelectForm, DatasetTopicReceivedFormSet,
                      DatasetTopicResponseForm, DatasetTopicSharedFormSet, DatasetTopicStorageAccessFormSet)
-from ..mixins import ConsentCheckMixin, RespondentSurveyMixin
+from ..mixins import ConsentCheckMixin, RespondentSurveyMixin, ResumePathMixin
 from ..models import DatasetResponse, DatasetTopicResponse, SurveyResponse
 
 
-class DatasetResponseListCreateView(PageMixin, RespondentSurveyMixin, ConsentCheckMixin, FormView):
+class DatasetResponseListCreateView(PageMixin, RespondentSurveyMixin, ConsentCheckMixin, ResumePathMixin, FormView):
     """
     Allows user to select datasets.
 
@@ -81,13 +82,13 @@ class DatasetResponseListCreateView(PageMixin, RespondentSurveyMixin, ConsentChe
 
     def form_valid(self, form):
         self.survey_response.set_dataset_responses(form.cleaned_data['datasets'])
-        self.survey_response.set_resume_path(self.request.get_full_path())
+        self.set_resume_path(self.survey_response)
         return redirect(self.get_success_url())
 
     def get_success_url(self):
-        # get first dataset response by default ordering
-        first_dr = self.survey_response.dataset_responses.first()
-        return reverse('responses:dataset-response-update-frequency', kwargs={'pk': first_dr.pk})
+        # get first dataset response of the navigation plan
+        first_dr_id = self.survey_response.get_navigation_plan()[0][0]
+        return reverse('responses:dataset-response-update-frequency', kwargs={'pk': first_dr_id})
 
     def get_back_url_path(self):
         return reverse('respondents:respondent-update', kwargs={'pk': self.survey_response.respondent.pk})
@@ -98,10 +99,10 @@ class DatasetResponseListCreateView(PageMixin, RespondentSurveyMixin, ConsentChe
         return context
 
     def get_footer_logos(self):
-        return self.survey.logos.all()
+        return get_survey_configuration(self.survey).logos
 
 
-class BaseDatasetResponseUpdateView(PageMixin, RespondentSurveyMixin, ConsentCheckMixin, UpdateView):
+class BaseDatasetResponseUpdateView(PageMixin, RespondentSurveyMixin, ConsentCheckMixin, ResumePathMixin, UpdateView):
     """
     Allows respondents to update response corresponding to the dataset the survey.
     """
@@ -139,14 +140,14 @@ class BaseDatasetResponseUpdateView(PageMixin, RespondentSurveyMixin, ConsentChe
         return kwargs
 
     def form_valid(self, form):
-        self.survey_response.set_resume_path(self.request.get_full_path())
+        self.set_resume_path(self.survey_response)
         return super().form_valid(form)
 
     def get_page_title(self):
         return self.survey.display_name
 
     def get_footer_logos(self):
-        return self.survey.logos.all()
+        return get_survey_configuration(self.survey).logos
 
 
 class DatasetResponseUpdateFrequencyView(BaseDatasetResponseUpdateView):
@@ -161,24 +162,23 @@ class DatasetResponseUpdateFrequencyView(BaseDatasetResponseUpdateView):
             return super().get_object(queryset)
 
     def get_back_url_path(self):
-        _previous = self.object.get_previous_in_response()
-        _previous = self.object.get_previous_in_response()
-        if _previous:
-            return reverse('responses:dataset-response-update-received', kwargs={'pk': _previous.pk})
+        previous_id, topic_response_ids, next_id = self.survey_response.get_dataset_response_step(self.object.pk)
+        if previous_id:
+            return reverse('responses:dataset-response-update-received', kwargs={'pk': previous_id})
         else:
             return reverse('responses:dataset-response-list-create', kwargs={'pk': self.survey_response.pk})
 
     def get_success_url(self):
-        topic_response = self.object.topic_responses.first()
-        if topic_response:
-            return reverse('responses:dataset-topic-response-update', kwargs={'pk': topic_response.pk})
+        previous_id, topic_response_ids, next_id = self.survey_response.get_dataset_response_step(self.object.pk)
+        if topic_response_ids:
+            return reverse('responses:dataset-topic-response-update', kwargs={'pk': topic_response_ids[0]})
         return self.request.get_full_path()
 
     def get_footer_logos(self):
-        return self.survey.logos.all()
+        return get_survey_configuration(self.survey).logos
 
 
-class DatasetTopicSharedUpdateView(PageMixin, RespondentSurveyMixin, ConsentCheckMixin, FormView):
+class DatasetTopicSharedUpdateView(PageMixin, RespondentSurveyMixin, ConsentCheckMixin, ResumePathMixin, FormView):
 
     form_class = DatasetTopicSharedFormSet
     context_object_name = 'dataset_topic_response'
@@ -240,23 +240,24 @@ class DatasetTopicSharedUpdateView(PageMixin, RespondentSurveyMixin, ConsentChec
 
     def form_valid(self, form):
         form.save()
-        self.survey_response.set_resume_path(self.request.get_full_path())
+        self.set_resume_path(self.survey_response)
         return super().form_valid(form)
 
     def get_success_url(self):
         return reverse('responses:dataset-response-update-received', kwargs={'pk': self.dataset_response.pk})
 
     def get_back_url_path(self):
-        topic_response = self.dataset_response.topic_responses.last()
-        if topic_response:
-            return reverse('responses:dataset-topic-response-update', kwargs={'pk': topic_response.pk})
+        step = self.survey_response.get_dataset_response_step(self.dataset_response.pk)
+        previous_id, topic_response_ids, next_id = step
+        if topic_response_ids:
+            return reverse('responses:dataset-topic-response-update', kwargs={'pk': topic_response_ids[-1]})
         return self.request.get_full_path()
 
     def get_page_title(self):
         return self.survey.display_name
 
     def get_footer_logos(self):
-        return self.survey.logos.all()
+        return get_survey_configuration(self.survey).logos
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -270,9 +271,10 @@ class DatasetTopicReceivedUpdateView(DatasetTopicSharedUpdateView):
     template_name = 'responses/dataset_topic_received_update.html'
 
     def get_success_url(self):
-        _next = self.dataset_response.get_next_in_response()
-        if _next:
-            return reverse('responses:dataset-response-update-frequency', kwargs={'pk': _next.pk})
+        step = self.survey_response.get_dataset_response_step(self.dataset_response.pk)
+        previous_id, topic_response_ids, next_id = step
+        if next_id:
+            return reverse('responses:dataset-response-update-frequency', kwargs={'pk': next_id})
 
         return reverse('responses:survey-response-complete', kwargs={'pk': self.survey_response.pk})
 
@@ -281,7 +283,7 @@ class DatasetTopicReceivedUpdateView(DatasetTopicSharedUpdateView):
 
 
 class DatasetTopicResponseUpdateView(PageMixin, InlineFormsetMixin, RespondentSurveyMixin,
-                                     ConsentCheckMixin, UpdateView):
+                                     ConsentCheckMixin, ResumePathMixin, UpdateView):
     model = DatasetTopicResponse
     form_class = DatasetTopicResponseForm
     formset_class = DatasetTopicStorageAccessFormSet
@@ -326,16 +328,16 @@ class DatasetTopicResponseUpdateView(PageMixin, InlineFormsetMixin, RespondentSu
         return super().dispatch(*args, **kwargs)
 
     def get_success_url(self):
-        _next = self.object.get_next_in_response()
-        if _next:
-            return reverse('responses:dataset-topic-response-update', kwargs={'pk': _next.pk})
+        previous_id, next_id = self.survey_response.get_topic_response_step(self.dataset_response.pk, self.object.pk)
+        if next_id:
+            return reverse('responses:dataset-topic-response-update', kwargs={'pk': next_id})
 
         return reverse('responses:dataset-response-update-shared', kwargs={'pk': self.dataset_response.pk})
 
     def get_back_url_path(self):
-        _previous = self.object.get_previous_in_response()
-        if _previous:
-            return reverse('responses:dataset-topic-response-update', kwargs={'pk': _previous.pk})
+        previous_id, next_id = self.survey_response.get_topic_response_step(self.dataset_response.pk, self.object.pk)
+        if previous_id:
+            return reverse('responses:dataset-topic-response-update', kwargs={'pk': previous_id})
         else:
             return reverse('responses:dataset-response-update-frequency', kwargs={'pk': self.dataset_response.pk})
 
@@ -352,13 +354,13 @@ class DatasetTopicResponseUpdateView(PageMixin, InlineFormsetMixin, RespondentSu
         formset = self.get_formset()
 
         if form.is_valid() and formset.is_valid():
-            self.survey_response.set_resume_path(self.request.get_full_path())
+            self.set_resume_path(self.survey_response)
             return self.form_valid(form, formset)
         else:
             return self.form_invalid(form, formset)
 
     def get_footer_logos(self):
-        return self.survey.logos.all()
+        return get_survey_configuration(self.survey).logos
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -0,0 +1,90 @@
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import redirect
+from django.utils.translation import ugettext_lazy as _
+from django.views import View
+from django.views.generic import DetailView
+from django.views.generic.detail import SingleObjectMixin
+
+from apps.surveys.models import Survey
+from core.mixins import FacilitatorMixin, PageMixin
+
+from ..models import ExportJob
+from ..utils import get_survey_snapshot
+
+
+class ExportJobCreateView(FacilitatorMixin, SingleObjectMixin, View):
+    """
+    Request a background export of survey responses.
+
+    If the survey has not changed since a previous export, the previous
+    job is reused instead of rendering the export again.
+    """
+
+    http_method_names = ['post']
+    pk_url_kwarg = 'survey'
+
+    def get_queryset(self):
+        return Survey.objects\
+            .filter(project__facilitators=self.request.user)\
+            .select_related('project')
+
+    def post(self, request, *args, **kwargs):
+        survey = self.get_object()
+        export = self.kwargs['export']
+
+        if export not in dict(ExportJob.EXPORT_CHOICES):
+            raise Http404(_('Unknown export'))
+
+        snapshot = get_survey_snapshot(survey)
+        job = ExportJob.objects.reusable(survey, export, snapshot).first()
+        if job is None:
+            job = ExportJob.objects.create(survey=survey, creator=request.user, export=export, snapshot=snapshot)
+
+        return redirect(job)
+
+
+class ExportJobDetailView(FacilitatorMixin, PageMixin, DetailView):
+    """
+    Export job status.
+
+    When ``format=json`` is in the URL query string the status is returned as
+    JSON, for polling until the job has finished.
+    """
+
+    page_title = _('Export')
+    template_name = 'responses/export_job_detail.html'
+    context_object_name = 'export_job'
+    model = ExportJob
+
+    def get_queryset(self):
+        return super().get_queryset()\
+            .filter(survey__project__facilitators=self.request.user)\
+            .select_related('survey')
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get('format') == 'json':
+            job = self.object
+            return JsonResponse({
+                'status': job.status,
+                'is_finished': job.is_finished,
+                'error': job.error,
+                'progress': job.extras.get('progress'),
+            })
+        return super().render_to_response(context, **response_kwargs)
+
+
+class ExportJobDownloadView(FacilitatorMixin, SingleObjectMixin, View):
+    """
+    Download the rendered file of a completed export job.
+    """
+
+    model = ExportJob
+
+    def get_queryset(self):
+        return super().get_queryset()\
+            .filter(survey__project__facilitators=self.request.user, status=ExportJob.COMPLETED)
+
+    def get(self, request, *args, **kwargs):
+        # the content type is guessed from the name of the stored file
+        job = self.get_object()
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.filename)
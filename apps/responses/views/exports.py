@@ -1,54 +1,351 @@
-from django.db.models import CharField, Value
+import hashlib
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import CharField, Q, Value
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import ugettext_lazy as _
+from django.views import View
 from django.views.generic import ListView
 from django.views.generic.detail import SingleObjectMixin
 
+from apps.projects.models import Project
 from apps.surveys.models import Survey
-from core.mixins import CSVResponseMixin, FacilitatorMixin, PageMixin
+from core.mixins import CSVResponseMixin, FacilitatorMixin, PageMixin, ParquetResponseMixin
+from core.utils import iter_keyset
+
+from ..cache import get_export_cache
+from ..dimensions import SurveyDimensions
+from ..models import (DatasetResponse, DatasetTopicReceived, DatasetTopicShared, DatasetTopicStorageAccess, ExportJob,
+                      ExportTombstone)
+from ..utils import get_survey_snapshot
+
+#: Respondent columns shared by all survey exports.
+RESPONDENT_COLUMNS = [
+    'respondent_id',
+    'respondent_first_name',
+    'respondent_last_name',
+    'respondent_email',
+    'respondent_gender',
+    'respondent_gender_id',
+    'respondent_hierarchy_level',
+    'respondent_hierarchy_level_id',
+    'respondent_hierarchy',
+    'respondent_hierarchy_id',
+    'respondent_role',
+    'respondent_role_id',
+]
+
+#: Survey and project columns shared by all survey exports.
+SURVEY_COLUMNS = [
+    'survey',
+    'survey_display_name',
+    'survey_id',
+    'project',
+    'project_id',
+]
+
+
+class BaseSurveyExportView(SingleObjectMixin, FacilitatorMixin, PageMixin, CSVResponseMixin, ParquetResponseMixin,
+                           ListView):
+    """
+    Base view for exporting survey responses.
 
-from ..models import DatasetResponse, DatasetTopicReceived, DatasetTopicShared, DatasetTopicStorageAccess
+    Survey dimension tables are loaded once into :class:`.SurveyDimensions`.
+    Rows are then streamed from a narrow ``values_list()`` of :attr:`~fields`
+    over the fact table returned by :meth:`~get_queryset` and joined
+    with the dimensions in :meth:`~get_row`.
 
+    Exports are rendered as CSV, or as Parquet or XLSX when ``format=parquet``
+    or ``format=xlsx`` is in the URL query string.
 
-class DatasetSharedListView(SingleObjectMixin, FacilitatorMixin, PageMixin, CSVResponseMixin, ListView):
-    """
-    Export topic-dataset instances shared to entities.
+    When ``since`` is in the URL query string, only rows created or modified
+    after that date and time are exported, followed by tombstones of rows
+    deleted since then. The ``X-Next-Cursor`` response header holds the
+    ``since`` value to be used for the next delta export.
+
+    Full exports have an ``ETag`` derived from a snapshot of the survey data,
+    see :func:`.get_survey_snapshot`. Requests with a matching
+    ``If-None-Match`` header get a 304 response, and rendered exports are
+    served from :class:`.ExportCache` until the survey data changes.
     """
 
-    model = DatasetTopicShared
+    #: Response headers stored with cached exports.
+    cached_headers = ['Content-Type', 'Content-Disposition', 'Content-Encoding', 'Vary']
+
     pk_url_kwarg = 'survey'
 
+    #: Fact table fields to be fetched for each row.
+    fields = []
+
+    #: Lookup of the survey response from the fact table.
+    response_lookup = None
+
+    #: Lookups of related rows whose modification changes an exported row.
+    delta_lookups = []
+
+    #: Delta export watermark, see :meth:`~get_since`.
+    since = None
+
+    #: Survey dimensions, loaded by :meth:`~get_rows` unless set beforehand.
+    dimensions = None
+
     def get(self, request, *args, **kwargs):
         self.object = self.get_object(
-            queryset=Survey.objects.filter(project__facilitators=self.request.user)
+            queryset=Survey.objects.filter(project__facilitators=self.request.user).select_related('project')
         )
-        return super().get(request, *args, **kwargs)
 
-    def get_queryset(self):
-        return self.model.objects\
-            .filter(dataset_response__response__survey=self.object)\
-            .exclude(dataset_response__response__completed_at__isnull=True)\
-            .select_related(
-                'entity',
-                'entity__hierarchy_level',
-                'dataset_response',
-                'dataset_response__dataset',
-                'dataset_response__dataset_frequency',
-                'topic',
-                'dataset_response__response__respondent',
-                'dataset_response__response__respondent__gender',
-                'dataset_response__response__respondent__hierarchy',
-                'dataset_response__response__respondent__role',
-                'dataset_response__response__respondent__role__hierarchy_level',
-                'dataset_response__response',
-                'dataset_response__response__survey',
-                'dataset_response__response__survey__project'
+        try:
+            self.since = self.get_since()
+        except ValueError:
+            return HttpResponseBadRequest(_('Invalid since date and time.'))
+
+        self.started_at = timezone.now()
+
+        # delta exports depend on the since value and tombstones, so they are neither cached nor conditional
+        if self.since:
+            return super().get(request, *args, **kwargs)
+
+        etag = self.get_etag()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = self.get_cached_response(etag) or self.cache_response(
+                etag, super().get(request, *args, **kwargs)
             )
 
+        response['ETag'] = etag
+        return response
+
+    def get_etag(self):
+        """Returns ETag of the export, which changes whenever the survey data or requested format change."""
+        variant = [
+            self.object.pk,
+            get_survey_snapshot(self.object),
+            self.__class__.__name__,
+            self.get_renderer(),
+            self.get_compression(),
+            self.accepts_gzip(),
+        ]
+        return '"%s"' % hashlib.sha1(repr(variant).encode()).hexdigest()
+
+    def get_cached_response(self, etag):
+        """Returns response with cached content of the export, if any."""
+        cache = get_export_cache()
+        cached = cache.get(etag.strip('"'))
+        if cached is None:
+            return None
+
+        file, headers = cached
+        response = StreamingHttpResponse(cache.iter_file(file))
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    def cache_response(self, etag, response):
+        """Adds content of the response to the cache as it is streamed."""
+        headers = {name: response[name] for name in self.cached_headers if response.has_header(name)}
+        response.streaming_content = get_export_cache().tee(etag.strip('"'), response.streaming_content, headers)
+        return response
+
+    def get_since(self):
+        """Returns delta export watermark from ``since`` query string parameter, if any."""
+        value = self.request.GET.get('since')
+        if not value:
+            return None
+
+        since = parse_datetime(value)
+        if since is None:
+            raise ValueError(value)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since, timezone.utc)
+        return since
+
+    def get_next_cursor(self):
+        """
+        Returns ``since`` value of the next delta export.
+
+        The cursor overlaps this export by ``RESPONSES_DELTA_EXPORT_OVERLAP``
+        seconds, so rows saved while this export was running are exported
+        again rather than missed.
+        """
+        return self.started_at - timedelta(seconds=settings.RESPONSES_DELTA_EXPORT_OVERLAP)
+
+    def filter_queryset(self, queryset):
+        """Filters fact table rows of completed survey responses, modified after :attr:`~since` if set."""
+        lookup = self.response_lookup
+        queryset = queryset\
+            .filter(**{f'{lookup}__survey': self.object})\
+            .exclude(**{f'{lookup}__completed_at__isnull': True})
+
+        if self.since:
+            delta = Q(modified_at__gt=self.since)
+            for delta_lookup in self.delta_lookups:
+                delta |= Q(**{f'{delta_lookup}__modified_at__gt': self.since})
+            queryset = queryset.filter(delta)
+
+        return queryset
+
+    def get_queryset(self):
+        return self.filter_queryset(self.model.objects.all())
+
+    def setup_export(self, survey, dimensions=None):
+        """
+        Sets up the view to export a survey without going through :meth:`~get`.
+
+        Args:
+            survey (Survey): Survey to be exported, already checked for access.
+            dimensions (SurveyDimensions): Survey dimensions shared with other exports.
+        """
+        self.object = survey
+        self.dimensions = dimensions
+        self.object_list = self.get_queryset()
+
+    def get_dimensions(self):
+        """Returns dimensions of the survey being exported."""
+        return SurveyDimensions(self.object)
+
+    def get_fact_rows(self):
+        """
+        Returns an iterator of fact table rows as tuples of :attr:`~fields` values.
+
+        Rows are fetched in id order, ``RESPONSES_EXPORT_BATCH_SIZE`` rows
+        per query, see :func:`core.utils.iter_keyset`.
+        """
+        return self.iter_fact_rows(self.object_list, self.fields)
+
+    def iter_fact_rows(self, queryset, fields, key='id'):
+        return iter_keyset(
+            queryset,
+            fields,
+            key=key,
+            batch_size=settings.RESPONSES_EXPORT_BATCH_SIZE,
+            callback=self.on_batch
+        )
+
+    def on_batch(self, last_id, count):
+        """
+        Called after each batch of fact table rows is fetched.
+
+        Override this to report export progress.
+
+        Args:
+            last_id (int): Id of the last fact table row of the batch.
+            count (int): Number of rows in the batch.
+        """
+
+    def get_header(self):
+        """Override this to return export columns excluding respondent hierarchy columns."""
+        raise NotImplementedError
+
+    def get_row(self, values, response, respondent):
+        """
+        Override this to return export values excluding respondent hierarchy values.
+
+        Args:
+            values (tuple): Fact table values of :attr:`~fields`.
+            response (tuple): Survey response id, completed at and consented at.
+            respondent (list): Respondent values of :data:`RESPONDENT_COLUMNS`.
+        """
+        raise NotImplementedError
+
+    def get_response_id(self, values):
+        """Returns survey response id from fact table values, by default the last value."""
+        return values[-1]
+
     def get_rows(self):
+        if self.dimensions is None:
+            self.dimensions = self.get_dimensions()
+        dimensions = self.dimensions
+
+        yield self.get_header() + [f'_respondent_{key}' for key in dimensions.hierarchy_level_names]
+
+        for values in self.get_fact_rows():
+            response_id = self.get_response_id(values)
+            try:
+                respondent_id, completed_at, consented_at = dimensions.responses[response_id]
+            except KeyError:
+                # response was completed after dimensions were loaded
+                continue
+
+            yield self.get_row(
+                values,
+                (response_id, completed_at, consented_at),
+                dimensions.get_respondent(respondent_id)
+            ) + dimensions.get_respondent_hierarchy(respondent_id)
+
+        if self.since:
+            yield from self.get_tombstone_rows()
+
+    def get_tombstones(self):
+        """Returns an iterator of models and ids of fact table rows deleted since :attr:`~since`."""
+        return ExportTombstone.objects\
+            .filter(survey=self.object, model=self.model._meta.label_lower, created_at__gt=self.since)\
+            .order_by()\
+            .values_list('model', 'object_id')\
+            .iterator()
+
+    def get_tombstone_rows(self):
+        """
+        Yields rows of deleted fact table rows.
+
+        Tombstone rows have the id of the deleted row followed by ``None`` values.
+        """
+        size = len(self.get_header()) + len(self.dimensions.hierarchy_level_names)
+        for model, object_id in self.get_tombstones():
+            yield self.get_tombstone_row(model, object_id, size)
+
+    def get_tombstone_row(self, model, object_id, size):
+        return [object_id] + [None] * (size - 1)
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        if self.since:
+            response['X-Next-Cursor'] = self.get_next_cursor().isoformat()
+        return response
+
+    def get_column_type(self, column):
+        # respondent hierarchy columns are named after project hierarchy
+        # levels, whose names may end like those of typed columns
+        if column.startswith('_respondent_'):
+            return self.string_type
+        return super().get_column_type(column)
 
-        hierarchy_levels = self.object.project.hierarchy_levels.values_list('name', flat=True)
+    def get_renderer(self):
+        renderer = self.request.GET.get('format')
+        if renderer in ('parquet', 'xlsx'):
+            return renderer
+        return 'csv'
 
-        yield [
+
+class DatasetSharedListView(BaseSurveyExportView):
+    """
+    Export topic-dataset instances shared to entities.
+    """
+
+    model = DatasetTopicShared
+    sheet_name = 'shared to'
+    fields = [
+        'id',
+        'entity_id',
+        'topic_id',
+        'dataset_response_id',
+        'dataset_response__dataset_id',
+        'dataset_response__dataset_frequency_id',
+        'dataset_response__response_id',
+    ]
+    response_lookup = 'dataset_response__response'
+    delta_lookups = [
+        'dataset_response',
+        'dataset_response__response',
+        'dataset_response__response__respondent',
+    ]
+
+    def get_header(self):
+        return [
             'id',
             'entity',
             'entity_id',
@@ -59,125 +356,41 @@ class DatasetSharedListView(SingleObjectMixin, FacilitatorMixin, PageMixin, CSVR
             'topic_frequency',
             'dataset',
             'dataset_id',
-            'respondent_id',
-            'respondent_first_name',
-            'respondent_last_name',
-            'respondent_email',
-            'respondent_gender',
-            'respondent_gender_id',
-            'respondent_hierarchy_level',
-            'respondent_hierarchy_level_id',
-            'respondent_hierarchy',
-            'respondent_hierarchy_id',
-            'respondent_role',
-            'respondent_role_id',
+        ] + RESPONDENT_COLUMNS + [
             'response_id',
             'topic_response_id',
             'response_completed_at',
             'response_consented_at',
-            'survey',
-            'survey_display_name',
-            'survey_id',
-            'project',
-            'project_id',
-        ] + [f'_respondent_{key}' for key in hierarchy_levels]
-
-        for obj in self.object_list.iterator():
-
-            respondent = obj.dataset_response.response.respondent
-            respondent_hierarchy_dict = respondent.extras.get('hierarchy_dict') or respondent.build_hierarchy_dict()
-
-            # role
-            role = respondent.role
-            if role:
-                role_name = role.name
-                role_id = role.id
-
-                # hierarchy level
-                hierarchy_level = role.hierarchy_level
-                if hierarchy_level:
-                    hierarchy_level_name = hierarchy_level.name
-                    hierarchy_level_id = hierarchy_level.id
-                else:
-                    hierarchy_level_name = ''
-                    hierarchy_level_id = None
-            else:
-                role_name = ''
-                role_id = None
-                hierarchy_level_name = ''
-                hierarchy_level_id = None
-
-            # hierarchy
-            hierarchy = respondent.hierarchy
-            if hierarchy:
-                hierarchy_name = hierarchy.name
-                hierarchy_id = hierarchy.id
-            else:
-                hierarchy_name = ''
-                hierarchy_id = None
-
-            # entity hierarchy level
-            entity_hierarchy_level = obj.entity.hierarchy_level
-            if entity_hierarchy_level:
-                entity_hierarchy_level_name = entity_hierarchy_level.name
-                entity_hierarchy_level_id = entity_hierarchy_level.id
-            else:
-                entity_hierarchy_level_name = ''
-                entity_hierarchy_level_id = None
-
-            if respondent.gender:
-                respondent_gender_name = respondent.gender.name
-                respondent_gender_id = respondent.gender.id
-            else:
-                respondent_gender_name = ''
-                respondent_gender_id = None
-
-            yield [
-                obj.id,
-                obj.entity.name,
-                obj.entity.id,
-                entity_hierarchy_level_name,
-                entity_hierarchy_level_id,
-                obj.dataset_response.dataset.name,
-                obj.dataset_response.dataset.id,
-                obj.dataset_response.dataset_frequency.name,
-                obj.topic.name,
-                obj.topic.id,
-                respondent.id,
-                respondent.first_name,
-                respondent.last_name,
-                respondent.email,
-                respondent_gender_name,
-                respondent_gender_id,
-                hierarchy_level_name,
-                hierarchy_level_id,
-                hierarchy_name,
-                hierarchy_id,
-                role_name,
-                role_id,
-                obj.dataset_response.response.id,
-                obj.dataset_response.id,
-                obj.dataset_response.response.completed_at,
-                obj.dataset_response.response.consented_at,
-                obj.dataset_response.response.survey.name,
-                obj.dataset_response.response.survey.display_name,
-                obj.dataset_response.response.survey.id,
-                obj.dataset_response.response.survey.project.name,
-                obj.dataset_response.response.survey.project.id,
-            ] + [value for value in respondent_hierarchy_dict.values()]
+        ] + SURVEY_COLUMNS
+
+    def get_row(self, values, response, respondent):
+        dimensions = self.dimensions
+        pk, entity_id, topic_id, dataset_response_id, dataset_id, dataset_frequency_id = values[:6]
+        response_id, completed_at, consented_at = response
+
+        return [pk] + dimensions.get_entity(entity_id) + [
+            dimensions.datasets.get(dataset_id, ''),
+            dataset_id,
+            dimensions.dataset_frequencies.get(dataset_frequency_id, ''),
+            dimensions.topics.get(topic_id, ''),
+            topic_id,
+        ] + respondent + [
+            response_id,
+            dataset_response_id,
+            completed_at,
+            consented_at,
+        ] + dimensions.get_survey()
 
     def get_filename(self):
         return f'entities-datasets-shared-to-{str(timezone.now().date())}.csv'
 
-    def get_renderer(self):
-        return 'csv'
-
 
 class DatasetReceivedListView(DatasetSharedListView):
     """
     Export topic-dataset instances received from entities.
     """
     model = DatasetTopicReceived
+    sheet_name = 'received from'
 
     def get_filename(self):
         return f'entities-datasets-received-from-{str(timezone.now().date())}.csv'
@@ -187,200 +400,89 @@ class DatasetSharedReceivedListView(DatasetSharedListView):
     """
     Export topic-dataset instances shared and received from entities.
     """
+    sheet_name = 'shared and received'
 
-    def get_queryset(self):
-        select_related = [
-            'entity',
-            'entity__hierarchy_level',
-            'dataset_response__dataset',
-            'topic',
-            'dataset_response__response__respondent',
-            'dataset_response__response__respondent__gender',
-            'dataset_response__response__respondent__hierarchy',
-            'dataset_response__response__respondent__role',
-            'dataset_response__response__respondent__role__hierarchy_level',
-            'dataset_response__response',
-            'dataset_response__response__survey',
-            'dataset_response__response__survey__project'
-        ]
+    #: Direction of fact table rows by model label.
+    directions = {
+        DatasetTopicShared._meta.label_lower: 'shared to',
+        DatasetTopicReceived._meta.label_lower: 'received from',
+    }
 
-        shared_qs = DatasetTopicShared.objects\
-            .filter(dataset_response__response__survey=self.object)\
-            .exclude(dataset_response__response__completed_at__isnull=True)\
-            .select_related(*select_related)\
+    def get_queryset(self):
+        return self.filter_queryset(DatasetTopicShared.objects.all())\
             .annotate(_type=Value('shared to', output_field=CharField()))
 
-        received_qs = DatasetTopicReceived.objects\
-            .filter(dataset_response__response__survey=self.object)\
-            .exclude(dataset_response__response__completed_at__isnull=True)\
-            .select_related(*select_related)\
+    def get_received_queryset(self):
+        return self.filter_queryset(DatasetTopicReceived.objects.all())\
             .annotate(_type=Value('received from', output_field=CharField()))
 
-        return shared_qs.union(received_qs)
+    def get_fact_rows(self):
+        """
+        Returns an iterator of shared and received rows, with direction as first value.
+
+        Shared and received tables are scanned separately, each ordered by
+        dataset response and id, and merged so that rows of a response are
+        exported together. Like ``UNION ALL`` rows are not de-duplicated.
+        """
+        fields = ['_type'] + self.fields
+        key = ('dataset_response_id', 'id')
+        index = fields.index('dataset_response_id')
+
+        return heapq.merge(
+            self.iter_fact_rows(self.object_list, fields, key=key),
+            self.iter_fact_rows(self.get_received_queryset(), fields, key=key),
+            key=lambda values: values[index]
+        )
 
-    def get_rows(self):
-        hierarchy_levels = self.object.project.hierarchy_levels.values_list('name', flat=True)
+    def get_header(self):
+        header = super().get_header()
+        return header[:1] + ['direction'] + header[1:]
 
-        yield [
-            'id',
-            'direction',
-            'entity',
-            'entity_id',
-            'entity_hierarchy_level',
-            'entity_hierarchy_level_id',
-            'topic',
-            'topic_id',
-            'topic_frequency',
-            'dataset',
-            'dataset_id',
-            'respondent_id',
-            'respondent_first_name',
-            'respondent_last_name',
-            'respondent_email',
-            'respondent_gender',
-            'respondent_gender_id',
-            'respondent_hierarchy_level',
-            'respondent_hierarchy_level_id',
-            'respondent_hierarchy',
-            'respondent_hierarchy_id',
-            'respondent_role',
-            'respondent_role_id',
-            'response_id',
-            'topic_response_id',
-            'response_completed_at',
-            'response_consented_at',
-            'survey',
-            'survey_display_name',
-            'survey_id',
-            'project',
-            'project_id',
-        ] + [f'_respondent_{key}' for key in hierarchy_levels]
-
-        for obj in self.object_list.iterator():
-
-            respondent = obj.dataset_response.response.respondent
-            respondent_hierarchy_dict = respondent.extras.get('hierarchy_dict') or respondent.build_hierarchy_dict()
-
-            # role
-            role = respondent.role
-            if role:
-                role_name = role.name
-                role_id = role.id
-
-                # hierarchy level
-                hierarchy_level = role.hierarchy_level
-                if hierarchy_level:
-                    hierarchy_level_name = hierarchy_level.name
-                    hierarchy_level_id = hierarchy_level.id
-                else:
-                    hierarchy_level_name = ''
-                    hierarchy_level_id = None
-            else:
-                role_name = ''
-                role_id = None
-                hierarchy_level_name = ''
-                hierarchy_level_id = None
-
-            # hierarchy
-            hierarchy = respondent.hierarchy
-            if hierarchy:
-                hierarchy_name = hierarchy.name
-                hierarchy_id = hierarchy.id
-            else:
-                hierarchy_name = ''
-                hierarchy_id = None
-
-            # entity hierarchy level
-            entity_hierarchy_level = obj.entity.hierarchy_level
-            if entity_hierarchy_level:
-                entity_hierarchy_level_name = entity_hierarchy_level.name
-                entity_hierarchy_level_id = entity_hierarchy_level.id
-            else:
-                entity_hierarchy_level_name = ''
-                entity_hierarchy_level_id = None
-
-            if respondent.gender:
-                respondent_gender_name = respondent.gender.name
-                respondent_gender_id = respondent.gender.id
-            else:
-                respondent_gender_name = ''
-                respondent_gender_id = None
-
-            yield [
-                obj.id,
-                obj._type,
-                obj.entity.name,
-                obj.entity.id,
-                entity_hierarchy_level_name,
-                entity_hierarchy_level_id,
-                obj.dataset_response.dataset.name,
-                obj.dataset_response.dataset.id,
-                obj.dataset_response.dataset_frequency.name,
-                obj.topic.name,
-                obj.topic.id,
-                respondent.id,
-                respondent.first_name,
-                respondent.last_name,
-                respondent.email,
-                respondent_gender_name,
-                respondent_gender_id,
-                hierarchy_level_name,
-                hierarchy_level_id,
-                hierarchy_name,
-                hierarchy_id,
-                role_name,
-                role_id,
-                obj.dataset_response.response.id,
-                obj.dataset_response.id,
-                obj.dataset_response.response.completed_at,
-                obj.dataset_response.response.consented_at,
-                obj.dataset_response.response.survey.name,
-                obj.dataset_response.response.survey.display_name,
-                obj.dataset_response.response.survey.id,
-                obj.dataset_response.response.survey.project.name,
-                obj.dataset_response.response.survey.project.id,
-            ] + [value for value in respondent_hierarchy_dict.values()]
+    def get_row(self, values, response, respondent):
+        row = super().get_row(values[1:], response, respondent)
+        return row[:1] + [values[0]] + row[1:]
+
+    def get_tombstones(self):
+        return ExportTombstone.objects\
+            .filter(survey=self.object, model__in=self.directions, created_at__gt=self.since)\
+            .order_by()\
+            .values_list('model', 'object_id')\
+            .iterator()
+
+    def get_tombstone_row(self, model, object_id, size):
+        row = super().get_tombstone_row(model, object_id, size)
+        row[1] = self.directions[model]
+        return row
 
     def get_filename(self):
         return f'entities-datasets-shared and-received-{str(timezone.now().date())}.csv'
 
 
-class DatasetStorageAccessListView(SingleObjectMixin, FacilitatorMixin, PageMixin, CSVResponseMixin, ListView):
+class DatasetStorageAccessListView(BaseSurveyExportView):
     """
     Export topic-dataset instances storage and access.
     """
 
     model = DatasetTopicStorageAccess
-    pk_url_kwarg = 'survey'
-
-    def get(self, request, *args, **kwargs):
-        self.object = self.get_object(
-            queryset=Survey.objects.filter(project__facilitators=self.request.user)
-        )
-        return super().get(request, *args, **kwargs)
-
-    def get_queryset(self):
-        return self.model.objects\
-            .filter(response__dataset_response__response__survey=self.object)\
-            .exclude(response__dataset_response__response__completed_at__isnull=True)\
-            .select_related(
-                'storage',
-                'access',
-                'response__dataset_response__dataset',
-                'response__topic',
-                'response__dataset_response__response__respondent',
-                'response__dataset_response__response__respondent__gender',
-                'response__dataset_response__response__respondent__hierarchy',
-                'response__dataset_response__response__respondent__role',
-                'response__dataset_response__response',
-                'response__dataset_response__response__survey',
-                'response__dataset_response__response__survey__project'
-            )
-
-    def get_rows(self):
-        hierarchy_levels = self.object.project.hierarchy_levels.values_list('name', flat=True)
-
-        yield [
+    sheet_name = 'storage and access'
+    fields = [
+        'id',
+        'storage_id',
+        'access_id',
+        'response_id',
+        'response__topic_id',
+        'response__dataset_response_id',
+        'response__dataset_response__dataset_id',
+        'response__dataset_response__response_id',
+    ]
+    response_lookup = 'response__dataset_response__response'
+    delta_lookups = [
+        'response__dataset_response__response',
+        'response__dataset_response__response__respondent',
+    ]
+
+    def get_header(self):
+        return [
             'id',
             'topic',
             'topic_id',
@@ -390,244 +492,181 @@ class DatasetStorageAccessListView(SingleObjectMixin, FacilitatorMixin, PageMixi
             'storage_id',
             'access',
             'access_id',
-            'respondent_id',
-            'respondent_first_name',
-            'respondent_last_name',
-            'respondent_email',
-            'respondent_gender',
-            'respondent_gender_id',
-            'respondent_hierarchy_level',
-            'respondent_hierarchy_level_id',
-            'respondent_hierarchy',
-            'respondent_hierarchy_id',
-            'respondent_role',
-            'respondent_role_id',
+        ] + RESPONDENT_COLUMNS + [
             'response_id',
             'topic_response_id',
             'dataset_response_id',
             'response_completed_at',
             'response_consented_at',
-            'survey',
-            'survey_display_name',
-            'survey_id',
-            'project',
-            'project_id',
-        ] + [f'_respondent_{key}' for key in hierarchy_levels]
-
-        for obj in self.object_list.iterator():
-
-            respondent = obj.response.dataset_response.response.respondent
-            respondent_hierarchy_dict = respondent.extras.get('hierarchy_dict') or respondent.build_hierarchy_dict()
-
-            # role
-            role = respondent.role
-            if role:
-                role_name = role.name
-                role_id = role.id
-
-                # hierarchy level
-                hierarchy_level = role.hierarchy_level
-                if hierarchy_level:
-                    hierarchy_level_name = hierarchy_level.name
-                    hierarchy_level_id = hierarchy_level.id
-                else:
-                    hierarchy_level_name = ''
-                    hierarchy_level_id = None
-            else:
-                role_name = ''
-                role_id = None
-                hierarchy_level_name = ''
-                hierarchy_level_id = None
-
-            # hierarchy
-            hierarchy = respondent.hierarchy
-            if hierarchy:
-                hierarchy_name = hierarchy.name
-                hierarchy_id = hierarchy.id
-            else:
-                hierarchy_name = ''
-                hierarchy_id = None
-
-            if respondent.gender:
-                respondent_gender_name = respondent.gender.name
-                respondent_gender_id = respondent.gender.id
-            else:
-                respondent_gender_name = ''
-                respondent_gender_id = None
-
-            yield [
-                obj.id,
-                obj.response.dataset_response.dataset.name,
-                obj.response.dataset_response.dataset.id,
-                obj.response.topic.name,
-                obj.response.topic.id,
-                obj.storage.name,
-                obj.storage.id,
-                obj.access.name,
-                obj.access.id,
-                respondent.id,
-                respondent.first_name,
-                respondent.last_name,
-                respondent.email,
-                respondent_gender_name,
-                respondent_gender_id,
-                hierarchy_level_name,
-                hierarchy_level_id,
-                hierarchy_name,
-                hierarchy_id,
-                role_name,
-                role_id,
-                obj.response.dataset_response.response.id,
-                obj.response.dataset_response.id,
-                obj.response.id,
-                obj.response.dataset_response.response.completed_at,
-                obj.response.dataset_response.response.consented_at,
-                obj.response.dataset_response.response.survey.name,
-                obj.response.dataset_response.response.survey.display_name,
-                obj.response.dataset_response.response.survey.id,
-                obj.response.dataset_response.response.survey.project.name,
-                obj.response.dataset_response.response.survey.project.id,
-            ] + [value for value in respondent_hierarchy_dict.values()]
+        ] + SURVEY_COLUMNS
+
+    def get_row(self, values, response, respondent):
+        dimensions = self.dimensions
+        pk, storage_id, access_id, topic_response_id, topic_id, dataset_response_id, dataset_id = values[:7]
+        response_id, completed_at, consented_at = response
+
+        return [
+            pk,
+            dimensions.datasets.get(dataset_id, ''),
+            dataset_id,
+            dimensions.topics.get(topic_id, ''),
+            topic_id,
+            dimensions.dataset_storages.get(storage_id, ''),
+            storage_id,
+            dimensions.dataset_access.get(access_id, ''),
+            access_id,
+        ] + respondent + [
+            response_id,
+            dataset_response_id,
+            topic_response_id,
+            completed_at,
+            consented_at,
+        ] + dimensions.get_survey()
 
     def get_filename(self):
         return f'datasets-storage-and-access-{str(timezone.now().date())}.csv'
 
-    def get_renderer(self):
-        return 'csv'
-
 
-class DatasetResponseListView(SingleObjectMixin, FacilitatorMixin, PageMixin, CSVResponseMixin, ListView):
+class DatasetResponseListView(BaseSurveyExportView):
     """
     Export topic encounter frequency.
     """
 
     model = DatasetResponse
-    pk_url_kwarg = 'survey'
-
-    def get(self, request, *args, **kwargs):
-        self.object = self.get_object(
-            queryset=Survey.objects.filter(project__facilitators=self.request.user)
-        )
-        return super().get(request, *args, **kwargs)
-
-    def get_queryset(self):
-        return self.model.objects\
-            .filter(response__survey=self.object)\
-            .exclude(response__completed_at__isnull=True)\
-            .select_related(
-                'dataset',
-                'dataset_frequency',
-                'response__respondent',
-                'response__respondent__gender',
-                'response__respondent__hierarchy',
-                'response__respondent__role',
-                'response',
-                'response__survey',
-                'response__survey__project'
-            )
-
-    def get_rows(self):
-        hierarchy_levels = self.object.project.hierarchy_levels.values_list('name', flat=True)
-
-        yield [
+    sheet_name = 'encounter frequency'
+    fields = [
+        'id',
+        'dataset_id',
+        'dataset_frequency_id',
+        'response_id',
+    ]
+    response_lookup = 'response'
+    delta_lookups = [
+        'response',
+        'response__respondent',
+    ]
+
+    def get_header(self):
+        return [
             'id',
             'topic',
             'topic_id',
             'topic_frequency',
             'topic_frequency_id',
-            'respondent_id',
-            'respondent_first_name',
-            'respondent_last_name',
-            'respondent_email',
-            'respondent_gender',
-            'respondent_gender_id',
-            'respondent_hierarchy_level',
-            'respondent_hierarchy_level_id',
-            'respondent_hierarchy',
-            'respondent_hierarchy_id',
-            'respondent_role',
-            'respondent_role_id',
+        ] + RESPONDENT_COLUMNS + [
             'response_id',
             'response_completed_at',
             'response_consented_at',
-            'survey',
-            'survey_display_name',
-            'survey_id',
-            'project',
-            'project_id',
-        ] + [f'_respondent_{key}' for key in hierarchy_levels]
-
-        for obj in self.object_list.iterator():
-
-            respondent = obj.response.respondent
-            respondent_hierarchy_dict = respondent.extras.get('hierarchy_dict') or respondent.build_hierarchy_dict()
-
-            # role
-            role = respondent.role
-            if role:
-                role_name = role.name
-                role_id = role.id
-
-                # hierarchy level
-                hierarchy_level = role.hierarchy_level
-                if hierarchy_level:
-                    hierarchy_level_name = hierarchy_level.name
-                    hierarchy_level_id = hierarchy_level.id
-                else:
-                    hierarchy_level_name = ''
-                    hierarchy_level_id = None
-            else:
-                role_name = ''
-                role_id = None
-                hierarchy_level_name = ''
-                hierarchy_level_id = None
-
-            # hierarchy
-            hierarchy = respondent.hierarchy
-            if hierarchy:
-                hierarchy_name = hierarchy.name
-                hierarchy_id = hierarchy.id
-            else:
-                hierarchy_name = ''
-                hierarchy_id = None
-
-            if respondent.gender:
-                respondent_gender_name = respondent.gender.name
-                respondent_gender_id = respondent.gender.id
-            else:
-                respondent_gender_name = ''
-                respondent_gender_id = None
-
-            yield [
-                obj.id,
-                obj.dataset.name,
-                obj.dataset.id,
-                obj.dataset_frequency.name,
-                obj.dataset_frequency.id,
-                respondent.id,
-                respondent.first_name,
-                respondent.last_name,
-                respondent.email,
-                respondent_gender_name,
-                respondent_gender_id,
-                hierarchy_level_name,
-                hierarchy_level_id,
-                hierarchy_name,
-                hierarchy_id,
-                role_name,
-                role_id,
-                obj.response.id,
-                obj.response.completed_at,
-                obj.response.consented_at,
-                obj.response.survey.name,
-                obj.response.survey.display_name,
-                obj.response.survey.id,
-                obj.response.survey.project.name,
-                obj.response.survey.project.id,
-            ] + [value for value in respondent_hierarchy_dict.values()]
+        ] + SURVEY_COLUMNS
+
+    def get_row(self, values, response, respondent):
+        dimensions = self.dimensions
+        pk, dataset_id, dataset_frequency_id = values[:3]
+        response_id, completed_at, consented_at = response
+
+        return [
+            pk,
+            dimensions.datasets.get(dataset_id, ''),
+            dataset_id,
+            dimensions.dataset_frequencies.get(dataset_frequency_id, ''),
+            dataset_frequency_id,
+        ] + respondent + [
+            response_id,
+            completed_at,
+            consented_at,
+        ] + dimensions.get_survey()
 
     def get_filename(self):
         return f'topic-encounter-frequency-{str(timezone.now().date())}.csv'
 
-    def get_renderer(self):
-        return 'csv'
+
+class SurveyExportWorkbookView(SingleObjectMixin, FacilitatorMixin, CSVResponseMixin, View):
+    """
+    Export all survey responses to a single XLSX workbook, with a worksheet per export.
+    """
+
+    pk_url_kwarg = 'survey'
+
+    #: Export views whose rows are written to the workbook, one worksheet each.
+    export_views = [
+        DatasetSharedListView,
+        DatasetReceivedListView,
+        DatasetSharedReceivedListView,
+        DatasetStorageAccessListView,
+        DatasetResponseListView,
+    ]
+
+    def get_queryset(self):
+        return Survey.objects\
+            .filter(project__facilitators=self.request.user)\
+            .select_related('project')
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        return self.render_xlsx()
+
+    def get_sheets(self):
+        dimensions = SurveyDimensions(self.object)
+
+        for view_class in self.export_views:
+            view = view_class()
+            view.setup(self.request, *self.args, **self.kwargs)
+            view.setup_export(self.object, dimensions=dimensions)
+            yield view.sheet_name, view.get_rows()
+
+    def get_filename(self):
+        return f'survey-responses-{str(timezone.now().date())}.xlsx'
+
+
+#: Export views keyed by :attr:`.ExportJob.export`.
+EXPORT_VIEWS = {
+    ExportJob.DATASET_SHARED: DatasetSharedListView,
+    ExportJob.DATASET_RECEIVED: DatasetReceivedListView,
+    ExportJob.DATASET_SHARED_RECEIVED: DatasetSharedReceivedListView,
+    ExportJob.DATASET_STORAGE_ACCESS: DatasetStorageAccessListView,
+    ExportJob.DATASET_RESPONSE: DatasetResponseListView,
+}
+
+
+class ProjectExportView(SingleObjectMixin, FacilitatorMixin, CSVResponseMixin, View):
+    """
+    Export responses of all surveys in a project into a single CSV file.
+
+    Surveys are streamed one after another in order of creation, each
+    fetched in batches as survey exports are, under the header of the first
+    survey. Respondent hierarchy columns are the same for all surveys since
+    hierarchy levels belong to the project.
+    """
+
+    pk_url_kwarg = 'project'
+
+    def get_queryset(self):
+        return Project.objects.filter(facilitators=self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        try:
+            self.export_view_class = EXPORT_VIEWS[self.kwargs['export']]
+        except KeyError:
+            raise Http404(_('Unknown export'))
+
+        self.surveys = list(self.object.surveys.select_related('project').order_by('created_at'))
+        return self.render_csv()
+
+    def iter_survey_csv(self, survey):
+        """Yields header chunk and CSV chunks of the rows of a survey export."""
+        view = self.export_view_class()
+        view.setup(self.request, survey=survey.pk)
+        view.setup_export(survey)
+        return view.iter_csv()
+
+    def iter_csv(self):
+        for index, survey in enumerate(self.surveys):
+            chunks = self.iter_survey_csv(survey)
+            header = next(chunks)
+            if index == 0:
+                yield header
+            yield from chunks
+
+    def get_filename(self):
+        return f'project-{self.object.pk}-{self.export_view_class().get_filename()}'
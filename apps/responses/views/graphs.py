@@ -0,0 +1,48 @@
+import hashlib
+
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.views import View
+from django.views.generic.detail import SingleObjectMixin
+
+from apps.surveys.models import Survey
+from core.mixins import FacilitatorMixin
+
+from ..graphs import DataflowGraph, get_dataflow_graph
+from ..utils import get_cached_for_snapshot, get_survey_snapshot
+
+
+class DataflowGraphView(FacilitatorMixin, SingleObjectMixin, View):
+    """
+    Dataflow graph of a survey as JSON, see :class:`.DataflowGraph`.
+
+    The graph is cached until the survey data changes, see
+    :func:`.get_cached_for_snapshot`. When ``format=ndjson`` is in the URL
+    query string the graph is streamed as newline delimited JSON instead,
+    without being cached, for graphs too large to be held in memory.
+    """
+
+    pk_url_kwarg = 'survey'
+
+    def get_queryset(self):
+        return Survey.objects\
+            .filter(project__facilitators=self.request.user)\
+            .select_related('project')
+
+    def get(self, request, *args, **kwargs):
+        survey = self.get_object()
+        snapshot = get_survey_snapshot(survey)
+        renderer = 'ndjson' if request.GET.get('format') == 'ndjson' else 'json'
+        etag = '"%s"' % hashlib.sha1(repr([survey.pk, snapshot, renderer]).encode()).hexdigest()
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None and renderer == 'ndjson':
+            response = StreamingHttpResponse(
+                DataflowGraph(survey).iter_ndjson(),
+                content_type='application/x-ndjson'
+            )
+        elif response is None:
+            response = JsonResponse(get_cached_for_snapshot('dataflow-graph', survey, snapshot, get_dataflow_graph))
+
+        response['ETag'] = etag
+        return response
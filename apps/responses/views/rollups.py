@@ -0,0 +1,42 @@
+import hashlib
+
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views import View
+from django.views.generic.detail import SingleObjectMixin
+
+from apps.surveys.models import Survey
+from core.mixins import FacilitatorMixin
+
+from ..rollups import get_hierarchy_rollup
+from ..utils import get_cached_for_snapshot, get_survey_snapshot
+
+
+class HierarchyRollupView(FacilitatorMixin, SingleObjectMixin, View):
+    """
+    Counts of survey responses, shared, received and storage access rows
+    aggregated at every dataflow hierarchy, as JSON.
+
+    Rollups are cached until the survey data changes, see
+    :func:`.get_cached_for_snapshot`. Requests with an ``If-None-Match``
+    header matching the survey and its snapshot get a 304 response.
+    """
+
+    pk_url_kwarg = 'survey'
+
+    def get_queryset(self):
+        return Survey.objects\
+            .filter(project__facilitators=self.request.user)\
+            .select_related('project')
+
+    def get(self, request, *args, **kwargs):
+        survey = self.get_object()
+        snapshot = get_survey_snapshot(survey)
+        etag = '"%s"' % hashlib.sha1(repr([survey.pk, snapshot]).encode()).hexdigest()
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = JsonResponse(get_cached_for_snapshot('hierarchy-rollup', survey, snapshot, get_hierarchy_rollup))
+
+        response['ETag'] = etag
+        return response
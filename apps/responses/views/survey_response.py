@@ -11,12 +11,13 @@ from django.views.generic.detail import SingleObjectMixin
 
 from django_filters.views import FilterView
 
+from apps.surveys.configuration import get_survey_configuration
 from core.exceptions import NotAuthenticated
 from core.mixins import CSVResponseMixin, PageMixin
 
 from ..filters import SurveyResponseFilter
 from ..forms import SurveyResponseCompleteForm
-from ..mixins import ConsentCheckMixin, RespondentSurveyMixin, ResponseFacilitatorMixin
+from ..mixins import ConsentCheckMixin, RespondentSurveyMixin, ResponseFacilitatorMixin, ResumePathMixin
 from ..models import SurveyResponse
 
 
@@ -33,6 +34,7 @@ class SurveyResponseListView(ResponseFacilitatorMixin, PageMixin, CSVResponseMix
     filterset_class = SurveyResponseFilter
     ordering = ['-created_at']
     paginate_by = 30
+    sheet_name = 'responses'
 
     def get_queryset(self):
         return super().get_queryset()\
@@ -43,7 +45,7 @@ class SurveyResponseListView(ResponseFacilitatorMixin, PageMixin, CSVResponseMix
         yield ('id', 'respondent_email', 'respondent_id', 'survey', 'survey_id', 'project', 'project_id',
                'status', 'consented_at', 'completed_at')
 
-        for obj in self.object_list:
+        for obj in self.object_list.iterator():
             yield (obj.id, obj.respondent.email, obj.respondent_id,
                    obj.survey.name, obj.survey_id, obj.survey.project.name, obj.survey.project.id,
                    obj.status, obj.consented_at, obj.completed_at)
@@ -52,12 +54,13 @@ class SurveyResponseListView(ResponseFacilitatorMixin, PageMixin, CSVResponseMix
         return f'responses-{str(timezone.now().date())}.csv'
 
     def get_renderer(self):
-        # When `format=csv` in URL query string return csv
-        if self.request.GET.get('format') == 'csv':
-            return 'csv'
+        # When `format=csv` or `format=xlsx` in URL query string return csv or xlsx
+        renderer = self.request.GET.get('format')
+        if renderer in ('csv', 'xlsx'):
+            return renderer
 
 
-class SurveyResponseResumeView(LoginRequiredMixin, PageMixin, SingleObjectMixin, View):
+class SurveyResponseResumeView(LoginRequiredMixin, PageMixin, ResumePathMixin, SingleObjectMixin, View):
     """
     Redirect to respondents last stage of survey response if possible.
 
@@ -78,9 +81,11 @@ class SurveyResponseResumeView(LoginRequiredMixin, PageMixin, SingleObjectMixin,
     def get(self, request, *args, **kwargs):
         self.object = self.get_object()
 
-        # check last response URL from state data
-        _state = self.object.extras.get('_state', {})
-        resume_path = _state.get('resume_path')
+        # check last response URL, including a path kept in the session
+        # which is written once the write interval has passed
+        resume_path = self.get_resume_path(self.object)
+        if resume_path:
+            self.set_resume_path(self.object, resume_path)
 
         if not resume_path:
             # if resume point not found redirect to respondent information update
@@ -91,7 +96,7 @@ class SurveyResponseResumeView(LoginRequiredMixin, PageMixin, SingleObjectMixin,
         return redirect(resume_path)
 
 
-class SurveyResponseCompleteView(PageMixin, RespondentSurveyMixin, ConsentCheckMixin, UpdateView):
+class SurveyResponseCompleteView(PageMixin, RespondentSurveyMixin, ConsentCheckMixin, ResumePathMixin, UpdateView):
     """
     Prompts respondents to complete survey.
 
@@ -140,7 +145,7 @@ class SurveyResponseCompleteView(PageMixin, RespondentSurveyMixin, ConsentCheckM
         """
         Set response completion time.
         """
-        form.instance.completed_at = timezone.now()
+        form.instance.complete(resume_path=self.pop_resume_path(self.object))
         messages.success(
             self.request,
             _('Your response has been submitted. You may access '
@@ -159,7 +164,7 @@ class SurveyResponseCompleteView(PageMixin, RespondentSurveyMixin, ConsentCheckM
         return '#'
 
     def get_footer_logos(self):
-        return self.survey.logos.all()
+        return get_survey_configuration(self.survey).logos
 
 
 class SurveyResponseDetailView(LoginRequiredMixin, PageMixin, DetailView):
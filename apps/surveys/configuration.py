@@ -0,0 +1,94 @@
+import copy
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.fields import ChoiceCache
+
+#: Related objects of a survey kept in its configuration.
+SURVEY_OBJECTS = [
+    'logos',
+    'datasets',
+    'dataset_frequencies',
+    'topics',
+    'entities',
+    'roles',
+    'dataset_storages',
+    'dataset_access',
+    'genders',
+]
+
+#: Configurations most recently used by this process, see :func:`get_survey_configuration`.
+_local_configurations = OrderedDict()
+_local_lock = threading.Lock()
+
+
+class SurveyConfiguration:
+    """
+    Snapshot of the configuration of a survey read by respondent pages.
+
+    Each of :data:`SURVEY_OBJECTS` is a tuple of objects ordered as the
+    related queryset, ``hierarchy_levels`` is a tuple of dicts of ``id``,
+    ``level`` and ``name`` of the project hierarchy levels. A configuration
+    is identified by the survey and its ``version``, the survey modification
+    time, and is never changed once loaded.
+    """
+
+    def __init__(self, survey_id, version, **objects):
+        self.survey_id = survey_id
+        self.version = version
+        self.__dict__.update(objects)
+
+    @classmethod
+    def load(cls, survey):
+        """Loads configuration of a survey from the database."""
+        objects = {name: tuple(getattr(survey, name).all()) for name in SURVEY_OBJECTS}
+        objects['hierarchy_levels'] = tuple(
+            survey.project.hierarchy_levels.values('id', 'level', 'name')
+        )
+        return cls(survey.pk, get_version(survey), **objects)
+
+    def get_choice_cache(self):
+        """
+        Returns a :class:`~core.fields.ChoiceCache` of the configuration
+        objects, keyed by names of :data:`SURVEY_OBJECTS`.
+        """
+        return ChoiceCache.from_objects(**{name: getattr(self, name) for name in SURVEY_OBJECTS})
+
+
+def get_version(survey):
+    """Returns version of the survey configuration."""
+    return survey.modified_at.isoformat()
+
+
+def get_survey_configuration(survey):
+    """
+    Returns the configuration of a survey, see :class:`SurveyConfiguration`.
+
+    Configurations are stored in the Django cache under a key of the survey
+    and its version, so edits of the survey configuration, which touch the
+    survey modification time, are visible immediately. The most recently
+    used configurations are also kept in local memory of the process, which
+    saves a cache round-trip on every page of a running survey. Each call
+    returns a copy, so model instances are not shared between threads.
+    """
+    key = f'surveys:configuration:{survey.pk}:{get_version(survey)}'
+    with _local_lock:
+        configuration = _local_configurations.get(key)
+        if configuration is not None:
+            _local_configurations.move_to_end(key)
+    if configuration is not None:
+        return copy.deepcopy(configuration)
+
+    configuration = cache.get(key)
+    if configuration is None:
+        configuration = SurveyConfiguration.load(survey)
+        cache.set(key, configuration, settings.SURVEYS_CONFIGURATION_CACHE_TIMEOUT)
+
+    with _local_lock:
+        _local_configurations[key] = configuration
+        while len(_local_configurations) > settings.SURVEYS_CONFIGURATION_LOCAL_SIZE:
+            _local_configurations.popitem(last=False)
+    return copy.deepcopy(configuration)
@@ -0,0 +1,45 @@
+# Generated by Django 3.0.14 on 2026-10-17 19:41
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+def populate_paths(apps, schema_editor):
+    DataflowHierarchy = apps.get_model('surveys', 'DataflowHierarchy')
+
+    # parents come before their children in tree order
+    paths = {}
+    hierarchies = list(DataflowHierarchy.objects.order_by('tree_id', 'lft').only('id', 'parent_id', 'name'))
+    for hierarchy in hierarchies:
+        path_ids, path_names = paths.get(hierarchy.parent_id, ([], []))
+        hierarchy.path_ids = [*path_ids, hierarchy.id]
+        hierarchy.path_names = [*path_names, hierarchy.name]
+        paths[hierarchy.id] = (hierarchy.path_ids, hierarchy.path_names)
+
+    DataflowHierarchy.objects.bulk_update(hierarchies, ['path_ids', 'path_names'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0002_add_survey_allow_respondent_roles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataflowhierarchy',
+            name='path_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, editable=False, size=None, verbose_name='path ids'),
+        ),
+        migrations.AddField(
+            model_name='dataflowhierarchy',
+            name='path_names',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=128), blank=True, default=list, editable=False, size=None, verbose_name='path names'),
+        ),
+        migrations.AddIndex(
+            model_name='dataflowhierarchy',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['path_ids'], name='surveys_dat_path_id_75419b_gin'),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
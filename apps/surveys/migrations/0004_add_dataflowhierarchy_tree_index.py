@@ -0,0 +1,17 @@
+# Generated by Django 3.0.14 on 2026-10-17 20:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0003_add_dataflowhierarchy_paths'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dataflowhierarchy',
+            index=models.Index(fields=['tree_id', 'lft'], name='surveys_dataflowhierarchy_50a7'),
+        ),
+    ]
@@ -150,14 +150,14 @@ class SurveyDetailMixin:
         Get entities associated with the survey
         """
         if self.object:
-            return self.object.entities.all()
+            return self.object.entities.select_related('hierarchy_level')
 
     def get_roles(self):
         """
         Get roles associated with the survey
         """
         if self.object:
-            return self.object.roles.all()
+            return self.object.roles.select_related('hierarchy_level')
 
     def get_logos(self):
         """
@@ -171,7 +171,7 @@ class SurveyDetailMixin:
         Get respondents associated with the survey but limit to 5
         """
         if self.object:
-            return self.object.respondents.all()[:5]
+            return self.object.respondents.select_related('hierarchy_level')[:5]
 
     def get_questions(self):
         """
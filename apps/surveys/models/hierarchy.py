@@ -1,7 +1,10 @@
 import uuid
 
 from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 from mptt.models import MPTTModel, TreeForeignKey
@@ -146,12 +149,36 @@ class DataflowHierarchy(TimeStampedModel, MPTTModel):
         on_delete=models.CASCADE
     )
 
+    #: Names of the ancestors and the dataflow hierarchy itself, from the root.
+    path_names = ArrayField(
+        models.CharField(max_length=128),
+        verbose_name=_('path names'),
+        blank=True,
+        default=list,
+        editable=False
+    )
+
+    #: Ids of the ancestors and the dataflow hierarchy itself, from the root.
+    path_ids = ArrayField(
+        models.IntegerField(),
+        verbose_name=_('path ids'),
+        blank=True,
+        default=list,
+        editable=False
+    )
+
     class MPTTMeta:
         order_insertion_by = ['name']
 
     class Meta:
         verbose_name = _('Dataflow Hierarchy')
         verbose_name_plural = _('Dataflow Hierarchies')
+        # the tree index is declared with the name given by mptt, as newer
+        # versions of mptt add it to declared indexes unless present
+        indexes = [
+            GinIndex(fields=['path_ids']),
+            models.Index(fields=['tree_id', 'lft'], name='surveys_dataflowhierarchy_50a7'),
+        ]
 
     def __str__(self):
         """Returns string representation of a dataflow hierarchy"""
@@ -161,3 +188,62 @@ class DataflowHierarchy(TimeStampedModel, MPTTModel):
         if self.parent:
             self.project = self.parent.project
         super().save(*args, **kwargs)
+        self.update_paths()
+
+    def update_paths(self):
+        """
+        Updates materialised paths of the dataflow hierarchy.
+
+        When an existing hierarchy is renamed or moved, paths of its
+        descendants and hierarchy extras of their respondents are updated
+        with one bulk statement each instead of saving every object. Their
+        modification time is touched too, so that survey snapshots and
+        delta exports see the change.
+
+        Called on save and when mptt moves a hierarchy, see
+        :func:`apps.surveys.signals.update_moved_hierarchy_paths`.
+        """
+        path_ids, path_names = [], []
+        if self.parent_id:
+            path_ids, path_names = DataflowHierarchy.objects\
+                .values_list('path_ids', 'path_names')\
+                .get(pk=self.parent_id)
+
+        path_ids = [*path_ids, self.pk]
+        path_names = [*path_names, self.name]
+        if path_ids == self.path_ids and path_names == self.path_names:
+            return
+
+        depth = len(self.path_ids)
+        now = timezone.now()
+        self.path_ids, self.path_names = path_ids, path_names
+        DataflowHierarchy.objects\
+            .filter(pk=self.pk)\
+            .update(path_ids=path_ids, path_names=path_names, modified_at=now)
+        if not depth:
+            # a new hierarchy has no descendants nor respondents yet
+            return
+
+        descendants = list(
+            DataflowHierarchy.objects
+            .filter(path_ids__contains=[self.pk])
+            .exclude(pk=self.pk)
+            .only('id', 'path_ids', 'path_names')
+        )
+        for descendant in descendants:
+            descendant.path_ids = path_ids + descendant.path_ids[depth:]
+            descendant.path_names = path_names + descendant.path_names[depth:]
+            descendant.modified_at = now
+        DataflowHierarchy.objects.bulk_update(descendants, ['path_ids', 'path_names', 'modified_at'])
+
+        levels = list(self.project.hierarchy_levels.values_list('name', flat=True))
+        self.respondents.model.objects.update_hierarchy_extras([self, *descendants], levels)
+
+    def get_path_dict(self, levels, value_attr='name'):
+        """
+        Returns the materialised path as a dictionary of project
+        hierarchy levels as keys.
+        """
+        path = list(self.path_ids if value_attr == 'id' else self.path_names)
+        path += [None] * (len(levels) - len(path))
+        return dict(zip(levels, path))
@@ -1,8 +1,17 @@
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save, pre_delete
 from django.dispatch import receiver
+from django.utils import timezone
 
-from .models import Survey
+from mptt.signals import node_moved
+
+from apps.users.models import Gender
+
+from .models import (DataflowHierarchy, Dataset, DatasetAccess, DatasetFrequency, DatasetStorage, Entity,
+                     HierarchyLevel, Logo, Role, Survey, Topic)
+
+#: Models of survey configuration objects, see :mod:`apps.surveys.configuration`.
+CONFIGURATION_MODELS = [Logo, Dataset, DatasetFrequency, Topic, Entity, Role, DatasetStorage, DatasetAccess]
 
 
 @receiver(post_save, sender=Survey)
@@ -36,3 +45,51 @@ def add_survey_dataset_access(sender, instance, created, **kwargs):
     if created:
         for access in settings.SURVEYS_DEFAULT_DATASET_ACCESS:
             instance.dataset_access.create(name=access, creator=instance.creator)
+
+
+def touch_survey_configuration(sender, instance, **kwargs):
+    """
+    Touch modification time of the survey whose configuration object is
+    saved or deleted, which is the version of cached survey configurations.
+    """
+    Survey.objects.filter(pk=instance.survey_id).update(modified_at=timezone.now())
+
+
+for model in CONFIGURATION_MODELS:
+    receiver([post_save, pre_delete], sender=model)(touch_survey_configuration)
+
+
+@receiver([post_save, pre_delete], sender=HierarchyLevel)
+def touch_project_survey_configurations(sender, instance, **kwargs):
+    """Touch modification time of surveys of the project whose hierarchy levels change."""
+    Survey.objects.filter(project=instance.project_id).update(modified_at=timezone.now())
+
+
+@receiver([post_save, pre_delete], sender=Gender)
+def touch_gender_survey_configurations(sender, instance, **kwargs):
+    """Touch modification time of surveys whose genders are saved or deleted."""
+    Survey.objects.filter(genders=instance).update(modified_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Survey.genders.through)
+def touch_survey_genders(sender, instance, action, reverse, pk_set, **kwargs):
+    """Touch modification time of surveys whose genders are changed."""
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        surveys = Survey.objects.filter(pk=instance.pk)
+    elif reverse and action in ('post_add', 'post_remove'):
+        surveys = Survey.objects.filter(pk__in=pk_set)
+    elif reverse and action == 'pre_clear':
+        surveys = Survey.objects.filter(genders=instance)
+    else:
+        return
+
+    surveys.update(modified_at=timezone.now())
+
+
+@receiver(node_moved, sender=DataflowHierarchy)
+def update_moved_hierarchy_paths(sender, instance, **kwargs):
+    """
+    Update materialised paths of a dataflow hierarchy moved by mptt, whose
+    tree fields may be updated without saving it.
+    """
+    instance.update_paths()
@@ -0,0 +1,57 @@
+from django.test import TestCase
+
+from model_bakery import baker
+
+from apps.projects.models import Project
+from apps.users.models import Gender, User
+
+from ..configuration import get_survey_configuration
+from ..models import HierarchyLevel, Logo, Survey, Topic
+
+
+class SurveyConfigurationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(User)
+        cls.project = baker.make(Project, creator=cls.user)
+        cls.survey = baker.make(Survey, project=cls.project, creator=cls.user)
+        cls.topic = Topic.objects.create(survey=cls.survey, name='Health', creator=cls.user)
+        cls.logo = Logo.objects.create(survey=cls.survey, name='Logo', creator=cls.user)
+        cls.level = HierarchyLevel.objects.create(project=cls.project, name='region', creator=cls.user)
+
+    def get_configuration(self):
+        return get_survey_configuration(Survey.objects.get(pk=self.survey.pk))
+
+    def test_configuration(self):
+        configuration = self.get_configuration()
+        self.assertEqual(configuration.topics, (self.topic,))
+        self.assertEqual(configuration.logos, (self.logo,))
+        self.assertEqual(configuration.hierarchy_levels, ({'id': self.level.pk, 'level': 0, 'name': 'region'},))
+
+        survey = Survey.objects.get(pk=self.survey.pk)
+        with self.assertNumQueries(0):
+            local_configuration = get_survey_configuration(survey)
+        self.assertEqual(local_configuration.version, configuration.version)
+        self.assertEqual(local_configuration.topics, configuration.topics)
+
+        # threads do not share model instances
+        self.assertIsNot(local_configuration.topics[0], configuration.topics[0])
+
+    def test_edits_change_version(self):
+        version = self.get_configuration().version
+
+        topic = Topic.objects.create(survey=self.survey, name='Education', creator=self.user)
+        configuration = self.get_configuration()
+        self.assertNotEqual(configuration.version, version)
+        self.assertEqual(configuration.topics, (self.topic, topic))
+
+        self.survey.genders.add(baker.make(Gender))
+        self.assertEqual(len(self.get_configuration().genders), len(configuration.genders) + 1)
+
+        self.level.name = 'zone'
+        self.level.save()
+        self.assertEqual(self.get_configuration().hierarchy_levels[0]['name'], 'zone')
+
+        topic.delete()
+        self.assertEqual(self.get_configuration().topics, (self.topic,))
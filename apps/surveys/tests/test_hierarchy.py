@@ -0,0 +1,110 @@
+from django.test import TestCase
+
+from model_bakery import baker
+
+from apps.projects.models import Project
+from apps.respondents.models import Respondent
+from apps.users.models import User
+
+from ..models import DataflowHierarchy, HierarchyLevel, Survey
+
+
+class DataflowHierarchyPathTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(User)
+        cls.project = baker.make(Project, creator=cls.user)
+        region = HierarchyLevel.objects.create(project=cls.project, name='region', creator=cls.user)
+        district = HierarchyLevel.objects.create(parent=region, name='district', creator=cls.user)
+        ward = HierarchyLevel.objects.create(parent=district, name='ward', creator=cls.user)
+
+        def create(name, level, parent=None):
+            return DataflowHierarchy.objects.create(
+                project=cls.project, parent=parent, hierarchy_level=level,
+                level_name=level.name, name=name, creator=cls.user
+            )
+
+        cls.coast = create('Coast', region)
+        cls.lake = create('Lake', region)
+        cls.district = create('Ilala', district, cls.coast)
+        cls.ward = create('Kariakoo', ward, cls.district)
+
+        cls.survey = baker.make(Survey, project=cls.project, creator=cls.user)
+        cls.respondent = Respondent.objects.create(survey=cls.survey, hierarchy=cls.ward)
+        cls.other = Respondent.objects.create(survey=cls.survey, hierarchy=cls.lake)
+
+    def setUp(self):
+        for hierarchy in (self.coast, self.lake, self.district, self.ward):
+            hierarchy.refresh_from_db()
+
+    def assertPath(self, hierarchy, names):
+        hierarchy.refresh_from_db()
+        self.assertEqual(hierarchy.path_names, names)
+        self.assertEqual(hierarchy.path_ids, [
+            DataflowHierarchy.objects.get(project=self.project, name=name).pk
+            for name in names
+        ])
+
+    def test_insert(self):
+        self.assertPath(self.coast, ['Coast'])
+        self.assertPath(self.ward, ['Coast', 'Ilala', 'Kariakoo'])
+        self.assertEqual(self.respondent.extras['hierarchy_dict'], {
+            'region': 'Coast', 'district': 'Ilala', 'ward': 'Kariakoo'
+        })
+        self.assertEqual(self.other.extras['hierarchy_id_dict'], {
+            'region': self.lake.pk, 'district': None, 'ward': None
+        })
+
+    def test_rename(self):
+        self.district.name = 'Temeke'
+        with self.assertNumQueries(12):
+            self.district.save()
+
+        self.assertPath(self.ward, ['Coast', 'Temeke', 'Kariakoo'])
+        self.respondent.refresh_from_db()
+        self.assertEqual(self.respondent.extras['hierarchy_dict'], {
+            'region': 'Coast', 'district': 'Temeke', 'ward': 'Kariakoo'
+        })
+
+    def test_move(self):
+        self.district.move_to(self.lake)
+
+        self.assertPath(self.district, ['Lake', 'Ilala'])
+        self.assertPath(self.ward, ['Lake', 'Ilala', 'Kariakoo'])
+        self.assertPath(self.coast, ['Coast'])
+        self.respondent.refresh_from_db()
+        self.assertEqual(self.respondent.extras['hierarchy_id_dict'], {
+            'region': self.lake.pk, 'district': self.district.pk, 'ward': self.ward.pk
+        })
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.extras['hierarchy_dict'], {'region': 'Lake', 'district': None, 'ward': None})
+
+    def test_move_node(self):
+        modified_at = Respondent.objects.get(pk=self.respondent.pk).modified_at
+        # fresh instances, as mptt keeps track of the tree fields they were loaded with
+        ward, district = DataflowHierarchy.objects.filter(pk__in=[self.ward.pk, self.district.pk]).order_by('-level')
+        DataflowHierarchy.objects.move_node(ward, self.lake, 'first-child')
+        district.move_to(self.coast, 'right')
+
+        self.assertPath(self.ward, ['Lake', 'Kariakoo'])
+        self.assertPath(self.district, ['Ilala'])
+        self.respondent.refresh_from_db()
+        self.assertEqual(self.respondent.extras['hierarchy_id_dict'], {
+            'region': self.lake.pk, 'district': self.ward.pk, 'ward': None
+        })
+        self.assertGreater(self.respondent.modified_at, modified_at)
+
+    def test_descendants_are_touched(self):
+        modified_at = DataflowHierarchy.objects.get(pk=self.ward.pk).modified_at
+        self.district.name = 'Temeke'
+        self.district.save()
+        self.assertGreater(DataflowHierarchy.objects.get(pk=self.ward.pk).modified_at, modified_at)
+
+    def test_build_hierarchy_dict_without_queries(self):
+        respondent = Respondent.objects.select_related('hierarchy').get(pk=self.respondent.pk)
+        with self.assertNumQueries(0):
+            hierarchy_dict = respondent.build_hierarchy_dict('id', levels=['region', 'district', 'ward'])
+        self.assertEqual(hierarchy_dict, {
+            'region': self.coast.pk, 'district': self.district.pk, 'ward': self.ward.pk
+        })
@@ -6,6 +6,7 @@ from django.views.generic.detail import DetailView
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
 from django.views.generic.list import ListView
 
+from apps.responses.models import SurveyStatistics
 from core.mixins import PageTitleMixin, SuccessMessageMixin
 
 from ..filters import SurveyListFilter
@@ -110,6 +111,17 @@ class SurveyDetailView(SurveyFacilitatorMixin, PageTitleMixin, DetailView):
     context_object_name = 'survey'
     model = Survey
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('statistics')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        try:
+            context['statistics'] = self.object.statistics
+        except SurveyStatistics.DoesNotExist:
+            context['statistics'] = SurveyStatistics.get_for_survey(self.object.pk)[0]
+        return context
+
 
 class SurveyUpdateView(SuccessMessageMixin, SurveyFacilitatorMixin,
                        SurveyCreatorMixin, PageTitleMixin, UpdateView):
@@ -4,12 +4,13 @@ function exportFilteredCSV(el) {
   var form = '#master-filter';
   var tmpInputClass = '_tmp-input';
   var exportType = $(el).data('exportType');
+  var exportFormat = $(el).data('format') || 'csv';
   console.log(exportType);
 
   $("<input />")
     .attr("type", "hidden")
     .attr("name", "format")
-    .attr("value", "csv")
+    .attr("value", exportFormat)
     .addClass(tmpInputClass)
     .appendTo(form);
 
@@ -25,3 +25,126 @@ class ChoiceArrayField(ArrayField):
 
         defaults.update(kwargs)
         return super(ArrayField, self).formfield(**defaults)
+
+
+class ChoiceCache:
+    """
+    Choices of model choice fields shared by forms of a formset.
+
+    Each choice queryset is evaluated once, by the first form, and its
+    objects are then used by every form to render choices and to validate
+    submitted values, see :class:`CachedModelChoiceField`.
+    """
+
+    def __init__(self):
+        self.objects = {}
+
+    @classmethod
+    def from_objects(cls, **objects):
+        """Returns a cache of already loaded choice objects of fields."""
+        choice_cache = cls()
+        for name, field_objects in objects.items():
+            choice_cache.set(name, field_objects)
+        return choice_cache
+
+    def set(self, name, objects):
+        """Sets already loaded choice objects of a field."""
+        self.objects[name] = {obj.pk: obj for obj in objects}
+
+    def bind(self, field, name):
+        """Makes a field use cached choices, evaluating its queryset if they are not cached yet."""
+        if name not in self.objects:
+            self.set(name, field.queryset)
+        field.cached_objects = self.objects[name]
+
+
+class CachedModelChoiceIterator(forms.models.ModelChoiceIterator):
+    """Iterates choices of cached objects instead of querying them."""
+
+    def __iter__(self):
+        if self.field.cached_objects is None:
+            yield from super().__iter__()
+            return
+
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in self.field.cached_objects.values():
+            yield self.choice(obj)
+
+    def __len__(self):
+        if self.field.cached_objects is None:
+            return super().__len__()
+        return len(self.field.cached_objects) + (1 if self.field.empty_label is not None else 0)
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    """
+    Model choice field which can render and validate choices from a
+    :class:`ChoiceCache` without querying the database.
+    """
+    iterator = CachedModelChoiceIterator
+
+    #: Choice objects by primary key, ``None`` unless bound to a cache.
+    cached_objects = None
+
+    def to_python(self, value):
+        if self.cached_objects is None or value in self.empty_values:
+            return super().to_python(value)
+
+        try:
+            key = self.queryset.model._meta.pk.to_python(value)
+        except forms.ValidationError:
+            key = None
+        if key not in self.cached_objects:
+            raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        return self.cached_objects[key]
+
+
+class CachedModelMultipleChoiceField(forms.ModelMultipleChoiceField):
+    """
+    Model multiple choice field which can render and validate choices from
+    a :class:`ChoiceCache` without querying the database. Cleaned values
+    are lists of objects in the order of the choices.
+    """
+    iterator = CachedModelChoiceIterator
+
+    #: Choice objects by primary key, ``None`` unless bound to a cache.
+    cached_objects = None
+
+    def _check_values(self, value):
+        if self.cached_objects is None:
+            return super()._check_values(value)
+
+        keys = set()
+        for pk in value:
+            try:
+                keys.add(self.queryset.model._meta.pk.to_python(pk))
+            except forms.ValidationError:
+                raise forms.ValidationError(
+                    self.error_messages['invalid_pk_value'],
+                    code='invalid_pk_value',
+                    params={'pk': pk},
+                )
+        for key in keys:
+            if key not in self.cached_objects:
+                raise forms.ValidationError(
+                    self.error_messages['invalid_choice'],
+                    code='invalid_choice',
+                    params={'value': key},
+                )
+        return [obj for key, obj in self.cached_objects.items() if key in keys]
+
+
+class CachedChoicesFormMixin:
+    """
+    Model form mixin which skips model validation of fields validated
+    against cached choices, which would otherwise check that each
+    selected object exists.
+    """
+
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        return exclude + [
+            name for name, field in self.fields.items()
+            if getattr(field, 'cached_objects', None) is not None
+        ]
@@ -1,14 +1,23 @@
 import csv
+import io
+import itertools
 import json
+import os
+import tempfile
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.postgres.search import SearchVector
-from django.http import StreamingHttpResponse
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import redirect
 from django.template.response import TemplateResponse
+from django.utils.cache import patch_vary_headers
 
-from .utils import PseudoBuffer
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
+
+from .utils import PseudoBuffer, get_encoding_quality, iter_chunks, iter_gzip, iter_zip
 
 
 class PageTitleMixin:
@@ -169,9 +178,33 @@ class CSVResponseMixin:
     A mixin for Streaming CSV response.
 
     To use this mixin you should define :meth:`~get_rows()` method
+
+    Rows are written lazily and grouped into chunks of about :attr:`~chunk_size`
+    bytes so that memory usage stays flat regardless of the export size.
+    The first row (header) is sent on its own so that the download starts
+    immediately.
+
+    Rows can also be rendered as an Excel workbook when :meth:`~get_renderer()`
+    returns 'xlsx'. Worksheets are written in constant memory mode, where each
+    row is flushed to a temporary file once written, and the workbook is sent
+    once complete.
+
+    CSV content is compressed chunk by chunk when ``compress=gzip`` or
+    ``compress=zip`` is in the URL query string, in which case a ``.csv.gz``
+    or ``.zip`` file is downloaded, or when the client accepts gzip content
+    encoding.
     """
     filename = 'export.csv'
 
+    #: Approximate size in bytes of each streamed chunk.
+    chunk_size = 64 * 1024
+
+    #: Worksheet name of XLSX response.
+    sheet_name = 'export'
+
+    #: Maximum number of rows of an XLSX worksheet, including the header.
+    xlsx_max_rows = 1048576
+
     def get_filename(self):
         """
         Returns filename for the generated download.
@@ -187,24 +220,215 @@ class CSVResponseMixin:
         raise NotImplementedError
 
     def get_renderer(self):
-        """This should return 'csv' for CSV response."""
+        """This should return 'csv' for CSV response or 'xlsx' for XLSX response."""
         return 'csv'
 
+    def iter_csv(self):
+        """Yields CSV content of :meth:`~get_rows()` in chunks of about :attr:`~chunk_size` bytes."""
+        writer = csv.writer(PseudoBuffer())
+        rows = iter(self.get_rows())
+
+        # flush header immediately
+        for row in rows:
+            yield writer.writerow(row)
+            break
+
+        yield from iter_chunks((writer.writerow(row) for row in rows), self.chunk_size)
+
+    def get_compression(self):
+        """
+        Returns compression of CSV response, either 'gzip', 'zip' or ``None``.
+
+        A ``compress`` URL query string parameter takes precedence over the
+        ``Accept-Encoding`` request header.
+        """
+        compress = self.request.GET.get('compress')
+        if compress in ('gzip', 'zip'):
+            return compress
+        return None
+
+    def accepts_gzip(self):
+        """Returns whether the client accepts gzip content encoding, see :func:`.get_encoding_quality`."""
+        return get_encoding_quality(self.request.META.get('HTTP_ACCEPT_ENCODING', ''), 'gzip') > 0
+
     def render_csv(self):
+        filename = self.get_filename()
+        content = (chunk.encode() for chunk in self.iter_csv())
+        compression = self.get_compression()
+
+        if compression == 'gzip':
+            response = StreamingHttpResponse(iter_gzip(content), content_type='application/gzip')
+            filename = f'{filename}.gz'
+        elif compression == 'zip':
+            response = StreamingHttpResponse(iter_zip(content, filename), content_type='application/zip')
+            filename = f'{os.path.splitext(filename)[0]}.zip'
+        elif self.accepts_gzip():
+            response = StreamingHttpResponse(iter_gzip(content), content_type="text/csv")
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = StreamingHttpResponse(content, content_type="text/csv")
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
-        writer = csv.writer(PseudoBuffer())
+    def get_sheets(self):
+        """
+        Returns a list of worksheet name and rows pairs of XLSX response.
+
+        Override this for workbooks with several worksheets. By default this
+        returns a single worksheet named :attr:`~sheet_name` with :meth:`~get_rows()`.
+        """
+        return [(self.sheet_name, self.get_rows())]
+
+    def write_xlsx(self, file):
+        """
+        Writes worksheets of :meth:`~get_sheets()` to a file object.
+
+        Rows which do not fit into a worksheet, see :attr:`~xlsx_max_rows`,
+        continue in worksheets named with a number suffix, each starting with
+        the header row.
+        """
+        workbook = xlsxwriter.Workbook(file, {
+            'constant_memory': True,
+            'remove_timezone': True,
+            'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+        })
+
+        for name, rows in self.get_sheets():
+            rows = iter(rows)
+            header = next(rows, None)
+            for part in itertools.count(1):
+                suffix = f' ({part})' if part > 1 else ''
+                worksheet = workbook.add_worksheet(f'{name[:31 - len(suffix)]}{suffix}')
+                sheet_rows = itertools.chain([header], itertools.islice(rows, self.xlsx_max_rows - 1))
+                for index, row in enumerate(sheet_rows):
+                    if row is not None and worksheet.write_row(index, 0, row) < 0:
+                        raise ValueError(f'Row {index} of worksheet {worksheet.name} is out of range.')
+
+                next_row = next(rows, None)
+                if next_row is None:
+                    break
+                rows = itertools.chain([next_row], rows)
+
+        workbook.close()
+
+    def render_xlsx(self):
+        file = tempfile.TemporaryFile()
+        self.write_xlsx(file)
+        file.seek(0)
+
+        return FileResponse(
+            file,
+            as_attachment=True,
+            filename=f'{os.path.splitext(self.get_filename())[0]}.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+
+    def render_to_response(self, context, **response_kwargs):
+        renderer = self.get_renderer()
+        if renderer == 'csv':
+            return self.render_csv()
+        if renderer == 'xlsx':
+            return self.render_xlsx()
+        return super().render_to_response(context, **response_kwargs)
+
+
+class ParquetResponseMixin:
+    """
+    A mixin for Streaming Parquet response.
+
+    To use this mixin you should define :meth:`~get_rows()` method, the first
+    row being the header. Rows are converted to record batches of
+    :attr:`~batch_size` rows and each batch is streamed as a Parquet row group.
+
+    Column types are determined by :meth:`~get_column_type()`, by default
+    ``id`` and ``*_id`` columns are integers, ``*_at`` columns are timestamps
+    and other columns are dictionary encoded strings.
+    """
+
+    #: Number of rows in each record batch (Parquet row group).
+    batch_size = 10000
+
+    #: Arrow data type of string columns.
+    string_type = pa.dictionary(pa.int32(), pa.string())
+
+    def get_filename(self):
+        """Returns filename for the generated download."""
+        return 'export.parquet'
+
+    def get_parquet_filename(self):
+        """Returns :meth:`~get_filename()` with ``.parquet`` extension."""
+        return f'{os.path.splitext(self.get_filename())[0]}.parquet'
+
+    def get_rows(self):
+        """
+        Override this method to yield list of values which will be considered as rows.
+        """
+        raise NotImplementedError
 
-        response = StreamingHttpResponse(
-            [writer.writerow(row) for row in self.get_rows()],
-            content_type="text/csv"
+    def get_renderer(self):
+        """This should return 'parquet' for Parquet response."""
+        return 'parquet'
+
+    def get_column_type(self, column):
+        """Returns arrow data type of a column."""
+        if column == 'id' or column.endswith('_id'):
+            return pa.int64()
+        if column.endswith('_at'):
+            return pa.timestamp('us', tz='UTC')
+        return self.string_type
+
+    def get_schema(self, header):
+        """Returns arrow schema of the header columns."""
+        return pa.schema([(column, self.get_column_type(column)) for column in header])
+
+    def get_record_batch(self, schema, rows):
+        """Returns arrow record batch of rows."""
+        return pa.record_batch(
+            [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)],
+            schema=schema
         )
 
-        response['Content-Disposition'] = f'attachment; filename="{self.get_filename()}"'
+    def iter_parquet(self):
+        """Yields Parquet content of :meth:`~get_rows()`, a row group at a time."""
+        rows = iter(self.get_rows())
+        schema = self.get_schema(next(rows))
+
+        # Parquet writer keeps track of its own position, so the buffer
+        # is emptied after each row group is written.
+        buffer = io.BytesIO()
+
+        def flush():
+            value = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return value
+
+        writer = pq.ParquetWriter(buffer, schema)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                writer.write_batch(self.get_record_batch(schema, batch))
+                batch = []
+                yield flush()
+
+        if batch:
+            writer.write_batch(self.get_record_batch(schema, batch))
+        writer.close()
+        yield flush()
+
+    def render_parquet(self):
+
+        response = StreamingHttpResponse(self.iter_parquet(), content_type='application/vnd.apache.parquet')
+
+        response['Content-Disposition'] = f'attachment; filename="{self.get_parquet_filename()}"'
         return response
 
     def render_to_response(self, context, **response_kwargs):
-        if self.get_renderer() == 'csv':
-            return self.render_csv()
+        if self.get_renderer() == 'parquet':
+            return self.render_parquet()
         return super().render_to_response(context, **response_kwargs)
 
 
@@ -1,3 +1,9 @@
+import zipfile
+import zlib
+
+from django.db.models import Q
+
+
 class PseudoBuffer:
     """An object that implements just the write method of the file-like
     interface.
@@ -6,3 +12,152 @@ class PseudoBuffer:
     def write(self, value):
         """Write the value by returning it, instead of storing in a buffer."""
         return value
+
+
+def iter_chunks(strings, size):
+    """
+    Joins strings from an iterable into chunks of at least ``size``
+    characters. The last chunk may be smaller.
+    """
+    chunk = []
+    chunk_size = 0
+
+    for value in strings:
+        chunk.append(value)
+        chunk_size += len(value)
+
+        if chunk_size >= size:
+            yield ''.join(chunk)
+            chunk = []
+            chunk_size = 0
+
+    if chunk:
+        yield ''.join(chunk)
+
+
+class StreamBuffer:
+    """A write only file-like object whose content is read and emptied with :meth:`~drain`."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, value):
+        self.chunks.append(value)
+        return len(value)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Returns written content and empties the buffer."""
+        value = b''.join(self.chunks)
+        self.chunks = []
+        return value
+
+
+def iter_gzip(chunks):
+    """Compresses an iterable of bytes into gzip format chunk by chunk."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+
+    yield compressor.flush()
+
+
+def iter_zip(chunks, filename):
+    """
+    Compresses an iterable of bytes into a zip archive, with a single file
+    named ``filename``, chunk by chunk.
+    """
+    buffer = StreamBuffer()
+
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(filename, mode='w', force_zip64=True) as f:
+            for chunk in chunks:
+                f.write(chunk)
+                data = buffer.drain()
+                if data:
+                    yield data
+
+    yield buffer.drain()
+
+
+def get_encoding_quality(accept_encoding, encoding):
+    """
+    Returns the quality value of a content encoding in an ``Accept-Encoding``
+    header, that of ``*`` if the encoding is not listed, and ``0`` if neither
+    is listed. Encodings with a quality value of ``0`` are not acceptable.
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, *params = item.split(';')
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    return qualities.get(encoding, qualities.get('*', 0.0))
+
+
+def get_adjacent(items, item):
+    """
+    Returns the items before and after ``item`` in a list, ``None`` at
+    either end of the list.
+    """
+    index = items.index(item)
+    previous_item = items[index - 1] if index > 0 else None
+    next_item = items[index + 1] if index + 1 < len(items) else None
+    return previous_item, next_item
+
+
+def keyset_filter(keys, values):
+    """
+    Returns ``Q`` object matching rows after ``values`` of ``keys`` in
+    lexicographic order, that is ``(key1, key2, ...) > (value1, value2, ...)``.
+    """
+    condition = Q(**{f'{keys[-1]}__gt': values[-1]})
+    for key, value in zip(reversed(keys[:-1]), reversed(values[:-1])):
+        condition = Q(**{f'{key}__gt': value}) | Q(Q(**{key: value}) & condition)
+    return condition
+
+
+def iter_keyset(queryset, fields, key='id', batch_size=1000, callback=None):
+    """
+    Yields ``values_list(*fields)`` rows of a queryset in ``key`` order.
+
+    Rows are fetched in batches of ``batch_size`` rows using keyset
+    pagination (``key > last key``), so that each batch is a short query
+    rather than a long running server side cursor.
+
+    Args:
+        queryset (QuerySet): Queryset to iterate, ``fields`` may include its annotations.
+        fields (list): Names of fields to be fetched, including ``key``.
+        key (str or tuple): Unique field, or fields, by which rows are ordered and paginated.
+        batch_size (int): Number of rows fetched by each query.
+        callback (callable): Called with the last key and number of rows of each batch.
+    """
+    keys = (key,) if isinstance(key, str) else tuple(key)
+    indexes = [list(fields).index(name) for name in keys]
+    queryset = queryset.order_by(*keys)
+    last_key = None
+
+    while True:
+        batch_queryset = queryset if last_key is None else queryset.filter(keyset_filter(keys, last_key))
+        batch = list(batch_queryset.values_list(*fields)[:batch_size])
+        if not batch:
+            return
+
+        last_key = tuple(batch[-1][index] for index in indexes)
+        if callback:
+            callback(last_key[0] if len(keys) == 1 else last_key, len(batch))
+        yield from batch
+
+        if len(batch) < batch_size:
+            return
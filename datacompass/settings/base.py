@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 For more information django-environ which is used to read environment variables settings, see
 https://django-environ.readthedocs.io/en/latest/
 """
+import tempfile
 from email.utils import getaddresses
 from pathlib import Path
 
@@ -385,6 +386,43 @@ SURVEYS_DEFAULT_DATASET_ACCESS = env.list('SURVEYS_DEFAULT_DATASET_ACCESS', defa
     'Public can access',
 ])
 
+# Seconds for which survey configurations read by respondent pages are cached
+# and number of configurations kept in local memory of each process. Entries
+# are keyed by survey modification time, which configuration edits touch.
+SURVEYS_CONFIGURATION_CACHE_TIMEOUT = env.int('SURVEYS_CONFIGURATION_CACHE_TIMEOUT', default=24 * 60 * 60)
+
+SURVEYS_CONFIGURATION_LOCAL_SIZE = env.int('SURVEYS_CONFIGURATION_LOCAL_SIZE', default=128)
+
+# Responses
+
+# Seconds by which the next cursor of delta exports lags behind the export
+# start, so that rows committed while an export runs are not missed.
+RESPONSES_DELTA_EXPORT_OVERLAP = env.int('RESPONSES_DELTA_EXPORT_OVERLAP', default=300)
+
+# Number of rows fetched by each query of survey exports.
+RESPONSES_EXPORT_BATCH_SIZE = env.int('RESPONSES_EXPORT_BATCH_SIZE', default=2000)
+
+# Local directory and maximum total size in bytes of cached survey exports,
+# least recently used exports are removed first. Set size to 0 to disable.
+RESPONSES_EXPORT_CACHE_ROOT = env('RESPONSES_EXPORT_CACHE_ROOT',
+                                  default=str(Path(tempfile.gettempdir()) / 'datacompass-exports'))
+
+RESPONSES_EXPORT_CACHE_SIZE = env.int('RESPONSES_EXPORT_CACHE_SIZE', default=512 * 1024 * 1024)
+
+# Seconds after which running export jobs which have not reported progress are
+# considered stale, their worker most likely died, and the jobs are failed.
+RESPONSES_EXPORT_JOB_TIMEOUT = env.int('RESPONSES_EXPORT_JOB_TIMEOUT', default=10 * 60)
+
+# Seconds for which hierarchy rollups and dataflow graphs are cached, entries
+# are keyed by a snapshot of the survey data so changes are visible immediately.
+RESPONSES_AGGREGATE_CACHE_TIMEOUT = env.int('RESPONSES_AGGREGATE_CACHE_TIMEOUT', default=24 * 60 * 60)
+
+# Seconds between writes of resume paths of survey responses, paths set in the
+# meantime are kept in the respondent's session and the latest one is written
+# by the next write after the interval, or on completion. Set to 0 to write
+# every path.
+RESPONSES_RESUME_PATH_WRITE_INTERVAL = env.int('RESPONSES_RESUME_PATH_WRITE_INTERVAL', default=60)
+
 # Azure
 
 AZURE_ACCOUNT_NAME = env('AZURE_ACCOUNT_NAME', default=None)